@@ -0,0 +1,18 @@
+from fastapi import APIRouter, HTTPException
+from app.services.room_manager import room_manager
+from app.services.agent_pool import agent_pool
+
+router = APIRouter()
+
+@router.get("/rooms/{room_id}/stats")
+async def room_stats(room_id: str):
+    """Per-participant delivery stats (outbound queue depth, drops, ...)."""
+    stats = room_manager.get_room_stats(room_id)
+    if stats is None:
+        raise HTTPException(status_code=404, detail="Room not found")
+    return stats
+
+@router.get("/agents/stats")
+async def agent_stats():
+    """Agent pool: ready agents, hits/misses, and time from agent requested to its first output frame."""
+    return agent_pool.stats()
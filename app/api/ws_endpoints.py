@@ -1,21 +1,60 @@
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect, status
+from fastapi import APIRouter, Query, WebSocket, WebSocketDisconnect, status
 import uuid
 import msgpack
 import asyncio
+from urllib.parse import quote
 from app.services.room_manager import room_manager
+from app.services.room_router import room_router
+from app.api.ws_proxy import proxy_websocket
 from app.models.room import WebSocketParticipant
-from app.core.protocol import MessageType, BaseMessage
+from app.core.protocol import MessageType, BaseMessage, AudioFormat, ControlEncoding, is_binary_frame
+from app.services.ingress import AudioIngress
 from app.core.logging import logger
+from app.core.config import settings
 
 router = APIRouter()
 
 @router.websocket("/ws/{room_id}/{username}")
-async def websocket_endpoint(websocket: WebSocket, room_id: str, username: str):
+async def websocket_endpoint(websocket: WebSocket, room_id: str, username: str,
+                             control: ControlEncoding = ControlEncoding.JSON,
+                             audio: AudioFormat = AudioFormat.MSGPACK,
+                             rate: int = Query(settings.SAMPLE_RATE, gt=0),
+                             channels: int = Query(1, ge=1, le=settings.CLIENT_MAX_CHANNELS)):
+    # `?control=msgpack` switches control messages from JSON text to msgpack binary frames
+    # `?audio=binary` asks for server-generated audio (e.g. mixes) as fixed-header frames
+    # `?rate=48000&channels=2` describes the PCM this client sends (converted for agents,
+    # the mixer and the recorder). Only listed rates: each one sizes a resampler filter.
+    if rate not in settings.CLIENT_SAMPLE_RATES:
+        logger.warning(f"Rejecting {username}: unsupported sample rate {rate}")
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
     await websocket.accept()
     
+    # Room affinity: every room lives on one worker. If it is not us, proxy to the owner.
+    if room_router.enabled:
+        try:
+            owner = await room_router.route(room_id)
+        except Exception as e:
+            # Without the routing table we cannot tell who hosts the room; hosting it
+            # here could split it across workers
+            logger.error(f"Room routing failed for {room_id}: {e}")
+            await websocket.close(code=status.WS_1011_INTERNAL_ERROR)
+            return
+        if not room_router.is_local(owner):
+            target = f"{owner}/ws/{quote(room_id)}/{quote(username)}"
+            if websocket.url.query:
+                target += f"?{websocket.url.query}"
+            logger.debug(f"Proxying {username} in room {room_id} to {owner}")
+            await proxy_websocket(websocket, target)
+            return
+    
     # Simple ID generation
     participant_id = str(uuid.uuid4())
-    participant = WebSocketParticipant(participant_id, username, websocket)
+    participant = WebSocketParticipant(participant_id, username, websocket,
+                                       control_encoding=control, audio_format=audio,
+                                       sample_rate=rate, channels=channels)
+    ingress = AudioIngress(participant)
+    participant.start()
     
     await room_manager.join_room(room_id, participant)
     
@@ -40,9 +79,18 @@ async def websocket_endpoint(websocket: WebSocket, room_id: str, username: str):
             
             # Let's try to receive message
             message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", status.WS_1000_NORMAL_CLOSURE))
             
             if "bytes" in message:
                 data = message["bytes"]
+                
+                # Fast path: binary audio frames are routed on their fixed header alone
+                if is_binary_frame(data):
+                    frame = ingress.from_binary(data)
+                    await room_manager.broadcast_bytes(room_id, frame, exclude_id=participant_id)
+                    continue
+                
                 # Try to unpack as BaseMessage
                 try:
                     unpacked = msgpack.unpackb(data, raw=False)
@@ -51,11 +99,10 @@ async def websocket_endpoint(websocket: WebSocket, room_id: str, username: str):
                         msg_type = unpacked.get("type")
                         
                         if msg_type == MessageType.AUDIO_STREAM:
-                            # Broadcast audio to others in room
-                            # We re-pack or just forward?
-                            # Optimally we define the packet format to allow forwarding.
-                            # For now, let's just broadcast the raw bytes to everyone else.
-                            await room_manager.broadcast_bytes(room_id, data, exclude_id=participant_id)
+                            # Parsed once here; listeners get the original bytes, agents the decoded frame
+                            frame = ingress.from_message(unpacked, data)
+                            if frame:
+                                await room_manager.broadcast_bytes(room_id, frame, exclude_id=participant_id)
                         
                         elif msg_type == MessageType.LEAVE_ROOM:
                             break
@@ -83,3 +130,4 @@ async def websocket_endpoint(websocket: WebSocket, room_id: str, username: str):
         logger.error(f"WebSocket error: {e}")
     finally:
         await room_manager.leave_room(room_id, participant_id)
+        await participant.close()
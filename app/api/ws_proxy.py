@@ -0,0 +1,48 @@
+import asyncio
+import websockets
+from fastapi import WebSocket
+from app.core.logging import logger
+
+async def proxy_websocket(websocket: WebSocket, target_url: str):
+    """
+    Pipes an accepted client socket to another worker (the room's owner) and back.
+    Frames are forwarded opaquely; nothing is parsed on the proxying worker.
+    """
+    try:
+        async with websockets.connect(target_url, max_size=None) as upstream:
+
+            async def client_to_upstream():
+                while True:
+                    message = await websocket.receive()
+                    if message["type"] == "websocket.disconnect":
+                        return
+                    if message.get("bytes") is not None:
+                        await upstream.send(message["bytes"])
+                    elif message.get("text") is not None:
+                        await upstream.send(message["text"])
+
+            async def upstream_to_client():
+                async for data in upstream:
+                    if isinstance(data, bytes):
+                        await websocket.send_bytes(data)
+                    else:
+                        await websocket.send_text(data)
+
+            tasks = [
+                asyncio.create_task(client_to_upstream()),
+                asyncio.create_task(upstream_to_client()),
+            ]
+            # Whichever side closes first ends the session
+            done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in pending:
+                task.cancel()
+            for task in done:
+                if task.exception():
+                    logger.debug(f"Proxy to {target_url} ended: {task.exception()}")
+    except Exception as e:
+        logger.error(f"Proxy to {target_url} failed: {e}")
+    finally:
+        try:
+            await websocket.close()
+        except RuntimeError:
+            pass
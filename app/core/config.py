@@ -1,5 +1,6 @@
+from pydantic import model_validator
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import List, Optional
 
 class Settings(BaseSettings):
     # App Config
@@ -18,9 +19,99 @@ class Settings(BaseSettings):
     # Redis
     REDIS_URL: str = "redis://localhost:6379/0"
     
+    # Multi-worker
+    DISTRIBUTED_ROOMS: bool = False # Relay room audio/control between workers over Redis pub/sub
+    WORKER_ID: Optional[str] = None # Defaults to a random id per process
+    ROOM_AFFINITY: bool = False # Route each room to one owning worker (see app/launcher.py)
+    WORKER_URL: Optional[str] = None # This worker's internal ws:// base URL, used by other workers to proxy
+    ROOM_LEASE_SECONDS: int = 30
+    
     # Audio
     SAMPLE_RATE: int = 16000
     FRAME_DURATION_MS: int = 20
+    CLIENT_SAMPLE_RATES: List[int] = [8000, 16000, 24000, 48000] # Accepted for ?rate= (converted server-side)
+    CLIENT_MAX_CHANNELS: int = 2
+    
+    # Outbound (server -> client) queues
+    OUTBOUND_QUEUE_FRAMES: int = 50 # ~1s of 20ms audio per listener
+    OUTBOUND_OVERFLOW_POLICY: str = "drop_oldest" # options: "drop_oldest", "drop_newest"
+    
+    # Opus: decoded/encoded on a bounded thread pool, only for PCM consumers (agents, mixer, recorder)
+    OPUS_THREADS: int = 2
+    AGENT_OUTPUT_CODEC: str = "pcm16" # options: "pcm16", "opus" (listeners must decode Opus)
+    
+    # Agent input (room -> agent) queues
+    AGENT_INPUT_QUEUE_FRAMES: int = 100 # ~2s of 20ms audio per agent session
+    AGENT_INPUT_MAX_BYTES: int = 256 * 1024 # Hard memory cap per agent session
+    AGENT_INPUT_MAX_LAG_MS: int = 1000 # Older frames are skipped instead of processed
+    AGENT_LAG_WARN_MS: int = 500 # Log a warning when an agent falls this far behind live
+    AGENT_OUTPUT_QUEUE_FRAMES: int = 50 # Synthesized audio an agent may run ahead of playout
+    
+    # Server-side mixing (MCU mode): rooms with at least this many participants
+    # get one mixed stream per listener instead of per-speaker forwarding. 0 disables.
+    MIXER_MIN_PARTICIPANTS: int = 10
+    
+    # Active-speaker selective forwarding: rooms with at least this many participants
+    # (and below the mixing threshold) only forward the K loudest speakers. 0 disables.
+    ACTIVE_SPEAKER_MIN_PARTICIPANTS: int = 5
+    ACTIVE_SPEAKERS_K: int = 3
+    
+    # Recording: each sender's audio to recordings/<room>_<participant>.pcm (Opus senders are decoded for it)
+    RECORDING_ENABLED: bool = True # Off skips the recorder, and the Opus decodes done only for it
+    
+    # Silence suppression (DTX) on the forwarding path
+    DTX_ENABLED: bool = True
+    DTX_THRESHOLD_DB: float = -55.0 # Frames below this level (dBFS) count as silence
+    DTX_HANGOVER_MS: int = 200 # Keep forwarding this long after speech ends
+    DTX_COMFORT_NOISE_MS: int = 400 # Comfort-noise marker interval during silence
+    
+    # Voice activity detection in front of STT
+    VAD_ENABLED: bool = True
+    VAD_PRE_ROLL_MS: int = 200 # Audio before speech onset that is still sent to STT
+    VAD_HANGOVER_MS: int = 300 # Trailing silence sent after speech, so STT can finalize
+    
+    # End-of-turn detection: hand the user's turn to the LLM before the STT final
+    EOT_MIN_SILENCE_MS: int = 250 # Never end a turn with less trailing silence than this
+    EOT_STABLE_MS: int = 200 # ...and the interim transcript unchanged for this long
+    EOT_MAX_SILENCE_MS: int = 1000 # End the turn regardless once silence reaches this
+    
+    # Barge-in: user speech while an agent is answering cancels the answer
+    BARGE_IN_ENABLED: bool = True
+    BARGE_IN_MIN_SPEECH_MS: int = 160 # Speech needed to interrupt (ignores coughs and clicks)
+    
+    # Speculative LLM: start answering a stable interim transcript before the turn ends
+    SPECULATION_ENABLED: bool = True
+    SPECULATION_STABLE_MS: int = 100 # Interim unchanged this long, in trailing silence
+    
+    # Fillers: a short acknowledgement clip when an answer has no audio yet after this long
+    FILLER_ENABLED: bool = True
+    FILLER_AFTER_MS: int = 700 # From the end of the turn
+    FILLER_PHRASES: List[str] = ["Mm-hm.", "Let me check.", "One moment.", "Okay, so."]
+    
+    # Conversation memory: history sent to the LLM is kept under a token budget;
+    # older turns are summarized in the background
+    LLM_CONTEXT_TOKEN_BUDGET: int = 2000 # Summary plus verbatim turns
+    LLM_CONTEXT_LOW_WATER: float = 0.6 # Turns are moved out until this share of the budget is used
+    LLM_CONTEXT_KEEP_MESSAGES: int = 4 # The latest messages always stay verbatim
+    LLM_SUMMARY_MAX_WORDS: int = 150
+    
+    # Agent pool: agents built ahead of time, attached to a room without setup
+    AGENT_POOL_MIN: int = 1 # Ready agents kept per agent name
+    AGENT_POOL_MAX: int = 4 # Upper bound as the pool grows after misses
+    AGENT_POOL_NAMES: List[str] = ["mock-conversation", "echo"] # Filled at startup
+    
+    # TTS pipeline: synthesize sentence by sentence, overlapped with playback
+    TTS_LOOKAHEAD_SEGMENTS: int = 2 # Segments synthesized ahead of the one playing
+    TTS_FIRST_SEGMENT_MIN_CHARS: int = 20 # The first segment may end at a clause past this length
+    TTS_SEGMENT_MAX_CHARS: int = 200 # Longer text is cut at a space
+    
+    # TTS cache: repeated segments are served from memory or disk instead of the provider
+    TTS_CACHE_ENABLED: bool = True
+    TTS_CACHE_DIR: Optional[str] = "tts_cache" # Shared by workers; None keeps the cache in memory only
+    TTS_CACHE_MEMORY_BYTES: int = 32 * 1024 * 1024
+    TTS_CACHE_DISK_BYTES: int = 512 * 1024 * 1024
+    TTS_CACHE_MAPPED_ENTRIES: int = 256 # Disk entries kept mapped after a hit (page cache, not memory budget)
+    TTS_CACHE_MAX_TEXT_CHARS: int = 100 # Longer segments are not cached
     
     # AI Config
     DEFAULT_AGENT_PROVIDER: str = "mock" # options: "mock", "google"
@@ -35,6 +126,14 @@ class Settings(BaseSettings):
     GOOGLE_PROJECT_ID: Optional[str] = None
     GEMINI_API_KEY: Optional[str] = None
 
+    @model_validator(mode="after")
+    def _check_room_modes(self):
+        # Two ways of running a room on several workers: relay it between them, or
+        # keep it on one (affinity). Combined, rooms would be hosted and relayed at once.
+        if self.DISTRIBUTED_ROOMS and self.ROOM_AFFINITY:
+            raise ValueError("DISTRIBUTED_ROOMS and ROOM_AFFINITY are alternatives; enable one of them")
+        return self
+
     class Config:
         env_file = ".env"
 
@@ -1,6 +1,7 @@
-from enum import Enum
+from enum import Enum, IntEnum
 from pydantic import BaseModel, Field
-from typing import Any, Optional, Union
+from typing import Any, NamedTuple, Optional, Union
+import struct
 import msgpack
 import json
 
@@ -13,12 +14,17 @@ class MessageType(str, Enum):
     ERROR = "error"
     SYSTEM = "system"
     
+    ROOM_MODE = "room_mode"
+    ACTIVE_SPEAKERS = "active_speakers"
+    
     # Audio
     AUDIO_STREAM = "audio_stream"
+    COMFORT_NOISE = "comfort_noise"
     
     # AI
     AI_REQUEST = "ai_request"
     AI_RESPONSE = "ai_response"
+    INTERRUPT = "interrupt" # An agent was cut off; clients flush its queued playout
 
 class BaseMessage(BaseModel):
     type: MessageType
@@ -35,6 +41,36 @@ class BaseMessage(BaseModel):
     def to_json(self) -> str:
         return self.model_dump_json()
 
+class ControlEncoding(str, Enum):
+    JSON = "json" # Text frames (default, browser friendly)
+    MSGPACK = "msgpack" # Binary frames, same envelope as audio
+
+class AudioFormat(str, Enum):
+    MSGPACK = "msgpack" # AUDIO_STREAM envelope (default)
+    BINARY = "binary" # Fixed-header frames
+
+class EncodedMessage:
+    """
+    A control message serialized at most once per wire encoding,
+    so a broadcast costs one encode no matter how many recipients.
+    """
+    __slots__ = ("message", "_json", "_msgpack")
+
+    def __init__(self, message: BaseMessage, packed: Optional[bytes] = None):
+        self.message = message
+        self._json: Optional[str] = None
+        self._msgpack: Optional[bytes] = packed # Reuse an encoding we already hold
+
+    def json(self) -> str:
+        if self._json is None:
+            self._json = self.message.to_json()
+        return self._json
+
+    def msgpack(self) -> bytes:
+        if self._msgpack is None:
+            self._msgpack = self.message.to_msgpack()
+        return self._msgpack
+
 # Specific Payload Models (Optional but good for documentation)
 class AuthPayload(BaseModel):
     token: str
@@ -49,3 +85,62 @@ class AudioPayload(BaseModel):
     participant_id: str
     audio_data: bytes # Raw Opus frames
     timestamp: int
+
+# --- Binary audio frames ---
+# Audio can also be sent as a fixed header followed by the raw payload, so the
+# server can route a frame without running it through msgpack.
+#
+#   0      1       2      4          8            12
+#   | kind | codec | slot | sequence | timestamp  | payload ...
+#
+# All fields are big-endian. `kind` is the first byte and is chosen outside the
+# msgpack map range (0x80-0x8f, 0xde, 0xdf) so both formats can share a socket.
+
+class FrameKind(IntEnum):
+    AUDIO = 0x01
+    COMFORT_NOISE = 0x02 # Server -> client only; header + 1 byte noise level (-dBov)
+
+class AudioCodec(IntEnum):
+    PCM16 = 0
+    OPUS = 1
+
+AUDIO_HEADER = struct.Struct("!BBHII")
+AUDIO_HEADER_SIZE = AUDIO_HEADER.size
+SLOT_FIELD = struct.Struct("!H")
+SLOT_OFFSET = 2
+UNASSIGNED_SLOT = 0xFFFF
+
+class AudioHeader(NamedTuple):
+    kind: int
+    codec: int
+    slot: int
+    seq: int
+    timestamp: int
+
+def is_binary_frame(data: bytes) -> bool:
+    return len(data) >= AUDIO_HEADER_SIZE and data[0] == FrameKind.AUDIO
+
+def pack_audio_frame(audio: bytes, seq: int, timestamp: int,
+                     slot: int = UNASSIGNED_SLOT, codec: int = AudioCodec.PCM16) -> bytes:
+    header = AUDIO_HEADER.pack(
+        FrameKind.AUDIO, codec, slot, seq & 0xFFFFFFFF, timestamp & 0xFFFFFFFF
+    )
+    return header + bytes(audio)
+
+def pack_comfort_noise(slot: int, seq: int, timestamp: int, level_dbov: int) -> bytes:
+    header = AUDIO_HEADER.pack(
+        FrameKind.COMFORT_NOISE, AudioCodec.PCM16, slot, seq & 0xFFFFFFFF, timestamp & 0xFFFFFFFF
+    )
+    return header + bytes([max(0, min(127, level_dbov))])
+
+def unpack_audio_header(data: bytes) -> AudioHeader:
+    return AudioHeader._make(AUDIO_HEADER.unpack_from(data))
+
+def read_slot(data: bytes) -> int:
+    return SLOT_FIELD.unpack_from(data, SLOT_OFFSET)[0]
+
+def with_slot(data: bytes, slot: int) -> bytes:
+    """Returns a copy of a binary frame stamped with the given participant slot."""
+    buf = bytearray(data)
+    SLOT_FIELD.pack_into(buf, SLOT_OFFSET, slot)
+    return bytes(buf)
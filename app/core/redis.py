@@ -5,6 +5,8 @@ from .logging import logger
 class RedisClient:
     def __init__(self):
         self.redis: redis.Redis | None = None
+        # Separate connection pool without response decoding, for binary payloads (audio pub/sub)
+        self.binary: redis.Redis | None = None
 
     async def connect(self):
         try:
@@ -14,12 +16,15 @@ class RedisClient:
                 decode_responses=True
             )
             await self.redis.ping()
+            self.binary = redis.from_url(settings.REDIS_URL, decode_responses=False)
             logger.info("Connected to Redis")
         except Exception as e:
             logger.error(f"Failed to connect to Redis: {e}")
             raise e
 
     async def close(self):
+        if self.binary:
+            await self.binary.close()
         if self.redis:
             await self.redis.close()
             logger.info("Redis connection closed")
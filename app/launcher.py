@@ -0,0 +1,77 @@
+"""
+Room-affinity launcher: runs N worker processes of app.main behind one public port.
+
+Every worker accepts on the shared public socket (the kernel spreads connections),
+and also listens on its own internal port. Rooms are routed to a single owning
+worker through the Redis routing table (app/services/room_router.py); a worker that
+accepts a socket for a room it does not own proxies it to the owner's internal port.
+All of a room's audio therefore stays in one process, with one room-local fan-out per core.
+
+Usage: python -m app.launcher --workers 4 [--host 0.0.0.0] [--port 8000] [--internal-port 9100]
+"""
+import argparse
+import multiprocessing
+import os
+import signal
+import socket
+
+def _run_worker(index: int, public_sock: socket.socket, internal_host: str, internal_port: int):
+    # Settings are read from the environment when app.core.config is imported,
+    # so configure this worker before touching anything under app.
+    os.environ["WORKER_ID"] = f"worker-{index}"
+    os.environ["WORKER_URL"] = f"ws://{internal_host}:{internal_port}"
+    os.environ["ROOM_AFFINITY"] = "true"
+
+    import uvicorn
+
+    internal_sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    internal_sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    internal_sock.bind((internal_host, internal_port))
+
+    config = uvicorn.Config("app.main:app", log_level="info")
+    server = uvicorn.Server(config)
+    server.run(sockets=[public_sock, internal_sock])
+
+def main():
+    parser = argparse.ArgumentParser(description="Room-affinity multi-worker launcher")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--internal-host", default="127.0.0.1")
+    parser.add_argument("--internal-port", type=int, default=9100,
+                        help="First internal port; worker i listens on internal-port + i")
+    args = parser.parse_args()
+
+    public_sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    public_sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    public_sock.bind((args.host, args.port))
+    public_sock.set_inheritable(True)
+
+    ctx = multiprocessing.get_context("spawn")
+    workers = [
+        ctx.Process(
+            target=_run_worker,
+            args=(i, public_sock, args.internal_host, args.internal_port + i),
+            name=f"voice-worker-{i}",
+        )
+        for i in range(args.workers)
+    ]
+    for worker in workers:
+        worker.start()
+    print(f"Started {len(workers)} workers on {args.host}:{args.port} "
+          f"(internal {args.internal_host}:{args.internal_port}-{args.internal_port + len(workers) - 1})")
+
+    try:
+        for worker in workers:
+            worker.join()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for worker in workers:
+            if worker.is_alive():
+                os.kill(worker.pid, signal.SIGINT)
+        for worker in workers:
+            worker.join(timeout=10)
+
+if __name__ == "__main__":
+    main()
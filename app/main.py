@@ -10,14 +10,34 @@ async def lifespan(app: FastAPI):
     logger.info("Starting up Realtime Voice Server...")
     try:
         await redis_client.connect()
+        if settings.DISTRIBUTED_ROOMS:
+            from app.services.room_bus import room_bus
+            await room_bus.start()
+        if settings.ROOM_AFFINITY:
+            from app.services.room_router import room_router
+            await room_router.start()
     except Exception as e:
         logger.critical(f"Startup failed: {e}")
         # In production we might want to exit, but for dev we might continue or retry
     
+    # Agents connect their providers and load their audio assets (filler clips)
+    # before the first call, and a few are built ready to attach
+    from app.services.ai_service import agent_manager
+    from app.services.agent_pool import agent_pool
+    await agent_manager.warm_up()
+    agent_pool.start(settings.AGENT_POOL_NAMES)
+    
     yield
     
     # Shutdown
     logger.info("Shutting down...")
+    await agent_pool.stop()
+    if settings.DISTRIBUTED_ROOMS:
+        from app.services.room_bus import room_bus
+        await room_bus.stop()
+    if settings.ROOM_AFFINITY:
+        from app.services.room_router import room_router
+        await room_router.stop()
     await redis_client.close()
 
 app = FastAPI(
@@ -28,8 +48,10 @@ app = FastAPI(
 
 from fastapi.staticfiles import StaticFiles
 from app.api.ws_endpoints import router as ws_router
+from app.api.stats_endpoints import router as stats_router
 
 app.include_router(ws_router)
+app.include_router(stats_router)
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
 
 @app.get("/")
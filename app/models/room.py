@@ -1,7 +1,17 @@
-from typing import List, Dict, Set
+import asyncio
+import json
+from typing import List, Dict, Set, Optional
 from abc import ABC, abstractmethod
 from fastapi import WebSocket
+from app.core.config import settings
 from app.core.logging import logger
+from app.core.protocol import UNASSIGNED_SLOT, AudioFormat, ControlEncoding, EncodedMessage
+from app.services.audio import JitterEstimator
+from app.services.ingress import IngressFrame
+from app.services.queues import AgentInputQueue, OutboundQueue, OverflowPolicy
+from app.services.mixer import RoomMixer
+from app.services.active_speaker import ActiveSpeakerTracker
+from app.services.dtx import DtxStage
 
 class Participant(ABC):
     def __init__(self, id: str, username: str):
@@ -9,6 +19,12 @@ class Participant(ABC):
         self.username = username
         self.is_speaking: bool = False
         self.is_muted: bool = False
+        self.slot: int = UNASSIGNED_SLOT # Short id used in binary audio frame headers
+        self.jitter = JitterEstimator(settings.FRAME_DURATION_MS) # Inbound jitter, updated at ingress
+        self.sample_rate: int = settings.SAMPLE_RATE # Of the PCM this participant sends
+        self.channels: int = 1
+        self.audio_format: AudioFormat = AudioFormat.MSGPACK # Envelope for server-generated audio
+        self.receives_mix: bool = True # Gets the mixed stream in MCU mode and only top-K speakers in select mode
 
     @abstractmethod
     async def send_bytes(self, data: bytes):
@@ -18,56 +34,184 @@ class Participant(ABC):
     async def send_json(self, data: dict):
         pass
 
+    async def send_frame(self, frame: IngressFrame):
+        # Default: forward the original wire bytes untouched
+        await self.send_bytes(frame.wire)
+
+    async def send_message(self, message: EncodedMessage):
+        # Default: hand over the plain dict
+        await self.send_json(message.message.model_dump())
+
+    def purge_audio(self, sender_id: str) -> int:
+        """Drops audio from `sender_id` that is queued but not yet sent. Returns frames dropped."""
+        return 0
+
+    def stats(self) -> dict:
+        return {
+            "id": self.id,
+            "username": self.username,
+            "slot": self.slot,
+            "jitter_ms": round(self.jitter.jitter_ms, 2),
+        }
+
 class WebSocketParticipant(Participant):
-    def __init__(self, id: str, username: str, websocket: WebSocket):
+    """
+    A human client. Sends never touch the socket directly: they are queued on a
+    bounded outbound queue that a dedicated writer task drains, so one slow
+    connection cannot stall the sender or the rest of the room.
+    """
+    def __init__(self, id: str, username: str, websocket: WebSocket,
+                 queue_size: int = settings.OUTBOUND_QUEUE_FRAMES,
+                 overflow_policy: str = settings.OUTBOUND_OVERFLOW_POLICY,
+                 control_encoding: ControlEncoding = ControlEncoding.JSON,
+                 audio_format: AudioFormat = AudioFormat.MSGPACK,
+                 sample_rate: int = settings.SAMPLE_RATE, channels: int = 1):
         super().__init__(id, username)
         self.websocket = websocket
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.control_encoding = ControlEncoding(control_encoding)
+        self.audio_format = AudioFormat(audio_format)
+        self.outbound = OutboundQueue(queue_size, OverflowPolicy(overflow_policy))
+        self._writer: Optional[asyncio.Task] = None
+        self.closed = False
+
+    def start(self):
+        if self._writer is None:
+            self._writer = asyncio.create_task(self._write_loop())
+
+    async def close(self):
+        self.closed = True
+        if self._writer:
+            self._writer.cancel()
+            try:
+                await self._writer
+            except asyncio.CancelledError:
+                pass
+            self._writer = None
+
+    async def _write_loop(self):
+        while True:
+            message = await self.outbound.get()
+            try:
+                await self.websocket.send(message)
+            except Exception as e:
+                # The client is gone (RuntimeError once closed, or a disconnect error);
+                # stop here rather than failing once per queued frame
+                logger.debug(f"Failed to send to {self.username}: {e}")
+                self.closed = True
+                return
     
     async def send_bytes(self, data: bytes):
-        try:
-            await self.websocket.send_bytes(data)
-        except RuntimeError as e:
-            # WebSocket might be closed
-            logger.debug(f"Failed to send bytes to {self.username}: {e}")
-        except Exception as e:
-            logger.error(f"Error sending bytes to {self.username}: {e}")
+        if self.closed:
+            return
+        # Overflow drops are counted on the queue (see stats)
+        self.outbound.put_audio({"type": "websocket.send", "bytes": data})
+
+    async def send_frame(self, frame: IngressFrame):
+        if self.closed:
+            return
+        # Tagged with the sender so it can be purged if the sender is interrupted
+        self.outbound.put_audio({"type": "websocket.send", "bytes": frame.wire}, frame.sender_id)
+
+    def purge_audio(self, sender_id: str) -> int:
+        return self.outbound.purge(sender_id)
 
     async def send_json(self, data: dict):
-        try:
-            await self.websocket.send_json(data)
-        except RuntimeError as e:
-            logger.debug(f"Failed to send json to {self.username}: {e}")
-        except Exception as e:
-            logger.error(f"Error sending json to {self.username}: {e}")
+        if self.closed:
+            return
+        text = json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+        self.outbound.put_control({"type": "websocket.send", "text": text})
+
+    async def send_message(self, message: EncodedMessage):
+        if self.closed:
+            return
+        # The encoded buffer is shared by every recipient of a broadcast
+        if self.control_encoding == ControlEncoding.MSGPACK:
+            self.outbound.put_control({"type": "websocket.send", "bytes": message.msgpack()})
+        else:
+            self.outbound.put_control({"type": "websocket.send", "text": message.json()})
+
+    def stats(self) -> dict:
+        stats = super().stats()
+        stats["control_encoding"] = self.control_encoding.value
+        stats["outbound"] = self.outbound.stats()
+        return stats
 
 class VirtualParticipant(Participant):
     """
     Represents an AI Agent or Bot in the room.
     Messages sent TO this participant are queued for the Agent to process.
     """
-    def __init__(self, id: str, username: str, input_queue):
+    def __init__(self, id: str, username: str, input_queue: AgentInputQueue):
         super().__init__(id, username)
-        self.input_queue = input_queue # asyncio.Queue
+        self.input_queue = input_queue
+        self.receives_mix = False # Agents keep getting per-speaker frames
+        self.feed = None # AgentAudioFeed, set once the agent loop starts
+        self.agent = None # AIAgentBase serving this participant
+        self.paced = None # PacedStream carrying the agent's output
         
     async def send_bytes(self, data: bytes):
-        # Audio packet received from a human, intended for the agent
-        await self.input_queue.put(data)
+        # Agents only consume parsed frames (see send_frame); raw wire bytes are ignored
+        pass
+
+    async def send_frame(self, frame: IngressFrame):
+        # Audio received from a human, intended for the agent. Parsed at ingress; Opus is decoded by the feed.
+        # Never blocks: a stalled agent loses its oldest audio, not the room's time.
+        self.input_queue.put(frame)
 
     async def send_json(self, data: dict):
         # Control message received
         pass
 
+    async def send_message(self, message: EncodedMessage):
+        # Agents ignore control messages for now
+        pass
+
+    def stats(self) -> dict:
+        stats = super().stats()
+        stats["input"] = self.input_queue.stats()
+        if self.feed is not None:
+            stats["jitter"] = self.feed.stats()
+        if self.agent is not None:
+            stats["agent"] = self.agent.stats()
+        if self.paced is not None:
+            stats["output"] = self.paced.stats()
+        return stats
+
 class Room:
     def __init__(self, id: str):
         self.id = id
         self.participants: Dict[str, Participant] = {}
         
-    def add_participant(self, participant: Participant):
+        self.slots: Dict[int, str] = {} # slot -> participant_id
+        self.mixer: Optional[RoomMixer] = None # Set while the room is in MCU mode
+        self.speakers: Optional[ActiveSpeakerTracker] = None # Set while forwarding only the top-K speakers
+        self.dtx: Optional[DtxStage] = DtxStage() if settings.DTX_ENABLED else None
+        
+    def add_participant(self, participant: Participant, slot: Optional[int] = None):
+        # `slot` is passed in when slots are allocated elsewhere (e.g. shared across workers)
         self.participants[participant.id] = participant
+        if slot is None:
+            slot = self._allocate_slot(participant.id)
+        else:
+            self.slots[slot] = participant.id
+        participant.slot = slot
         
-    def remove_participant(self, participant_id: str):
+    def remove_participant(self, participant_id: str) -> Optional[Participant]:
         if participant_id in self.participants:
-            del self.participants[participant_id]
+            participant = self.participants.pop(participant_id)
+            self.slots.pop(participant.slot, None)
+            return participant
+        return None
+            
+    def _allocate_slot(self, participant_id: str) -> int:
+        # Lowest free slot, so slots stay small and get reused as people leave
+        slot = 0
+        while slot in self.slots:
+            slot += 1
+        self.slots[slot] = participant_id
+        return slot
             
     def get_participants(self) -> List[Participant]:
         return list(self.participants.values())
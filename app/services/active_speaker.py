@@ -0,0 +1,102 @@
+import time
+from typing import Dict, List, Optional
+from app.services.audio import SILENCE_DB
+
+class ActiveSpeakerTracker:
+    """
+    Smoothed active-speaker ranking for one room (selective forwarding).
+    Each sender's per-frame level is smoothed with an EMA; the top K senders above
+    the speech threshold are "active" and only their audio is forwarded to listeners.
+    The ranking is re-evaluated at most every `update_interval_ms`, and a challenger
+    must beat the quietest active speaker by `switch_margin_db` to take its place,
+    so short noises do not make the set flap.
+    """
+    def __init__(self, k: int, speech_threshold_db: float = -50.0, smoothing: float = 0.1, attack: float = 0.6,
+                 switch_margin_db: float = 3.0, update_interval_ms: int = 100,
+                 stale_after_ms: int = 400):
+        self.k = k
+        self.speech_threshold_db = speech_threshold_db
+        self.smoothing = smoothing
+        self.attack = attack
+        self.switch_margin_db = switch_margin_db
+        self.update_interval = update_interval_ms / 1000
+        self.stale_after = stale_after_ms / 1000
+
+        self.levels: Dict[str, float] = {}
+        self.last_seen: Dict[str, float] = {}
+        self.active: List[str] = []
+        self._last_ranking = 0.0
+
+        # Counters
+        self.changes = 0
+
+    def update(self, sender_id: str, level: float, now: Optional[float] = None) -> bool:
+        """Feeds one frame's level. Returns True if the active set changed."""
+        now = time.monotonic() if now is None else now
+        # Fast attack, slow release: speech onsets register within a frame,
+        # while short pauses between words do not drop a speaker
+        previous = self.levels.get(sender_id, level)
+        alpha = self.attack if level > previous else self.smoothing
+        self.levels[sender_id] = previous + alpha * (level - previous)
+        self.last_seen[sender_id] = now
+
+        # A free seat is filled right away so the first syllable is not lost;
+        # otherwise the ranking is only refreshed on its interval.
+        free_seat = len(self.active) < self.k and level >= self.speech_threshold_db and sender_id not in self.active
+        if not free_seat and now - self._last_ranking < self.update_interval:
+            return False
+        self._last_ranking = now
+        return self._rerank(now)
+
+    def is_active(self, sender_id: str) -> bool:
+        return sender_id in self.active
+
+    def remove(self, sender_id: str) -> bool:
+        self.levels.pop(sender_id, None)
+        self.last_seen.pop(sender_id, None)
+        if sender_id in self.active:
+            self.active.remove(sender_id)
+            self.changes += 1
+            return True
+        return False
+
+    def _current_level(self, sender_id: str, now: float) -> float:
+        # Senders that stopped sending (e.g. DTX) count as silent
+        if now - self.last_seen.get(sender_id, 0.0) > self.stale_after:
+            return SILENCE_DB
+        return self.levels[sender_id]
+
+    def _rerank(self, now: float) -> bool:
+        speaking = {
+            sid: self._current_level(sid, now) for sid in self.levels
+        }
+        speaking = {sid: lvl for sid, lvl in speaking.items() if lvl >= self.speech_threshold_db}
+
+        # Incumbents keep their place while still speaking
+        active = [sid for sid in self.active if sid in speaking]
+        challengers = sorted(
+            (sid for sid in speaking if sid not in active),
+            key=lambda sid: speaking[sid], reverse=True
+        )
+        for sid in challengers:
+            if len(active) < self.k:
+                active.append(sid)
+                continue
+            weakest = min(active, key=lambda a: speaking[a])
+            if speaking[sid] > speaking[weakest] + self.switch_margin_db:
+                active[active.index(weakest)] = sid
+
+        active.sort(key=lambda sid: speaking[sid], reverse=True)
+        changed = set(active) != set(self.active)
+        self.active = active
+        if changed:
+            self.changes += 1
+        return changed
+
+    def stats(self) -> dict:
+        return {
+            "k": self.k,
+            "active": list(self.active),
+            "tracked": len(self.levels),
+            "changes": self.changes,
+        }
@@ -0,0 +1,147 @@
+import asyncio
+import time
+import uuid
+from typing import AsyncGenerator, Dict, List, Set
+import numpy as np
+from app.core.config import settings
+from app.core.protocol import AudioCodec
+from app.services.audio import AudioFrame, JitterBuffer
+from app.services.resampler import AudioConverter
+from app.services.queues import AgentInputQueue
+from app.services.transcoder import opus_transcoder
+
+class AgentAudioFeed:
+    """
+    Turns an agent's input queue into one steady stream, one frame per period.
+    Each sender's audio is first converted to the agent's rate and format (mono int16),
+    then goes through its own JitterBuffer; every tick pops one frame from each
+    (concealing gaps) and mixes them, so STT sees an even 20ms cadence no matter
+    how the network delivered the audio. Ticks where every sender is idle yield nothing.
+    Opus senders are buffered as packets and decoded after the jitter buffer, in
+    sequence order, on the Opus thread pool; a missing packet is concealed with Opus PLC.
+    """
+    def __init__(self, input_queue: AgentInputQueue,
+                 frame_duration_ms: int = settings.FRAME_DURATION_MS,
+                 sample_rate: int = settings.SAMPLE_RATE,
+                 idle_timeout: float = 10.0):
+        self.input_queue = input_queue
+        self.frame_duration_ms = frame_duration_ms
+        self.sample_rate = sample_rate
+        self.frame_samples = sample_rate * frame_duration_ms // 1000
+        self.idle_timeout = idle_timeout # Forget a sender's buffer after this long without audio
+        self.buffers: Dict[str, JitterBuffer] = {}
+        self.converters: Dict[str, AudioConverter] = {}
+        self.last_seen: Dict[str, float] = {}
+        self.opus_senders: Set[str] = set()
+        self._codec_prefix = f"feed-{uuid.uuid4().hex[:8]}/" # Decoder state is per feed and sender
+        self.ticks = 0
+        self.silent_ticks = 0
+
+    def _buffer_for(self, sender_id: str) -> JitterBuffer:
+        buffer = self.buffers.get(sender_id)
+        if buffer is None:
+            # Opus gaps come back empty and are concealed by the decoder (see _decode)
+            concealment = JitterBuffer.CONCEAL_NONE if sender_id in self.opus_senders else JitterBuffer.CONCEAL_REPEAT
+            buffer = self.buffers[sender_id] = JitterBuffer(
+                frame_duration_ms=self.frame_duration_ms, sample_rate=self.sample_rate,
+                concealment=concealment
+            )
+        return buffer
+
+    async def frames(self) -> AsyncGenerator[AudioFrame, None]:
+        loop = asyncio.get_running_loop()
+        period = self.frame_duration_ms / 1000
+        start = time.monotonic()
+        next_tick = loop.time()
+        while True:
+            next_tick += period
+            delay = next_tick - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            elif delay < -5 * period:
+                # The consumer stalled; resync instead of bursting
+                next_tick = loop.time()
+
+            now = time.monotonic()
+            for frame in self.input_queue.drain():
+                if frame.codec == AudioCodec.OPUS:
+                    self.opus_senders.add(frame.sender_id)
+                    audio = frame.audio_frame # The packet; decoded once it is its turn to play
+                else:
+                    audio = self._convert(frame.sender_id, frame.audio_frame)
+                self._buffer_for(frame.sender_id).push(frame.seq, audio, frame.received_at)
+                self.last_seen[frame.sender_id] = now
+            self._forget_idle(now)
+
+            self.ticks += 1
+            timestamp = int((now - start) * 1000)
+            frames = []
+            decoding = []
+            for sender_id, buffer in self.buffers.items():
+                frame = buffer.pop()
+                if frame is None:
+                    continue
+                if sender_id in self.opus_senders:
+                    decoding.append(self._decode(sender_id, frame))
+                else:
+                    frames.append(frame)
+            if decoding:
+                # One tick's packets for all senders go to the pool as one batch
+                frames.extend(await asyncio.gather(*decoding))
+            if not frames:
+                self.silent_ticks += 1
+                continue
+            yield self._mix(frames, timestamp)
+
+    async def _decode(self, sender_id: str, packet: AudioFrame) -> AudioFrame:
+        key = self._codec_prefix + sender_id
+        if packet.data:
+            pcm = await opus_transcoder.decode(key, packet.data)
+        else:
+            pcm = await opus_transcoder.conceal(key)
+        return AudioFrame(pcm or bytes(self.frame_samples * 2), packet.timestamp, self.frame_duration_ms)
+
+    def _convert(self, sender_id: str, frame: AudioFrame) -> AudioFrame:
+        if frame.sample_rate == self.sample_rate and frame.channels == 1:
+            return frame
+        converter = self.converters.get(sender_id)
+        if converter is None:
+            converter = self.converters[sender_id] = AudioConverter(
+                frame.sample_rate, self.sample_rate, channels=frame.channels
+            )
+        return AudioFrame(converter.convert(frame.data), frame.timestamp, frame.duration_ms, self.sample_rate)
+
+    def _mix(self, frames: List[AudioFrame], timestamp: int) -> AudioFrame:
+        if len(frames) == 1:
+            return frames[0]
+        stack = np.zeros((len(frames), self.frame_samples), dtype=np.int32)
+        for row, frame in enumerate(frames):
+            usable = min(len(frame.data) // 2, self.frame_samples)
+            stack[row, :usable] = np.frombuffer(frame.data, dtype="<i2", count=usable)
+        mixed = np.clip(stack.sum(axis=0), -32768, 32767).astype("<i2")
+        return AudioFrame(mixed.tobytes(), timestamp, self.frame_duration_ms)
+
+    def _forget_idle(self, now: float):
+        for sender_id, seen in list(self.last_seen.items()):
+            if now - seen > self.idle_timeout and not self.buffers[sender_id].playing:
+                del self.buffers[sender_id]
+                self.converters.pop(sender_id, None)
+                del self.last_seen[sender_id]
+                self._release(sender_id)
+
+    def _release(self, sender_id: str):
+        if sender_id in self.opus_senders:
+            self.opus_senders.discard(sender_id)
+            opus_transcoder.release(self._codec_prefix + sender_id)
+
+    def close(self):
+        """Frees the per-sender Opus decoders."""
+        for sender_id in list(self.opus_senders):
+            self._release(sender_id)
+
+    def stats(self) -> dict:
+        return {
+            "ticks": self.ticks,
+            "silent_ticks": self.silent_ticks,
+            "senders": {sender_id: buffer.stats() for sender_id, buffer in self.buffers.items()},
+        }
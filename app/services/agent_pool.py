@@ -0,0 +1,119 @@
+import asyncio
+import uuid
+from collections import deque
+from typing import Deque, Dict, List, Optional
+from app.core.config import settings
+from app.core.logging import logger
+from app.models.room import VirtualParticipant
+from app.services.agent_feed import AgentAudioFeed
+from app.services.ai.base import AIAgentBase
+from app.services.ai_service import agent_manager
+from app.services.queues import AgentInputQueue
+
+class PreparedAgent:
+    """Everything an agent needs in a room except the room, built ahead of time."""
+    def __init__(self, agent_name: str, agent: AIAgentBase, participant: VirtualParticipant,
+                 feed: AgentAudioFeed, session: Optional[object]):
+        self.agent_name = agent_name
+        self.agent = agent
+        self.participant = participant
+        self.feed = feed
+        self.session = session # Agent-specific conversation state (see AIAgentBase.new_session)
+
+class AgentPool:
+    """
+    Ready-to-attach agents, per agent name.
+    Attaching a pooled agent is a room join plus a task start; building one
+    (participant, queues, audio feed, conversation session with its VAD) happens
+    in the background. Each pool is refilled up to its target, which starts at
+    `min_size` and grows by one per miss, up to `max_size`.
+    Provider connections are shared by all sessions and warmed at startup
+    (AIAgentBase.warm_up).
+    """
+    def __init__(self, min_size: int = settings.AGENT_POOL_MIN, max_size: int = settings.AGENT_POOL_MAX):
+        self.min_size = min_size
+        self.max_size = max(min_size, max_size)
+        self.ready: Dict[str, Deque[PreparedAgent]] = {}
+        self.targets: Dict[str, int] = {}
+        self._refills: Dict[str, asyncio.Task] = {}
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.built = 0
+        self.start_delays: Deque[float] = deque(maxlen=100) # Agent requested to its first output frame sent, ms
+
+    def start(self, agent_names: List[str]):
+        for name in agent_names:
+            self._schedule_refill(name)
+
+    async def stop(self):
+        for task in self._refills.values():
+            task.cancel()
+        self._refills.clear()
+        self.ready.clear()
+
+    def take(self, agent_name: str) -> PreparedAgent:
+        pool = self.ready.get(agent_name)
+        if pool:
+            self.hits += 1
+            prepared = pool.popleft()
+        else:
+            # Cold path: build inline, and keep more ready next time
+            self.misses += 1
+            self.targets[agent_name] = min(self.targets.get(agent_name, self.min_size) + 1, self.max_size)
+            prepared = self.prepare(agent_name)
+        self._schedule_refill(agent_name)
+        return prepared
+
+    def prepare(self, agent_name: str) -> PreparedAgent:
+        agent = agent_manager.get_agent(agent_name)
+        agent_id = f"agent-{uuid.uuid4().hex[:6]}"
+        username = f"AI-{agent_name}"
+        input_queue = AgentInputQueue(
+            username,
+            max_frames=settings.AGENT_INPUT_QUEUE_FRAMES,
+            max_bytes=settings.AGENT_INPUT_MAX_BYTES,
+            max_lag_ms=settings.AGENT_INPUT_MAX_LAG_MS,
+            warn_lag_ms=settings.AGENT_LAG_WARN_MS,
+        )
+        participant = VirtualParticipant(agent_id, username, input_queue)
+        # Per-sender jitter buffers turn the queued frames into a steady 20ms stream
+        feed = AgentAudioFeed(input_queue)
+        self.built += 1
+        return PreparedAgent(agent_name, agent, participant, feed, agent.new_session())
+
+    def record_start(self, delay_ms: float):
+        self.start_delays.append(delay_ms)
+
+    def _schedule_refill(self, agent_name: str):
+        task = self._refills.get(agent_name)
+        if task is None or task.done():
+            self._refills[agent_name] = asyncio.create_task(self._refill(agent_name))
+
+    async def _refill(self, agent_name: str):
+        pool = self.ready.setdefault(agent_name, deque())
+        self.targets.setdefault(agent_name, self.min_size)
+        try:
+            while len(pool) < self.targets[agent_name]:
+                pool.append(self.prepare(agent_name))
+                await asyncio.sleep(0) # One build per loop iteration; rooms keep their time
+        except Exception as e:
+            logger.error(f"Agent pool refill failed for {agent_name}: {e}")
+
+    def stats(self) -> dict:
+        delays = sorted(self.start_delays)
+        return {
+            "ready": {name: len(pool) for name, pool in self.ready.items()},
+            "targets": dict(self.targets),
+            "hits": self.hits,
+            "misses": self.misses,
+            "built": self.built,
+            "start_ms": {
+                "last": round(self.start_delays[-1], 1) if delays else None,
+                "p50": round(delays[len(delays) // 2], 1) if delays else None,
+                "max": round(delays[-1], 1) if delays else None,
+            },
+        }
+
+agent_pool = AgentPool()
@@ -1,13 +1,23 @@
 from abc import ABC, abstractmethod
-from typing import AsyncGenerator
+from typing import AsyncGenerator, Optional
 from app.services.audio import AudioFrame
 
+class AgentInterrupt:
+    """
+    Yielded by an agent in place of an audio frame when the user barges in:
+    the response was cancelled, and audio already handed out should be flushed.
+    """
+    def __init__(self, reason: str = "barge_in"):
+        self.reason = reason
+
 class AIAgentBase(ABC):
     @abstractmethod
-    async def process_audio_stream(self, audio_stream: AsyncGenerator[AudioFrame, None]) -> AsyncGenerator[AudioFrame, None]:
+    async def process_audio_stream(self, audio_stream: AsyncGenerator[AudioFrame, None],
+                                   session: Optional[object] = None) -> AsyncGenerator[AudioFrame, None]:
         """
         Consumes an audio stream (user speech) and yields an audio stream (agent response).
-        This is the high-level bidirectional loop.
+        This is the high-level bidirectional loop. `session` is one built earlier by
+        new_session(); without it the agent builds its own.
         """
         pass
     
@@ -17,3 +27,15 @@ class AIAgentBase(ABC):
         Consumes text (transcribed) and yields text (response).
         """
         pass
+
+    def new_session(self) -> Optional[object]:
+        """Per-conversation state that can be built ahead of time (see AgentPool)."""
+        return None
+
+    async def warm_up(self):
+        """Called once at startup, e.g. to connect providers and load audio assets."""
+        pass
+
+    def stats(self) -> dict:
+        """Agent-level counters for the stats endpoint."""
+        return {}
@@ -0,0 +1,141 @@
+import asyncio
+import time
+from collections import deque
+from typing import TYPE_CHECKING, Deque, Dict, List, Optional
+from app.core.config import settings
+from app.core.logging import logger
+
+if TYPE_CHECKING:
+    from app.services.ai.interfaces import LLMService
+
+Message = Dict[str, str]
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token for English), no tokenizer needed."""
+    return len(text) // 4 + 1
+
+class ConversationContext:
+    """
+    Conversation memory for one session, kept under a token budget.
+    Recent turns are passed to the LLM verbatim. When they exceed `token_budget`,
+    the oldest are moved out (whole user/assistant exchanges, down to
+    `low_water` of the budget, so this does not happen on every turn) and folded
+    into a running summary by a background task. Until that summary is ready the
+    moved turns are still sent as they are, so nothing is lost and no turn waits
+    on summarization. The summary is kept and extended, never rebuilt.
+    If summarization fails (an error or an empty summary) the old summary stays and
+    the moved turns wait in `aging` for the next attempt; past `token_budget` of
+    them, the oldest are dropped, so the prompt stays bounded while the LLM is down.
+    """
+    def __init__(self, llm: "LLMService", token_budget: int = settings.LLM_CONTEXT_TOKEN_BUDGET,
+                 low_water: float = settings.LLM_CONTEXT_LOW_WATER,
+                 keep_messages: int = settings.LLM_CONTEXT_KEEP_MESSAGES):
+        self.llm = llm
+        self.token_budget = token_budget
+        self.low_water = low_water
+        self.keep_messages = keep_messages # Never moved out, whatever their size
+        self.summary = ""
+        self.summary_tokens = 0
+        self.recent: Deque[Message] = deque()
+        self.recent_tokens = 0
+        self.aging: List[Message] = [] # Moved out of the window, not yet in the summary
+        self.aging_tokens = 0
+        self.version = 0 # Bumped on every add(); tells callers the messages changed
+        self._summarizing: Optional[asyncio.Task] = None
+
+        # Counters
+        self.summaries = 0
+        self.summary_failures = 0
+        self.summarized_messages = 0
+        self.dropped_messages = 0 # Aged out and never summarized
+        self.summary_ms = 0.0 # Total, background
+
+    def add(self, role: str, content: str):
+        self.recent.append({"role": role, "content": content})
+        self.recent_tokens += self.llm.count_tokens(content)
+        self.version += 1
+        if self.tokens > self.token_budget:
+            self._age_out()
+
+    def messages(self) -> List[Message]:
+        """History for LLMService.chat_stream: the summary (if any), then the turns not in it."""
+        messages: List[Message] = []
+        if self.summary:
+            messages.append({"role": "system", "content": self.summary})
+        messages.extend(self.aging)
+        messages.extend(self.recent)
+        return messages
+
+    @property
+    def tokens(self) -> int:
+        return self.summary_tokens + self.aging_tokens + self.recent_tokens
+
+    def _age_out(self):
+        target = self.token_budget * self.low_water - self.summary_tokens
+        while len(self.recent) > self.keep_messages and self.recent_tokens > target:
+            # Whole exchanges, so the window never starts with an answer
+            message = self.recent.popleft()
+            self._move(message)
+            if message["role"] == "user" and self.recent and self.recent[0]["role"] == "assistant":
+                self._move(self.recent.popleft())
+        dropped = 0
+        while self.aging and self.aging_tokens > self.token_budget:
+            # Summaries keep failing; the batch in flight (a copy) is unaffected
+            message = self.aging.pop(0)
+            self.aging_tokens -= self.llm.count_tokens(message["content"])
+            dropped += 1
+        if dropped:
+            self.dropped_messages += dropped
+            logger.warning(f"Conversation summaries are failing; dropped the {dropped} oldest messages")
+        if self.aging and (self._summarizing is None or self._summarizing.done()):
+            self._summarizing = asyncio.create_task(self._summarize())
+
+    def _move(self, message: Message):
+        tokens = self.llm.count_tokens(message["content"])
+        self.recent_tokens -= tokens
+        self.aging.append(message)
+        self.aging_tokens += tokens
+
+    async def _summarize(self):
+        # Loops while add() keeps moving turns out during a summarization
+        while self.aging:
+            batch = list(self.aging)
+            started = time.monotonic()
+            try:
+                summary = await self.llm.summarize(self.summary, batch)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # The turns stay in `aging` and are retried the next time turns age out
+                self.summary_failures += 1
+                logger.error(f"Conversation summary failed: {e}")
+                return
+            summary = summary.strip()
+            if not summary:
+                # Keeping the old summary beats wiping what the conversation has covered
+                self.summary_failures += 1
+                logger.error("Conversation summary failed: the LLM returned an empty summary")
+                return
+            self.summary_ms += (time.monotonic() - started) * 1000
+            self.summaries += 1
+            self.summarized_messages += len(batch)
+            self.summary = summary
+            self.summary_tokens = self.llm.count_tokens(summary)
+            # By identity: add() may have dropped some of the batch meanwhile
+            summarized = {id(m) for m in batch}
+            self.aging = [m for m in self.aging if id(m) not in summarized]
+            self.aging_tokens = sum(self.llm.count_tokens(m["content"]) for m in self.aging)
+            logger.debug(f"Conversation summary updated: {len(batch)} messages in, "
+                         f"{self.summary_tokens} tokens, {self.tokens} tokens of context")
+
+    def close(self):
+        if self._summarizing is not None:
+            self._summarizing.cancel()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "context_summaries": self.summaries,
+            "context_summary_failures": self.summary_failures,
+            "context_summarized_messages": self.summarized_messages,
+            "context_dropped_messages": self.dropped_messages,
+        }
@@ -1,40 +1,401 @@
 import asyncio
-from typing import AsyncGenerator
-from app.services.ai.base import AIAgentBase
-from app.services.ai.interfaces import STTService, LLMService, TTSService
+import re
+import time
+from collections import deque
+from typing import AsyncGenerator, Callable, Deque, Dict, List, Optional, Union
+from app.core.config import settings
+from app.services.ai.base import AIAgentBase, AgentInterrupt
+from app.services.ai.context import ConversationContext
+from app.services.ai.endpointing import EndOfTurnDetector, UserTurn
+from app.services.ai.fillers import FillerBank
+from app.services.ai.interfaces import STTService, LLMService, TTSService, Transcript
+from app.services.ai.vad import EnergySpectralVAD, VADGate, VoiceActivityDetector
 from app.services.audio import AudioFrame
 from app.core.logging import logger
 
+def _summary(values: Deque[float]) -> Dict[str, Optional[float]]:
+    ordered = sorted(values)
+    return {
+        "last": round(values[-1], 1) if values else None,
+        "p50": round(ordered[len(ordered) // 2], 1) if values else None,
+        "max": round(ordered[-1], 1) if values else None,
+    }
+
+def _same_utterance(a: str, b: str) -> bool:
+    # Finals often differ from interims only in case and punctuation
+    return re.sub(r"[^\w\s]", "", a).casefold().split() == re.sub(r"[^\w\s]", "", b).casefold().split()
+
+class Speculation:
+    """
+    LLM output generated ahead of the end of a turn, from a stable interim transcript.
+    Chunks are buffered until the turn ends; then they are either replayed and
+    continued (the final text matched) or the generation is cancelled.
+    """
+    def __init__(self, llm: LLMService, text: str, context: ConversationContext):
+        self.text = text
+        self.context_version = context.version
+        history = context.messages()
+        self.started = time.monotonic()
+        self.finished_at: Optional[float] = None
+        self.chunks: asyncio.Queue = asyncio.Queue()
+        self.task = asyncio.create_task(self._run(llm, history))
+
+    async def _run(self, llm: LLMService, history: List[Dict[str, str]]):
+        async def user_text():
+            yield self.text
+        try:
+            async for chunk in llm.chat_stream(user_text(), history=history):
+                self.chunks.put_nowait(chunk)
+        finally:
+            self.finished_at = time.monotonic()
+            self.chunks.put_nowait(None)
+
+    def matches(self, turn: UserTurn, context: ConversationContext) -> bool:
+        # A summary landing in between does not matter; a new turn does
+        return context.version == self.context_version and _same_utterance(self.text, turn.text)
+
+    def saved_ms(self, now: float) -> float:
+        """Generation time already behind us when the turn ended."""
+        until = min(now, self.finished_at) if self.finished_at is not None else now
+        return (until - self.started) * 1000
+
+    async def stream(self) -> AsyncGenerator[str, None]:
+        while True:
+            chunk = await self.chunks.get()
+            if chunk is None:
+                if not self.task.cancelled() and self.task.exception():
+                    raise self.task.exception()
+                return
+            yield chunk
+
+    def cancel(self):
+        self.task.cancel()
+
+class ConversationSession:
+    """Per-stream state of one conversation. Agents are shared, so nothing of this lives on the agent."""
+    def __init__(self, gate: Optional[VADGate], endpointer: EndOfTurnDetector, context: ConversationContext):
+        self.gate = gate
+        self.endpointer = endpointer
+        self.context = context # Earlier turns, passed to the LLM
+        self.response: Optional[asyncio.Task] = None # The answer being produced, if any
+        self.speculation: Optional[Speculation] = None # Answer started before the turn ended
+        self.playing_until = 0.0 # When the audio handed out so far is done playing (output is paced in real time)
+        self.turns = 0
+        self.interruptions = 0
+        self.stt_dropped = 0
+        self.speculation_hits = 0
+        self.speculation_misses = 0
+        self.fillers = 0
+
+    @property
+    def responding(self) -> bool:
+        return self.response is not None and not self.response.done()
+
+    def speaking(self, now: float) -> bool:
+        """An answer is being produced, or its audio is still buffered or playing downstream."""
+        return self.responding or now < self.playing_until
+
+    def stats(self) -> Dict[str, int]:
+        stats = {
+            "turns": self.turns,
+            "interruptions": self.interruptions,
+            "stt_dropped": self.stt_dropped,
+            "speculation_hits": self.speculation_hits,
+            "speculation_misses": self.speculation_misses,
+            "fillers": self.fillers,
+            **self.context.stats(),
+        }
+        if self.gate is not None:
+            stats.update({
+                "vad_segments": self.gate.segments,
+                "stt_frames_in": self.gate.frames_in,
+                "stt_frames_out": self.gate.frames_out,
+                "stt_bytes_in": self.gate.bytes_in,
+                "stt_bytes_out": self.gate.bytes_out,
+            })
+        return stats
+
 class ConversationalAgent(AIAgentBase):
-    def __init__(self, stt: STTService, llm: LLMService, tts: TTSService):
+    def __init__(self, stt: STTService, llm: LLMService, tts: TTSService,
+                 vad_factory: Optional[Callable[[], VoiceActivityDetector]] = EnergySpectralVAD,
+                 filler_phrases: Optional[List[str]] = None,
+                 filler_after_ms: int = settings.FILLER_AFTER_MS):
         self.stt = stt
         self.llm = llm
         self.tts = tts
-    
-    async def process_audio_stream(self, audio_stream: AsyncGenerator[AudioFrame, None]) -> AsyncGenerator[AudioFrame, None]:
-        # Verify the pipeline flow:
-        # Audio -> STT -> Text
-        # Text -> LLM -> Text Stream
-        # Text Stream -> TTS -> Audio
-        
-        # We need to bridge these generators.
-        # Since they are all async generators consuming generators, we can chain them directly?
-        # STT consumes audio_stream, yields text.
-        
-        # 1. Transcribe
-        text_stream = self.stt.transcribe(audio_stream)
-        
-        # 2. LLM Chat
-        # Note: LLM usually expects a conversation history, but for streaming we might just pipe stt output.
-        # A more complex agent would manage context here.
-        # But `chat_stream` interface consumes a generator.
-        response_text_stream = self.llm.chat_stream(text_stream)
-        
-        # 3. TTS
-        response_audio_stream = self.tts.synthesize(response_text_stream)
-        
-        async for frame in response_audio_stream:
-            yield frame
+        # Filler clips mask dead air before the first audio of an answer; [] disables them
+        if filler_phrases is None:
+            filler_phrases = settings.FILLER_PHRASES if settings.FILLER_ENABLED else []
+        self.fillers = FillerBank(filler_phrases) if filler_phrases else None
+        self.filler_after = filler_after_ms / 1000
+        # One detector per session (it keeps state); None sends everything to STT
+        self.vad_factory = vad_factory if settings.VAD_ENABLED else None
+        self.sessions: List[ConversationSession] = [] # Live sessions
+        self.totals: Dict[str, int] = {} # Finished sessions
+        # Recent turns, ms
+        self.endpoint_delays: Deque[float] = deque(maxlen=100) # End of speech to end of turn
+        self.first_token_delays: Deque[float] = deque(maxlen=100) # End of turn to first LLM text
+        self.first_audio_delays: Deque[float] = deque(maxlen=100) # End of turn to first audio frame
+        self.speculation_saved: Deque[float] = deque(maxlen=100) # LLM time hidden by speculation hits
+        self.filler_gaps: Deque[float] = deque(maxlen=100) # Silence covered by a filler, end of turn to answer audio
+
+    def new_session(self) -> ConversationSession:
+        gate = VADGate(self.vad_factory()) if self.vad_factory is not None else None
+        return ConversationSession(gate, EndOfTurnDetector(use_vad=gate is not None), self.llm.new_context())
+
+    async def warm_up(self):
+        # Connect provider channels (and finish TLS) before the first call, then
+        # synthesize the filler clips, which also warms the TTS path
+        await asyncio.gather(self.stt.warm_up(), self.llm.warm_up(), self.tts.warm_up())
+        if self.fillers is not None:
+            await self.fillers.load(self.tts)
+
+    async def process_audio_stream(self, audio_stream: AsyncGenerator[AudioFrame, None],
+                                   session: Optional[ConversationSession] = None) -> AsyncGenerator[Union[AudioFrame, AgentInterrupt], None]:
+        # Audio -> (VAD gate) -> STT -> end-of-turn -> LLM -> TTS -> Audio
+        # Audio and transcripts are consumed by their own tasks, so listening never
+        # waits on the response side, and a turn reaches the LLM as soon as it ends.
+        # Each answer runs as its own task so the user can cut it off (barge-in).
+        session = session or self.new_session()
+        gate = session.gate
+        self.sessions.append(session)
+        barge_in_frames = max(1, settings.BARGE_IN_MIN_SPEECH_MS // settings.FRAME_DURATION_MS)
+        period = settings.FRAME_DURATION_MS / 1000
+        last_audio = time.monotonic()
+
+        stt_input: asyncio.Queue = asyncio.Queue(maxsize=settings.AGENT_INPUT_QUEUE_FRAMES)
+        turns: asyncio.Queue = asyncio.Queue()
+        output: asyncio.Queue = asyncio.Queue(maxsize=settings.AGENT_OUTPUT_QUEUE_FRAMES)
+
+        async def stt_audio():
+            while True:
+                frame = await stt_input.get()
+                if frame is None:
+                    return
+                yield frame
+
+        def to_stt(frame: AudioFrame):
+            try:
+                stt_input.put_nowait(frame)
+            except asyncio.QueueFull:
+                session.stt_dropped += 1 # STT is stalled; it must not hold up endpointing
+
+        def check_turn(now: float):
+            turn = session.endpointer.poll(now)
+            if turn is not None:
+                self._record_turn(session, turn)
+                turns.put_nowait(turn)
+            elif settings.SPECULATION_ENABLED and not session.responding:
+                speculate(now)
+
+        def speculate(now: float):
+            # Start (or restart) the answer on a hypothesis that has stopped changing
+            text = session.endpointer.stable_text(now, settings.SPECULATION_STABLE_MS / 1000)
+            if text is None:
+                return
+            current = session.speculation
+            if current is not None:
+                if current.text == text:
+                    return
+                current.cancel()
+                session.speculation_misses += 1
+            session.speculation = Speculation(self.llm, text, session.context)
+            logger.debug(f"Speculating on '{text}'")
+
+        async def emit(frame: AudioFrame):
+            await output.put(frame)
+            # Everything downstream (this queue, the room's pacer) drains in real time,
+            # so this frame has played once everything queued ahead of it has
+            session.playing_until = max(session.playing_until, time.monotonic()) + frame.duration_ms / 1000
+
+        def interrupt():
+            # Stop producing, drop what was produced but not yet handed out, tell the room
+            # (which flushes what it still holds)
+            if session.response is not None:
+                session.response.cancel()
+            session.playing_until = 0.0
+            session.interruptions += 1
+            while not output.empty():
+                output.get_nowait()
+            output.put_nowait(AgentInterrupt())
+            logger.info("User barged in; agent response cancelled")
+
+        async def pump():
+            # Audio in: gate for STT, VAD state for endpointing and barge-in
+            nonlocal last_audio
+            try:
+                async for frame in audio_stream:
+                    now = last_audio = time.monotonic()
+                    if gate is None:
+                        to_stt(frame)
+                        continue
+                    for out in gate.process(frame):
+                        to_stt(out)
+                    session.endpointer.on_vad(gate.speech, now)
+                    # The answer task ends once its last frame is queued; what it queued can
+                    # still be playing for seconds, and cutting that off is a barge-in too
+                    if (settings.BARGE_IN_ENABLED and gate.speech_run >= barge_in_frames
+                            and session.speaking(now)):
+                        interrupt()
+                    check_turn(now)
+            except Exception as e:
+                logger.error(f"Agent audio input failed: {e}")
+            finally:
+                # Ends STT, which ends the conversation
+                await stt_input.put(None)
+
+        async def listen():
+            try:
+                async for result in self.stt.transcribe(stt_audio()):
+                    if isinstance(result, str):
+                        result = Transcript(result)
+                    now = time.monotonic()
+                    session.endpointer.on_transcript(result.text, result.is_final, now)
+                    check_turn(now)
+            except Exception as e:
+                logger.error(f"STT failed; ending the conversation: {e}")
+            finally:
+                await turns.put(None)
+
+        async def tick():
+            # Turns also end while nothing arrives: the feed yields nothing on silent
+            # ticks, and transcripts stop once the user does
+            while True:
+                await asyncio.sleep(period)
+                now = time.monotonic()
+                if gate is not None and now - last_audio > 3 * period:
+                    session.endpointer.on_vad(False, last_audio) # No audio is silence
+                check_turn(now)
+
+        async def respond(turn: UserTurn):
+            spoken: List[str] = []
+            started = time.monotonic()
+
+            async def user_text():
+                yield turn.text
+
+            async def tap(text_stream):
+                # Keep what the LLM said, so history matches what was (about to be) spoken
+                async for chunk in text_stream:
+                    if not spoken:
+                        self.first_token_delays.append((time.monotonic() - started) * 1000)
+                    spoken.append(chunk)
+                    yield chunk
+
+            history = session.context.messages()
+            first_audio = True
+            filler_playing = False
+
+            async def filler():
+                # Dead air past the threshold: queue one short clip. The answer's first
+                # frame waits for it, so the two never overlap.
+                nonlocal filler_playing
+                await asyncio.sleep(self.filler_after)
+                clip = self.fillers.pick()
+                if clip is None:
+                    return
+                filler_playing = True
+                session.fillers += 1
+                for frame in clip:
+                    await emit(frame)
+
+            filler_task = (asyncio.create_task(filler())
+                           if self.fillers is not None and self.fillers.ready else None)
+            speculation, session.speculation = session.speculation, None
+            if speculation is not None and speculation.matches(turn, session.context):
+                session.speculation_hits += 1
+                saved = speculation.saved_ms(started)
+                self.speculation_saved.append(saved)
+                logger.info(f"Speculation hit for '{turn.text}' ({saved:.0f}ms of LLM time hidden)")
+                llm_stream = speculation.stream()
+            else:
+                if speculation is not None:
+                    speculation.cancel()
+                    session.speculation_misses += 1
+                llm_stream = self.llm.chat_stream(user_text(), history=history)
+            try:
+                text_stream = tap(llm_stream)
+                async for frame in self.tts.synthesize(text_stream):
+                    if first_audio:
+                        first_audio = False
+                        delay = (time.monotonic() - started) * 1000
+                        self.first_audio_delays.append(delay)
+                        if filler_task is not None:
+                            if filler_playing:
+                                await filler_task # Hand off after the clip, not across it
+                                self.filler_gaps.append(delay)
+                            else:
+                                filler_task.cancel()
+                        logger.info(f"First audio {delay:.0f}ms after end of turn "
+                                    f"({turn.endpoint_delay_ms + delay:.0f}ms after speech)")
+                    await emit(frame)
+            finally:
+                if filler_task is not None:
+                    filler_task.cancel()
+                if speculation is not None:
+                    speculation.cancel() # No-op once finished; stops it if the answer was cut off
+                session.context.add("user", turn.text)
+                if spoken:
+                    session.context.add("assistant", "".join(spoken).strip())
+
+        async def converse():
+            # One answer at a time; a new turn waits for (or follows the cancellation of) the last
+            try:
+                while True:
+                    turn = await turns.get()
+                    if turn is None:
+                        break
+                    session.response = asyncio.create_task(respond(turn))
+                    # asyncio.wait does not propagate a barge-in cancellation of the answer to us
+                    await asyncio.wait([session.response])
+                    if not session.response.cancelled() and session.response.exception():
+                        logger.error(f"Agent response failed: {session.response.exception()}")
+            finally:
+                if session.responding:
+                    session.response.cancel()
+            await output.put(None)
+
+        tasks = [asyncio.create_task(pump()), asyncio.create_task(listen()),
+                 asyncio.create_task(tick()), asyncio.create_task(converse())]
+        try:
+            while True:
+                item = await output.get()
+                if item is None:
+                    return
+                yield item
+        finally:
+            for task in tasks:
+                task.cancel()
+            if session.speculation is not None:
+                session.speculation.cancel()
+            session.context.close()
+            self.sessions.remove(session)
+            for key, value in session.stats().items():
+                self.totals[key] = self.totals.get(key, 0) + value
+            if gate is not None:
+                logger.info(f"VAD gate passed {gate.bytes_out}/{gate.bytes_in} bytes to STT "
+                            f"({gate.segments} speech segments, {session.turns} turns)")
+
+    def _record_turn(self, session: ConversationSession, turn: UserTurn):
+        session.turns += 1
+        self.endpoint_delays.append(turn.endpoint_delay_ms)
+        logger.info(f"User turn ended ({turn.reason}) {turn.endpoint_delay_ms:.0f}ms after speech: '{turn.text}'")
+
+    def stats(self) -> dict:
+        totals = dict(self.totals)
+        for session in self.sessions:
+            for key, value in session.stats().items():
+                totals[key] = totals.get(key, 0) + value
+        totals["endpoint_delay_ms"] = _summary(self.endpoint_delays)
+        totals["time_to_first_token_ms"] = _summary(self.first_token_delays)
+        totals["time_to_first_audio_ms"] = _summary(self.first_audio_delays)
+        totals["speculation_saved_ms"] = _summary(self.speculation_saved)
+        totals["filler_gap_ms"] = _summary(self.filler_gaps)
+        tts = self.tts.stats()
+        if tts:
+            totals["tts"] = tts
+        totals["sessions"] = len(self.sessions)
+        return totals
 
     async def process_text_stream(self, text_stream: AsyncGenerator[str, None]) -> AsyncGenerator[str, None]:
         # Text-only mode fallback
@@ -1,4 +1,4 @@
-from typing import AsyncGenerator
+from typing import AsyncGenerator, Optional
 from app.services.ai.base import AIAgentBase
 from app.services.audio import AudioFrame
 from app.core.logging import logger
@@ -8,7 +8,8 @@ class EchoAgent(AIAgentBase):
     Simple agent that echoes back the audio it receives, possibly with a delay.
     Useful for testing latency and pipeline.
     """
-    async def process_audio_stream(self, audio_stream: AsyncGenerator[AudioFrame, None]) -> AsyncGenerator[AudioFrame, None]:
+    async def process_audio_stream(self, audio_stream: AsyncGenerator[AudioFrame, None],
+                                   session: Optional[object] = None) -> AsyncGenerator[AudioFrame, None]:
         logger.info("EchoAgent started processing stream")
         async for frame in audio_stream:
             # Pass through audio
@@ -0,0 +1,101 @@
+from dataclasses import dataclass
+from typing import Optional
+from app.core.config import settings
+
+@dataclass
+class UserTurn:
+    text: str
+    reason: str # "stable", "final" or "timeout"
+    endpoint_delay_ms: float # From the end of speech (VAD) to the turn being handed to the LLM
+
+class EndOfTurnDetector:
+    """
+    Decides when the user has finished speaking, ahead of the STT provider's final.
+    A turn ends once VAD has seen at least `min_silence_ms` of silence and either
+    the STT hypothesis has not changed for `stable_ms`, the provider sent a final,
+    or the silence reached `max_silence_ms`. One instance per session.
+    Without VAD input (`use_vad=False`) only provider finals end a turn.
+    """
+    def __init__(self, min_silence_ms: int = settings.EOT_MIN_SILENCE_MS,
+                 stable_ms: int = settings.EOT_STABLE_MS,
+                 max_silence_ms: int = settings.EOT_MAX_SILENCE_MS,
+                 use_vad: bool = True):
+        self.min_silence = min_silence_ms / 1000
+        self.stable = stable_ms / 1000
+        self.max_silence = max_silence_ms / 1000
+        self.use_vad = use_vad
+
+        self.in_speech = False
+        self.speech_end_at: Optional[float] = None
+        self.committed = "" # Finals received so far in this turn
+        self.interim = ""
+        self.final = False # Latest hypothesis is a provider final
+        self.changed_at = 0.0
+        self.waiting_for_speech = False # Ignore late transcripts of a turn already ended
+
+    @property
+    def text(self) -> str:
+        return " ".join(part for part in (self.committed, self.interim) if part)
+
+    def on_vad(self, speech: bool, now: float):
+        if speech:
+            self.in_speech = True
+            self.speech_end_at = None
+            self.waiting_for_speech = False
+        elif self.in_speech:
+            self.in_speech = False
+            self.speech_end_at = now
+
+    def on_transcript(self, text: str, is_final: bool, now: float):
+        if self.waiting_for_speech:
+            return
+        text = text.strip()
+        if is_final:
+            self.committed = " ".join(part for part in (self.committed, text) if part)
+            self.interim = ""
+        elif text != self.interim:
+            self.interim = text
+        else:
+            return
+        self.final = is_final
+        self.changed_at = now
+
+    def stable_text(self, now: float, stable_s: float) -> Optional[str]:
+        """
+        The turn's text so far, if it looks finished but the turn has not ended yet:
+        the hypothesis unchanged for `stable_s` and (with VAD) the user silent.
+        """
+        if not self.text or self.waiting_for_speech or now - self.changed_at < stable_s:
+            return None
+        if self.use_vad and (self.in_speech or self.speech_end_at is None):
+            return None
+        return self.text
+
+    def poll(self, now: float) -> Optional[UserTurn]:
+        """Returns the finished turn, at most once per turn."""
+        if not self.text:
+            return None
+        if not self.use_vad:
+            return self._finish("final", 0.0) if self.final else None
+        if self.in_speech or self.speech_end_at is None:
+            return None
+        silence = now - self.speech_end_at
+        if silence < self.min_silence:
+            return None
+        if self.final:
+            reason = "final"
+        elif now - self.changed_at >= self.stable:
+            reason = "stable"
+        elif silence >= self.max_silence:
+            reason = "timeout"
+        else:
+            return None
+        return self._finish(reason, silence * 1000)
+
+    def _finish(self, reason: str, delay_ms: float) -> UserTurn:
+        turn = UserTurn(self.text, reason, delay_ms)
+        self.committed = ""
+        self.interim = ""
+        self.final = False
+        self.waiting_for_speech = self.use_vad
+        return turn
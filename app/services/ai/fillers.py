@@ -0,0 +1,44 @@
+from typing import List, Optional
+from app.core.logging import logger
+from app.services.ai.interfaces import TTSService
+from app.services.audio import AudioFrame
+
+class FillerBank:
+    """
+    Short acknowledgement clips ("mm-hm", "let me check") synthesized once at startup
+    and held in memory, played while an answer is not ready yet.
+    Clips rotate so the same one is not heard twice in a row.
+    """
+    def __init__(self, phrases: List[str]):
+        self.phrases = phrases
+        self.clips: List[List[AudioFrame]] = []
+        self._next = 0
+
+    @property
+    def ready(self) -> bool:
+        return bool(self.clips)
+
+    async def load(self, tts: TTSService):
+        """Synthesizes every phrase with the agent's own voice (through its TTS cache, if any)."""
+        clips = []
+        for phrase in self.phrases:
+            async def text():
+                yield phrase
+            try:
+                # Copies, so clips do not pin provider or cache buffers
+                clip = [AudioFrame(bytes(frame.data), 0, frame.duration_ms, frame.sample_rate, frame.channels)
+                        async for frame in tts.synthesize(text())]
+            except Exception as e:
+                logger.error(f"Failed to synthesize filler '{phrase}': {e}")
+                continue
+            if clip:
+                clips.append(clip)
+        self.clips = clips
+        logger.info(f"Filler bank ready: {len(clips)}/{len(self.phrases)} clips")
+
+    def pick(self) -> Optional[List[AudioFrame]]:
+        if not self.clips:
+            return None
+        clip = self.clips[self._next % len(self.clips)]
+        self._next += 1
+        return clip
@@ -1,23 +1,67 @@
 from abc import ABC, abstractmethod
-from typing import AsyncGenerator, Optional
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, AsyncGenerator, Dict, List, Optional, Union
+from app.core.config import settings
 from app.services.audio import AudioFrame
 
+if TYPE_CHECKING:
+    from app.services.ai.context import ConversationContext
+
+@dataclass
+class Transcript:
+    text: str
+    is_final: bool = True # False for interim hypotheses that may still change
+
 class STTService(ABC):
     @abstractmethod
-    async def transcribe(self, audio_stream: AsyncGenerator[AudioFrame, None]) -> AsyncGenerator[str, None]:
+    async def transcribe(self, audio_stream: AsyncGenerator[AudioFrame, None]) -> AsyncGenerator[Union[str, Transcript], None]:
         """
         Consumes audio frames and yields transcribed text segments.
+        Plain strings are finals; yield Transcript(..., is_final=False) for interim results.
         """
         pass
 
+    async def warm_up(self):
+        """Connects to the provider ahead of the first call (channels, TLS)."""
+        pass
+
 class LLMService(ABC):
     @abstractmethod
-    async def chat_stream(self, text_stream: AsyncGenerator[str, None]) -> AsyncGenerator[str, None]:
+    async def chat_stream(self, text_stream: AsyncGenerator[str, None],
+                          history: Optional[List[Dict[str, str]]] = None) -> AsyncGenerator[str, None]:
         """
         Consumes user text and yields AI response text chunks.
+        `history` holds earlier turns as {"role": "user"|"assistant", "content": ...},
+        for callers that run one chat_stream per turn. It may start with a
+        {"role": "system", ...} summary of turns no longer listed (see ConversationContext).
         """
         pass
 
+    async def warm_up(self):
+        """Connects to the provider ahead of the first call (channels, TLS)."""
+        pass
+
+    def new_context(self) -> "ConversationContext":
+        """Token-budgeted history for one conversation, summarized by this LLM as it grows."""
+        from app.services.ai.context import ConversationContext
+        return ConversationContext(self)
+
+    def count_tokens(self, text: str) -> int:
+        """Prompt size of `text`. An estimate; override with the provider's tokenizer if it is cheap."""
+        from app.services.ai.context import estimate_tokens
+        return estimate_tokens(text)
+
+    async def summarize(self, summary: str, messages: List[Dict[str, str]]) -> str:
+        """Extends `summary` with `messages` (turns leaving the context window); returns the new summary."""
+        lines = [f"{m['role']}: {m['content']}" for m in messages]
+        prompt = (f"Update the summary of a voice conversation with the turns below. Keep names, numbers, "
+                  f"decisions and open questions; answer with the summary only, at most "
+                  f"{settings.LLM_SUMMARY_MAX_WORDS} words.\n\n"
+                  f"Summary so far: {summary or '(none)'}\n\nTurns:\n" + "\n".join(lines))
+        async def text():
+            yield prompt
+        return "".join([chunk async for chunk in self.chat_stream(text())])
+
 class TTSService(ABC):
     @abstractmethod
     async def synthesize(self, text_stream: AsyncGenerator[str, None]) -> AsyncGenerator[AudioFrame, None]:
@@ -25,3 +69,15 @@ class TTSService(ABC):
         Consumes text chunks and yields audio frames.
         """
         pass
+
+    async def warm_up(self):
+        """Connects to the provider ahead of the first call (channels, TLS)."""
+        pass
+
+    @property
+    def voice_id(self) -> str:
+        """Identifies the voice (and anything else that changes the audio), e.g. for caching."""
+        return type(self).__name__
+
+    def stats(self) -> dict:
+        return {}
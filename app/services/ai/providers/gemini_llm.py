@@ -1,5 +1,5 @@
 import asyncio
-from typing import AsyncGenerator
+from typing import AsyncGenerator, Dict, List, Optional
 import google.generativeai as genai
 from app.services.ai.interfaces import LLMService
 from app.core.logging import logger
@@ -14,13 +14,14 @@ class GeminiLLMService(LLMService):
             logger.warning("GEMINI_API_KEY not set")
             self.model = None
 
-    async def chat_stream(self, text_stream: AsyncGenerator[str, None]) -> AsyncGenerator[str, None]:
+    async def chat_stream(self, text_stream: AsyncGenerator[str, None],
+                          history: Optional[List[Dict[str, str]]] = None) -> AsyncGenerator[str, None]:
         if not self.model:
             yield "Gemini not configured."
             return
 
-        # Start a chat session
-        chat = self.model.start_chat(history=[])
+        # Start a chat session, seeded with earlier turns if the caller keeps them
+        chat = self.model.start_chat(history=self._gemini_history(history or []))
         
         async for text in text_stream:
             # Send message and allow streaming response
@@ -31,3 +32,15 @@ class GeminiLLMService(LLMService):
                         yield chunk.text
             except Exception as e:
                 logger.error(f"Gemini Error: {e}")
+
+    def _gemini_history(self, history: List[Dict[str, str]]) -> List[dict]:
+        contents = []
+        for turn in history:
+            if turn["role"] == "system":
+                # A summary of earlier turns. Chat history only has user and model
+                # turns, and they must alternate, so it goes in as an acknowledged exchange.
+                contents.append({"role": "user", "parts": [f"Earlier in this conversation: {turn['content']}"]})
+                contents.append({"role": "model", "parts": ["Understood."]})
+                continue
+            contents.append({"role": "model" if turn["role"] == "assistant" else "user", "parts": [turn["content"]]})
+        return contents
@@ -1,107 +1,199 @@
 import asyncio
-from typing import AsyncGenerator
+from collections import deque
+from typing import AsyncGenerator, Deque, Optional
+from google.api_core import exceptions as google_exceptions
 from google.cloud import speech # type: ignore
-from app.services.ai.interfaces import STTService
+from app.services.ai.interfaces import STTService, Transcript
 from app.services.audio import AudioFrame
 from app.core.logging import logger
 from app.core.config import settings
-import os
+
+async def wait_channel_ready(client, name: str, timeout: float = 5.0):
+    """Connects a Google async client's gRPC channel (including TLS) ahead of the first request."""
+    try:
+        await asyncio.wait_for(client.transport.grpc_channel.channel_ready(), timeout)
+        logger.info(f"{name} channel ready")
+    except Exception as e:
+        logger.warning(f"{name} channel not ready after warm-up: {e}")
+
+# Transient failures: the stream is reopened (with backoff) instead of ending recognition
+RETRYABLE_ERRORS = (
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.DeadlineExceeded,
+    google_exceptions.Aborted,
+    google_exceptions.InternalServerError, # Also what grpc reports when a write races the server's close
+)
 
 class GoogleSTTService(STTService):
+    """
+    Streaming recognition over the async gRPC client, so nothing blocks the event loop.
+    Audio is sent while results come back; interim hypotheses are yielded as
+    Transcript(is_final=False), finals as Transcript(is_final=True).
+    Google closes a stream after about five minutes, so a long session runs as a
+    chain of streams, each continuing from the queued audio. Audio sent since the
+    last final result is kept (up to `replay_seconds`) and sent again at the start of
+    the next stream, since the old one may not have recognized, or even read, it.
+    A stream that fails with a transient error is reopened the same way, after a
+    backoff, up to `max_retries` times in a row.
+    """
+    replay_seconds = 10.0
+    max_retries = 3
+    retry_backoff = 0.25 # Seconds before the first retry, doubled for each further one
     def __init__(self):
         # Ensure credentials are set
         if settings.GOOGLE_APPLICATION_CREDENTIALS_JSON:
              # Logic to write JSON to temp file if passed as string content
              pass
-        
-        try:
-            self.client = speech.SpeechClient()
-            self.config = speech.RecognitionConfig(
-                encoding=speech.RecognitionConfig.AudioEncoding.LINEAR16,
-                sample_rate_hertz=settings.SAMPLE_RATE,
-                language_code="en-US",
-                model="video" # Optimized for video/phone
-            )
-            self.streaming_config = speech.StreamingRecognitionConfig(
-                config=self.config,
-                interim_results=True # We want streaming transcriptions
-            )
-        except Exception as e:
-            logger.error(f"Failed to initialize Google Speech Client: {e}")
-            self.client = None
-
-    async def transcribe(self, audio_stream: AsyncGenerator[AudioFrame, None]) -> AsyncGenerator[str, None]:
-        if not self.client:
+
+        # grpc.aio channels belong to the event loop they are created on, and agents are
+        # built at import time, so the client is created on first use (see _get_client)
+        self.client: Optional[speech.SpeechAsyncClient] = None
+        self.config = speech.RecognitionConfig(
+            encoding=speech.RecognitionConfig.AudioEncoding.LINEAR16,
+            sample_rate_hertz=settings.SAMPLE_RATE,
+            language_code="en-US",
+            model="video" # Optimized for video/phone
+        )
+        self.streaming_config = speech.StreamingRecognitionConfig(
+            config=self.config,
+            interim_results=True # We want streaming transcriptions
+        )
+
+        # Counters
+        self.streams = 0
+        self.restarts = 0
+        self.retries = 0
+
+    def _get_client(self) -> Optional[speech.SpeechAsyncClient]:
+        if self.client is None:
+            try:
+                self.client = speech.SpeechAsyncClient()
+            except Exception as e:
+                logger.error(f"Failed to initialize Google Speech Client: {e}")
+        return self.client
+
+    async def warm_up(self):
+        client = self._get_client()
+        if client is not None:
+            await wait_channel_ready(client, "Google STT")
+
+    async def transcribe(self, audio_stream: AsyncGenerator[AudioFrame, None]) -> AsyncGenerator[Transcript, None]:
+        client = self._get_client()
+        if not client:
             logger.error("Google Speech Client not available")
             return
 
-        # Google's Python client uses a generator yielding requests for the stream
-        request_queue = asyncio.Queue()
+        # Audio waiting to be sent. Bounded: if Google stalls, the agent drops frames
+        # upstream instead of this queue growing.
+        audio: asyncio.Queue = asyncio.Queue(maxsize=settings.AGENT_INPUT_QUEUE_FRAMES)
+        ended = False
+        bytes_per_second = settings.SAMPLE_RATE * 2
+        replay: Deque[bytes] = deque() # Sent on the current stream after its last final result
+        replay_first = 0 # Index of replay[0] among all chunks read from `audio`
+        replay_start = 0.0 # Stream time (s) where replay[0] starts
+        replay_bytes = 0
+        stream = 0
 
-        async def request_generator():
+        async def pump():
+            try:
+                async for frame in audio_stream:
+                    # frame.data may be a memoryview into a shared buffer; protobuf needs bytes
+                    await audio.put(bytes(frame.data))
+            except Exception as e:
+                logger.error(f"Google STT audio source failed: {e}")
+            await audio.put(None)
+
+        async def requests(own: int):
+            nonlocal ended, replay_start, replay_bytes
+            # The first request carries the config, every later one only audio
+            yield speech.StreamingRecognizeRequest(streaming_config=self.streaming_config)
+            # A new stream's clock starts at the audio replayed from the previous one
+            replay_start = 0.0
+            sent = replay_first
             while True:
-                chunk = await request_queue.get()
+                # Everything in the log not yet sent on this stream, in order
+                while sent < replay_first + len(replay):
+                    sent = max(sent, replay_first)
+                    chunk = replay[sent - replay_first]
+                    sent += 1
+                    yield speech.StreamingRecognizeRequest(audio_content=chunk)
+                chunk = await audio.get()
+                if own != stream:
+                    # gRPC may leave a finished stream's iterator waiting here; whatever it
+                    # picks up goes to the log, and the current stream is woken to send it
+                    if chunk:
+                        log(chunk)
+                    audio.put_nowait(b"" if chunk is not None else None)
+                    return
                 if chunk is None:
+                    ended = True
                     return
-                yield chunk
-
-        # Bridge: AudioFrame Stream -> Request Generator
-        # We need a background task to push audio frames into request_queue 
-        # BUT Google's StreamingRecognize is synchronous generator based in the official client usually, 
-        # or we use the async client.
-        # Use SpeechAsyncClient ideally, but standard client is common. 
-        # Actually Google Cloud libraries have async versions.
-        # Let's assume standard thread-based or async client.
-        
-        # NOTE: Proper async streaming with Google Cloud Python client can be tricky.
-        # We will write a simplified adapter assuming we can yield bytes.
-        
-        # Actually, let's just implement a simpler loop for demonstration since we might not have real creds in test.
-        # But per requirements, I must implement it.
-        
-        # Adaptation:
-        # 1. Read frames from audio_stream
-        # 2. Yield StreamingRecognizeRequest(audio_content=content)
-        
-        async def audio_generator():
-            async for frame in audio_stream:
-                # We assume frame.data is PCM 16-bit
-                yield speech.StreamingRecognizeRequest(audio_content=frame.data)
-
-        # Call the API
+                if chunk:
+                    log(chunk)
+
+        def log(chunk: bytes):
+            nonlocal replay_bytes
+            replay.append(chunk)
+            replay_bytes += len(chunk)
+            while replay_bytes > self.replay_seconds * bytes_per_second:
+                drop()
+
+        def drop():
+            nonlocal replay_first, replay_start, replay_bytes
+            chunk = replay.popleft()
+            replay_first += 1
+            replay_bytes -= len(chunk)
+            replay_start += len(chunk) / bytes_per_second
+
+        def finalized(response):
+            # Audio up to a final result's end is done with; it is not replayed
+            end = response.results[0].result_end_time
+            end_s = end.total_seconds() if end else 0.0
+            while replay and replay_start + len(replay[0]) / bytes_per_second <= end_s + 1e-3:
+                drop()
+
+        failures = 0 # Consecutive streams that failed before any response
+        pump_task = asyncio.create_task(pump())
         try:
-            # responses is a generator
-            responses = self.client.streaming_recognize(
-                config=self.streaming_config,
-                requests=audio_generator() 
-            )
-            
-            # Since streaming_recognize is blocking/synchronous in standard client, 
-            # we should run it in an executor or use SpeechAsyncClient.
-            # Using SpeechAsyncClient:
-            
-            # For now, let's just log and yield a placeholder if we can't fully implement async without SpeechAsyncClient
-            # (which requires `pip install google-cloud-speech` - typically has async)
-            
-            # Mocking the loop for code structure if blocking:
-            # for response in responses:
-            #     if not response.results: continue
-            #     result = response.results[0]
-            #     if not result.alternatives: continue
-            #     if result.is_final:
-            #         yield result.alternatives[0].transcript
-            
-            # Since I am in an async function, allow blocking call? No, it will freeze the server.
-            # I must use a proper async approach or run in simple thread.
-            
-            logger.info("Google STT stream started")
-            
-            # Hypothetical iteration over blocking generator in thread using run_in_executor?
-            pass
-
-        except Exception as e:
-            logger.error(f"Google STT Error: {e}")
-            
-        # Fallback to Yielding nothing if setup fails
-        if False:
-             yield ""
+            while not ended:
+                self.streams += 1
+                stream += 1
+                try:
+                    responses = await client.streaming_recognize(requests=requests(stream))
+                    async for response in responses:
+                        failures = 0
+                        if response.results and response.results[0].is_final:
+                            finalized(response)
+                        transcript = self._transcript(response)
+                        if transcript is not None:
+                            yield transcript
+                except google_exceptions.OutOfRange:
+                    # Stream duration limit; carry on with a new stream, from the replayed audio
+                    self.restarts += 1
+                    logger.info("Google STT stream reached its time limit; reopening")
+                except RETRYABLE_ERRORS as e:
+                    if failures >= self.max_retries:
+                        logger.error(f"Google STT Error after {failures} retries: {e}")
+                        return
+                    delay = self.retry_backoff * 2 ** failures
+                    failures += 1
+                    self.retries += 1
+                    logger.warning(f"Google STT stream failed ({e}); reopening in {delay:.2f}s")
+                    await asyncio.sleep(delay)
+                except Exception as e:
+                    logger.error(f"Google STT Error: {e}")
+                    return
+        finally:
+            pump_task.cancel()
+
+    def _transcript(self, response) -> Optional[Transcript]:
+        if not response.results:
+            return None
+        first = response.results[0]
+        if first.is_final:
+            if not first.alternatives:
+                return None
+            return Transcript(first.alternatives[0].transcript.strip(), is_final=True)
+        # Interim responses split the hypothesis into a stable prefix and an unstable tail
+        text = "".join(result.alternatives[0].transcript for result in response.results if result.alternatives)
+        return Transcript(text.strip(), is_final=False) if text.strip() else None
@@ -1,78 +1,71 @@
-import asyncio
-from typing import AsyncGenerator
+from typing import AsyncGenerator, Optional
 from google.cloud import texttospeech
-from app.services.ai.interfaces import TTSService
+from app.services.ai.providers.google_stt import wait_channel_ready
+from app.services.ai.tts_pipeline import PipelinedTTSService
 from app.services.audio import AudioFrame
 from app.core.logging import logger
 from app.core.config import settings
 
-class GoogleTTSService(TTSService):
+class GoogleTTSService(PipelinedTTSService):
     def __init__(self):
-        try:
-            self.client = texttospeech.TextToSpeechClient()
-            self.voice = texttospeech.VoiceSelectionParams(
-                language_code="en-US",
-                name="en-US-Journey-F" # Expressive voice
-            )
-            self.audio_config = texttospeech.AudioConfig(
-                audio_encoding=texttospeech.AudioEncoding.LINEAR16,
-                sample_rate_hertz=settings.SAMPLE_RATE
-            )
-        except Exception as e:
-            logger.error(f"Failed to init Google TTS: {e}")
-            self.client = None
+        super().__init__()
+        # Async gRPC client, so synthesis never blocks the event loop. grpc.aio channels
+        # belong to the loop they are created on and agents are built at import time,
+        # so the client is created on first use (see _get_client)
+        self.client: Optional[texttospeech.TextToSpeechAsyncClient] = None
+        self._client_failed = False
+        self.voice = texttospeech.VoiceSelectionParams(
+            language_code="en-US",
+            name="en-US-Journey-F" # Expressive voice
+        )
+        self.audio_config = texttospeech.AudioConfig(
+            audio_encoding=texttospeech.AudioEncoding.LINEAR16,
+            sample_rate_hertz=settings.SAMPLE_RATE
+        )
 
-    async def synthesize(self, text_stream: AsyncGenerator[str, None]) -> AsyncGenerator[AudioFrame, None]:
-        if not self.client:
+    def _get_client(self) -> Optional[texttospeech.TextToSpeechAsyncClient]:
+        if self.client is None and not self._client_failed:
+            try:
+                self.client = texttospeech.TextToSpeechAsyncClient()
+            except Exception as e:
+                logger.error(f"Failed to init Google TTS: {e}")
+                self._client_failed = True
+        return self.client
+
+    @property
+    def voice_id(self) -> str:
+        return f"google:{self.voice.language_code}:{self.voice.name}"
+
+    async def warm_up(self):
+        client = self._get_client()
+        if client is not None:
+            await wait_channel_ready(client, "Google TTS")
+
+    async def synthesize_segment(self, text: str) -> AsyncGenerator[AudioFrame, None]:
+        client = self._get_client()
+        if not client:
             return
 
-        # Buffering strategy:
-        # TTS works best with full sentences or chunks. 
-        # Streaming char-by-char to Google TTS might not be efficient or supported as nicely as OpenAI.
-        # We will buffer text until punctuation or reasonable length.
+        # Errors propagate to the pipeline, which logs them and skips the segment
+        synthesis_input = texttospeech.SynthesisInput(text=text)
         
-        buffer = ""
+        # Unary, but awaited: later segments are synthesized while earlier ones play
+        # (see PipelinedTTSService)
+        response = await client.synthesize_speech(
+            input=synthesis_input,
+            voice=self.voice,
+            audio_config=self.audio_config
+        )
         
-        async for text in text_stream:
-            buffer += text
-            # Simple heuristic split
-            if any(p in text for p in [".", "!", "?", "\n"]):
-                # Synthesize buffered
-                async for frame in self._synthesize_text(buffer):
-                    yield frame
-                buffer = ""
+        # Response audio_content is the full WAV/PCM file including headers if WAV.
+        # We asked for LINEAR16, which is raw PCM (usually). 
+        # Note: The `audio_encoding` LINEAR16 doc says "Uncompressed 16-bit signed little-endian samples (Linear PCM)."
+        # It should be raw bytes.
         
-        # Flush remainder
-        if buffer.strip():
-             async for frame in self._synthesize_text(buffer):
-                    yield frame
-
-    async def _synthesize_text(self, text: str) -> AsyncGenerator[AudioFrame, None]:
-        if not text.strip():
-            return
-            
-        try:
-            synthesis_input = texttospeech.SynthesisInput(text=text)
-            
-            # Blocking call (wrap in executor?)
-            # Google *does* have a new StreamingSynthesize in v1beta1 but standard is unary.
-            response = self.client.synthesize_speech(
-                input=synthesis_input,
-                voice=self.voice,
-                audio_config=self.audio_config
-            )
-            
-            # Response audio_content is the full WAV/PCM file including headers if WAV.
-            # We asked for LINEAR16, which is raw PCM (usually). 
-            # Note: The `audio_encoding` LINEAR16 doc says "Uncompressed 16-bit signed little-endian samples (Linear PCM)."
-            # It should be raw bytes.
-            
-            audio_data = response.audio_content
-            # Yield in chunks (AudioFrames)
-            chunk_size = 320 # 20ms at 16kHz
-            for i in range(0, len(audio_data), chunk_size):
-                chunk = audio_data[i:i+chunk_size]
-                yield AudioFrame(chunk, timestamp=0) # timestamp calc needed?
-                
-        except Exception as e:
-            logger.error(f"Google TTS Error: {e}")
+        audio_data = response.audio_content
+        # Yield in 20ms frames; the output pacer releases them in real time and stamps them
+        chunk_size = settings.SAMPLE_RATE * settings.FRAME_DURATION_MS // 1000 * 2 # bytes
+        # Frames are views into the response buffer, not copies
+        audio_view = memoryview(audio_data)
+        for i in range(0, len(audio_data), chunk_size):
+            yield AudioFrame(audio_view[i:i+chunk_size], timestamp=0)
@@ -1,31 +1,39 @@
 import asyncio
-from typing import AsyncGenerator
-from app.services.ai.interfaces import STTService, LLMService, TTSService
+from typing import AsyncGenerator, Dict, List, Optional
+from app.services.ai.interfaces import STTService, LLMService, Transcript
+from app.services.ai.tts_pipeline import PipelinedTTSService
 from app.services.audio import AudioFrame
 from app.core.logging import logger
+from app.core.config import settings
 
 class MockSTTService(STTService):
-    async def transcribe(self, audio_stream: AsyncGenerator[AudioFrame, None]) -> AsyncGenerator[str, None]:
-        # Simple energy based detection or just periodic?
-        # For mock: assume meaningful audio arrives every X seconds or bytes.
-        # We can't easily detect speech in mock without VAD. 
-        # So we'll just yield a hardcoded "Hello" after receiving some data.
-        
+    """
+    Pretends to recognise a fixed phrase: one more word per 0.25s of audio
+    (sent as interim results), then a final once the phrase is complete.
+    """
+    PHRASE = ["Hello", "world"]
+    BYTES_PER_WORD = 8000 # 0.25s of 16kHz PCM16
+
+    async def transcribe(self, audio_stream: AsyncGenerator[AudioFrame, None]) -> AsyncGenerator[Transcript, None]:
         byte_count = 0
-        triggered = False
+        words = 0
         
         async for frame in audio_stream:
             byte_count += len(frame.data)
-            # Roughly 0.5 seconds of audio (16khz * 2 bytes * 0.5 = 16000 bytes)
-            if byte_count > 16000 and not triggered:
-                triggered = True
-                logger.debug("MockSTT: Detected speech, transcribing...")
-                yield "Hello world"
+            heard = min(byte_count // self.BYTES_PER_WORD, len(self.PHRASE))
+            if heard > words:
+                words = heard
+                logger.debug(f"MockSTT: interim '{' '.join(self.PHRASE[:words])}'")
+                yield Transcript(" ".join(self.PHRASE[:words]), is_final=False)
+            # The "provider" finalizes well after the last word, like real endpointing does
+            if byte_count >= (len(self.PHRASE) + 2) * self.BYTES_PER_WORD:
+                yield Transcript(" ".join(self.PHRASE), is_final=True)
                 byte_count = 0
-                triggered = False # Reset for next phrase
+                words = 0
             
 class MockLLMService(LLMService):
-    async def chat_stream(self, text_stream: AsyncGenerator[str, None]) -> AsyncGenerator[str, None]:
+    async def chat_stream(self, text_stream: AsyncGenerator[str, None],
+                          history: Optional[List[Dict[str, str]]] = None) -> AsyncGenerator[str, None]:
         async for text in text_stream:
             logger.debug(f"MockLLM: Received '{text}'")
             # Simulate thinking
@@ -36,15 +44,24 @@ class MockLLMService(LLMService):
                 yield word + " "
                 await asyncio.sleep(0.1)
 
-class MockTTSService(TTSService):
-    async def synthesize(self, text_stream: AsyncGenerator[str, None]) -> AsyncGenerator[AudioFrame, None]:
-        async for text in text_stream:
-            logger.debug(f"MockTTS: Synthesizing '{text}'")
-            # Generate fake audio noise or silence
-            # 20ms of silence/noise
-            # 16000 Hz * 20ms = 320 samples * 2 bytes = 640 bytes
-            dummy_pcm = b'\x00' * 320 # Silence
-            # yield a few frames per word
-            for _ in range(5):
-                yield AudioFrame(dummy_pcm, timestamp=0)
-                await asyncio.sleep(0.02)
+    async def summarize(self, summary: str, messages: List[Dict[str, str]]) -> str:
+        # Keeps what the user said, most recent last, within the summary size limit
+        said = " ".join(m["content"] for m in messages if m["role"] == "user")
+        words = f"{summary} {said}".split()
+        return " ".join(words[-settings.LLM_SUMMARY_MAX_WORDS:])
+
+SILENT_FRAME = bytes(640) # Shared by every mock frame; frames are never written to
+
+class MockTTSService(PipelinedTTSService):
+    """Silence, 100ms per word, after a fixed synthesis latency per segment."""
+    def __init__(self, latency: float = 0.05):
+        super().__init__()
+        self.latency = latency
+
+    async def synthesize_segment(self, text: str) -> AsyncGenerator[AudioFrame, None]:
+        logger.debug(f"MockTTS: Synthesizing '{text}'")
+        await asyncio.sleep(self.latency)
+        # 5 x 20ms frames of 16kHz PCM16 per word. No pacing sleeps: the output pacer
+        # releases frames in real time.
+        for _ in range(5 * len(text.split())):
+            yield AudioFrame(SILENT_FRAME, timestamp=0)
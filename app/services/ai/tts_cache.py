@@ -0,0 +1,259 @@
+import asyncio
+import hashlib
+import mmap
+import os
+import re
+import struct
+from collections import OrderedDict
+from typing import AsyncGenerator, List, Optional, Set, Tuple
+from app.core.config import settings
+from app.core.logging import logger
+from app.services.ai.interfaces import TTSService
+from app.services.ai.tts_pipeline import PipelinedTTSService
+from app.services.audio import AudioFrame
+
+# Disk entries: sample rate and channels, then raw PCM16
+ENTRY_HEADER = struct.Struct("<II")
+ENCODING = "pcm16"
+
+# (sample_rate, channels, pcm) where pcm is bytes or a read-only mmap of the disk entry
+CacheEntry = Tuple[int, int, object]
+
+def normalize_text(text: str) -> str:
+    return re.sub(r"\s+", " ", text).strip().casefold()
+
+class TTSAudioCache:
+    """
+    Content-addressed store of synthesized segments.
+    Memory tier: LRU bounded by bytes, holding what this process synthesized. Disk
+    tier: one PCM file per entry under `directory`, read back through mmap. Files
+    are written under a temporary name and renamed into place, so several worker
+    processes can share the directory. Mapped entries live in the page cache, not
+    in process memory, so they are kept apart from the memory tier: an LRU of up to
+    `mapped_entries` mappings, whose hits count as disk hits.
+    Disk reads, writes and pruning run in worker threads (asyncio.to_thread), never
+    on the event loop; a store is in memory at once and on disk shortly after.
+    """
+    def __init__(self, directory: Optional[str] = settings.TTS_CACHE_DIR,
+                 memory_bytes: int = settings.TTS_CACHE_MEMORY_BYTES,
+                 disk_bytes: int = settings.TTS_CACHE_DISK_BYTES,
+                 mapped_entries: int = settings.TTS_CACHE_MAPPED_ENTRIES):
+        self.directory = directory
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self.memory: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self.memory_used = 0
+        self.mapped_entries = mapped_entries
+        self.mapped: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._writes_since_prune = 0
+        self._writes: Set[asyncio.Task] = set() # Disk writes in flight
+
+        # Counters
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.bytes_saved = 0 # Audio served from the cache instead of the provider
+
+    def key(self, text: str, voice: str, sample_rate: int, encoding: str = ENCODING) -> str:
+        identity = "\x00".join((normalize_text(text), voice, str(sample_rate), encoding))
+        return hashlib.sha256(identity.encode("utf-8")).hexdigest()
+
+    async def get(self, key: str) -> Optional[CacheEntry]:
+        entry = self.memory.get(key)
+        if entry is not None:
+            self.memory.move_to_end(key)
+            self.memory_hits += 1
+        else:
+            entry = self.mapped.get(key)
+            if entry is not None:
+                self.mapped.move_to_end(key)
+            else:
+                entry = await asyncio.to_thread(self._read_disk, key) if self.directory else None
+                if entry is None:
+                    self.misses += 1
+                    return None
+                self._map(key, entry)
+            self.disk_hits += 1
+        self.bytes_saved += len(entry[2])
+        return entry
+
+    def put(self, key: str, sample_rate: int, channels: int, pcm: bytes):
+        self.stores += 1
+        self.mapped.pop(key, None)
+        self._remember(key, (sample_rate, channels, pcm))
+        if self.directory:
+            task = asyncio.create_task(self._store(key, sample_rate, channels, pcm))
+            self._writes.add(task)
+            task.add_done_callback(self._writes.discard)
+
+    async def flush(self):
+        """Waits for the disk writes in flight."""
+        if self._writes:
+            await asyncio.gather(*self._writes, return_exceptions=True)
+
+    async def _store(self, key: str, sample_rate: int, channels: int, pcm: bytes):
+        if not await asyncio.to_thread(self._write_disk, key, sample_rate, channels, pcm):
+            return
+        self._writes_since_prune += 1
+        if self._writes_since_prune >= 50:
+            self._writes_since_prune = 0
+            await asyncio.to_thread(self._prune_disk)
+
+    def _remember(self, key: str, entry: CacheEntry):
+        size = len(entry[2])
+        if size > self.memory_bytes:
+            return
+        old = self.memory.pop(key, None)
+        if old is not None:
+            self.memory_used -= len(old[2])
+        self.memory[key] = entry
+        self.memory_used += size
+        while self.memory_used > self.memory_bytes:
+            _, evicted = self.memory.popitem(last=False)
+            self.memory_used -= len(evicted[2])
+            self.evictions += 1
+
+    def _map(self, key: str, entry: CacheEntry):
+        self.mapped[key] = entry
+        while len(self.mapped) > self.mapped_entries:
+            # Unmapped by the GC once no frame still views it
+            self.mapped.popitem(last=False)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.pcm")
+
+    def _read_disk(self, key: str) -> Optional[CacheEntry]:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            os.utime(path) # Recently used, for pruning
+        except (FileNotFoundError, ValueError):
+            return None # ValueError: empty file
+        except OSError as e:
+            logger.error(f"TTS cache read failed for {key}: {e}")
+            return None
+        if len(mapped) < ENTRY_HEADER.size:
+            return None
+        sample_rate, channels = ENTRY_HEADER.unpack_from(mapped)
+        # Frames are views into the mapping; pages are shared with other workers
+        return sample_rate, channels, memoryview(mapped)[ENTRY_HEADER.size:]
+
+    def _write_disk(self, key: str, sample_rate: int, channels: int, pcm: bytes) -> bool:
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp = f"{self._path(key)}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(ENTRY_HEADER.pack(sample_rate, channels))
+                f.write(pcm)
+            os.replace(tmp, self._path(key))
+        except OSError as e:
+            logger.error(f"TTS cache write failed for {key}: {e}")
+            return False
+        return True
+
+    def _prune_disk(self):
+        # Least recently used first (mtime is refreshed on every disk hit)
+        try:
+            entries = []
+            for name in os.listdir(self.directory):
+                if name.endswith(".pcm"):
+                    path = os.path.join(self.directory, name)
+                    st = os.stat(path)
+                    entries.append((st.st_mtime, st.st_size, path))
+        except OSError as e:
+            logger.error(f"TTS cache prune failed: {e}")
+            return
+        used = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if used <= self.disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            used -= size
+
+    def stats(self) -> dict:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 3) if lookups else None,
+            "bytes_saved": self.bytes_saved,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "memory_entries": len(self.memory),
+            "memory_bytes": self.memory_used,
+            "mapped_entries": len(self.mapped),
+            "pending_writes": len(self._writes),
+        }
+
+class CachedTTSService(PipelinedTTSService):
+    """
+    Wraps any TTSService with a TTSAudioCache, per segment.
+    Short segments (greetings, confirmations, "one moment please") are looked up by
+    normalized text, voice and sample rate; hits are yielded at once, without a
+    provider round trip. Misses are synthesized by the wrapped service and stored
+    once complete (an interrupted synthesis is not stored).
+    """
+    def __init__(self, inner: TTSService, cache: Optional[TTSAudioCache] = None,
+                 max_text_chars: int = settings.TTS_CACHE_MAX_TEXT_CHARS):
+        super().__init__()
+        self.inner = inner
+        self.cache = cache or TTSAudioCache()
+        self.max_text_chars = max_text_chars
+
+    @property
+    def voice_id(self) -> str:
+        return self.inner.voice_id
+
+    async def warm_up(self):
+        await self.inner.warm_up()
+
+    async def synthesize_segment(self, text: str) -> AsyncGenerator[AudioFrame, None]:
+        if len(text) > self.max_text_chars:
+            # Long sentences rarely repeat; keep them out of the cache
+            async for frame in self._synthesize_inner(text):
+                yield frame
+            return
+
+        key = self.cache.key(text, self.voice_id, settings.SAMPLE_RATE)
+        entry = await self.cache.get(key)
+        if entry is not None:
+            sample_rate, channels, pcm = entry
+            frame_bytes = sample_rate * settings.FRAME_DURATION_MS // 1000 * 2 * channels
+            view = memoryview(pcm)
+            for i in range(0, len(view), frame_bytes):
+                yield AudioFrame(view[i:i + frame_bytes], timestamp=0, duration_ms=settings.FRAME_DURATION_MS,
+                                 sample_rate=sample_rate, channels=channels)
+            return
+
+        chunks: List[bytes] = []
+        formats = set()
+        async for frame in self._synthesize_inner(text):
+            formats.add((frame.sample_rate, frame.channels))
+            chunks.append(bytes(frame.data))
+            yield frame
+        # One entry has one format; a provider that switched mid-segment is not cached
+        if chunks and len(formats) == 1:
+            sample_rate, channels = formats.pop()
+            self.cache.put(key, sample_rate, channels, b"".join(chunks))
+
+    async def _synthesize_inner(self, text: str) -> AsyncGenerator[AudioFrame, None]:
+        if isinstance(self.inner, PipelinedTTSService):
+            source = self.inner.synthesize_segment(text)
+        else:
+            async def one_segment():
+                yield text
+            source = self.inner.synthesize(one_segment())
+        async for frame in source:
+            yield frame
+
+    def stats(self) -> dict:
+        stats = super().stats()
+        stats["cache"] = self.cache.stats()
+        return stats
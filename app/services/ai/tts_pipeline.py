@@ -0,0 +1,171 @@
+import asyncio
+import time
+from abc import abstractmethod
+from collections import deque
+from typing import AsyncGenerator, Deque, List, Optional, Tuple
+from app.core.config import settings
+from app.core.logging import logger
+from app.services.ai.interfaces import TTSService
+from app.services.audio import AudioFrame
+
+SENTENCE_END = ".!?…"
+CLAUSE_END = ",;:—"
+# A period after these is not the end of a sentence
+ABBREVIATIONS = {"mr", "mrs", "ms", "dr", "prof", "st", "vs", "e.g", "i.e", "approx"}
+
+class SentenceSegmenter:
+    """
+    Cuts streamed LLM text into speakable segments for TTS.
+    Segments end at sentence punctuation followed by whitespace (so "3.5" and "e.g."
+    do not split) or at a newline. The first segment may also end at a clause
+    (comma, colon...) once it has `first_min_chars`, so speech starts as early as
+    possible. Anything longer than `max_chars` is cut at the last space.
+    """
+    def __init__(self, first_min_chars: int = settings.TTS_FIRST_SEGMENT_MIN_CHARS,
+                 max_chars: int = settings.TTS_SEGMENT_MAX_CHARS):
+        self.first_min_chars = first_min_chars
+        self.max_chars = max_chars
+        self.buffer = ""
+        self.emitted = 0
+
+    def push(self, text: str) -> List[str]:
+        """Adds text; returns the segments completed by it."""
+        self.buffer += text
+        segments = []
+        while True:
+            cut = self._find_cut()
+            if cut is None:
+                return segments
+            segment, self.buffer = self.buffer[:cut].strip(), self.buffer[cut:]
+            if segment:
+                segments.append(segment)
+                self.emitted += 1
+
+    def flush(self) -> Optional[str]:
+        """The remaining text, at the end of the stream."""
+        segment, self.buffer = self.buffer.strip(), ""
+        if not segment:
+            return None
+        self.emitted += 1
+        return segment
+
+    def _find_cut(self) -> Optional[int]:
+        text = self.buffer
+        # A boundary needs the following character, so the last one is never a cut
+        for i in range(len(text) - 1):
+            ch = text[i]
+            if ch == "\n":
+                return i + 1
+            if not text[i + 1].isspace():
+                continue
+            if ch in SENTENCE_END and not self._abbreviation(i):
+                return i + 1
+            if ch in CLAUSE_END and self.emitted == 0 and len(text[:i].strip()) >= self.first_min_chars:
+                return i + 1
+        if len(text) > self.max_chars:
+            space = text.rfind(" ", 0, self.max_chars)
+            return space + 1 if space > 0 else self.max_chars
+        return None
+
+    def _abbreviation(self, i: int) -> bool:
+        if self.buffer[i] != ".":
+            return False
+        word = self.buffer[:i].rsplit(None, 1)[-1] if self.buffer[:i].strip() else ""
+        return word.lower() in ABBREVIATIONS or (len(word) == 1 and word.isupper())
+
+class PipelinedTTSService(TTSService):
+    """
+    TTS for providers that synthesize one segment per request.
+    Text is segmented as it streams in, and up to `lookahead` segments are
+    synthesized while the current one is still being yielded, so the next
+    sentence is ready when this one has played. Audio is yielded in text order.
+    Subclasses implement synthesize_segment().
+    """
+    def __init__(self, lookahead: int = settings.TTS_LOOKAHEAD_SEGMENTS):
+        self.lookahead = max(1, lookahead)
+
+        # Counters
+        self.segments = 0
+        self.failed = 0
+        self.first_frame_delays: Deque[float] = deque(maxlen=100) # Request to first frame, per segment, ms
+
+    @abstractmethod
+    async def synthesize_segment(self, text: str) -> AsyncGenerator[AudioFrame, None]:
+        """Synthesizes one segment (a sentence or clause)."""
+        pass
+
+    async def synthesize(self, text_stream: AsyncGenerator[str, None]) -> AsyncGenerator[AudioFrame, None]:
+        # Started segments, in text order. A slot is taken before a segment starts and
+        # given back once it has been played: the one playing plus `lookahead` ahead of it.
+        started: asyncio.Queue = asyncio.Queue()
+        slots = asyncio.Semaphore(self.lookahead + 1)
+        jobs: List[asyncio.Task] = []
+
+        def start(segment: str) -> Tuple[asyncio.Task, asyncio.Queue]:
+            frames: asyncio.Queue = asyncio.Queue()
+            task = asyncio.create_task(self._run_segment(segment, frames))
+            jobs.append(task)
+            return task, frames
+
+        async def begin(segment: str):
+            await slots.acquire()
+            started.put_nowait(start(segment))
+
+        async def segment_text():
+            segmenter = SentenceSegmenter()
+            try:
+                async for text in text_stream:
+                    for segment in segmenter.push(text):
+                        await begin(segment)
+                tail = segmenter.flush()
+                if tail:
+                    await begin(tail)
+            except Exception as e:
+                # Surfaces in the consumer, after the audio that was already started
+                started.put_nowait(e)
+                return
+            started.put_nowait(None)
+
+        feeder = asyncio.create_task(segment_text())
+        try:
+            while True:
+                job = await started.get()
+                if job is None:
+                    return
+                if isinstance(job, Exception):
+                    raise job
+                _, frames = job
+                while True:
+                    frame = await frames.get()
+                    if frame is None:
+                        break
+                    yield frame
+                slots.release()
+        finally:
+            feeder.cancel()
+            for task in jobs:
+                task.cancel()
+
+    async def _run_segment(self, text: str, frames: asyncio.Queue):
+        self.segments += 1
+        started = time.monotonic()
+        first = True
+        try:
+            async for frame in self.synthesize_segment(text):
+                if first:
+                    self.first_frame_delays.append((time.monotonic() - started) * 1000)
+                    first = False
+                frames.put_nowait(frame)
+        except Exception as e:
+            self.failed += 1
+            logger.error(f"TTS failed for segment '{text[:40]}': {e}")
+        finally:
+            frames.put_nowait(None)
+
+    def stats(self) -> dict:
+        delays = sorted(self.first_frame_delays)
+        return {
+            "segments": self.segments,
+            "failed": self.failed,
+            "segment_first_frame_ms_p50": round(delays[len(delays) // 2], 1) if delays else None,
+        }
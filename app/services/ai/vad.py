@@ -0,0 +1,142 @@
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import AsyncGenerator, Deque
+import numpy as np
+from app.core.config import settings
+from app.core.logging import logger
+from app.services.audio import AudioFrame
+
+class VoiceActivityDetector(ABC):
+    """Frame-level speech/non-speech decision. One instance per audio stream (it keeps state)."""
+    @abstractmethod
+    def is_speech(self, frame: AudioFrame) -> bool:
+        pass
+
+class EnergySpectralVAD(VoiceActivityDetector):
+    """
+    Energy against an adaptive noise floor, confirmed by two spectral features:
+    the share of energy in the speech band and spectral flatness (noise is flat,
+    voiced speech is peaky). All features are computed with NumPy per frame.
+    """
+    def __init__(self, margin_db: float = 10.0, min_level_db: float = -50.0,
+                 min_band_ratio: float = 0.6, max_flatness: float = 0.4,
+                 band_hz: tuple = (80.0, 4000.0)):
+        self.margin_db = margin_db
+        self.min_level_db = min_level_db
+        self.min_band_ratio = min_band_ratio
+        self.max_flatness = max_flatness
+        self.band_hz = band_hz
+        self.noise_floor_db = -70.0
+        self._window = None
+        self._band = None
+
+    def _prepare(self, size: int, sample_rate: int):
+        self._window = np.hanning(size).astype(np.float32)
+        freqs = np.fft.rfftfreq(size, 1.0 / sample_rate)
+        self._band = (freqs >= self.band_hz[0]) & (freqs <= self.band_hz[1])
+
+    def is_speech(self, frame: AudioFrame) -> bool:
+        usable = len(frame.data) - len(frame.data) % 2
+        if usable == 0:
+            return False
+        x = np.frombuffer(frame.data[:usable], dtype="<i2").astype(np.float32) / 32768.0
+        energy = float(np.dot(x, x)) / len(x)
+        level_db = 10.0 * np.log10(energy + 1e-12)
+
+        loud = level_db > max(self.noise_floor_db + self.margin_db, self.min_level_db)
+        speech = False
+        if loud:
+            if self._window is None or len(self._window) != len(x):
+                self._prepare(len(x), frame.sample_rate)
+            power = np.abs(np.fft.rfft(x * self._window)) ** 2 + 1e-12
+            band_ratio = power[self._band].sum() / power.sum()
+            flatness = np.exp(np.mean(np.log(power))) / np.mean(power)
+            speech = band_ratio >= self.min_band_ratio and flatness <= self.max_flatness
+
+        # Noise floor: drops at once, rises slowly, and only learns from non-speech
+        if level_db < self.noise_floor_db:
+            self.noise_floor_db = level_db
+        elif not speech:
+            self.noise_floor_db += 0.05 * (level_db - self.noise_floor_db)
+        return speech
+
+class VADGate:
+    """
+    Passes only speech segments on to STT.
+    A segment starts after `onset` consecutive speech frames and is prefixed with
+    up to `pre_roll_ms` of the audio before it, so word onsets are not clipped.
+    It ends `hangover_ms` after the last speech frame, so STT hears the trailing
+    silence it needs to finalize. Everything else is dropped here.
+    """
+    def __init__(self, vad: VoiceActivityDetector,
+                 pre_roll_ms: int = settings.VAD_PRE_ROLL_MS,
+                 hangover_ms: int = settings.VAD_HANGOVER_MS,
+                 onset_frames: int = 2,
+                 frame_duration_ms: int = settings.FRAME_DURATION_MS):
+        self.vad = vad
+        self.hangover_frames = hangover_ms // frame_duration_ms
+        self.onset_frames = onset_frames
+        self.pre_roll: Deque[AudioFrame] = deque(maxlen=max(1, pre_roll_ms // frame_duration_ms))
+        self.active = False
+        self.speech = False # Raw VAD decision for the last frame
+        self.speech_run = 0 # Consecutive speech frames
+        self._silence_run = 0
+
+        # Counters
+        self.frames_in = 0
+        self.frames_out = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.segments = 0
+
+    async def gate(self, audio_stream: AsyncGenerator[AudioFrame, None]) -> AsyncGenerator[AudioFrame, None]:
+        try:
+            async for frame in audio_stream:
+                for out in self.process(frame):
+                    yield out
+        finally:
+            logger.info(f"VAD gate passed {self.bytes_out}/{self.bytes_in} bytes "
+                        f"({self.segments} speech segments)")
+
+    def process(self, frame: AudioFrame) -> list:
+        """Frames to forward for this input frame (the pre-roll comes out at speech onset)."""
+        self.frames_in += 1
+        self.bytes_in += len(frame.data)
+        speech = self.speech = self.vad.is_speech(frame)
+        self.speech_run = self.speech_run + 1 if speech else 0
+
+        if not self.active:
+            if speech and self.speech_run >= self.onset_frames:
+                self.active = True
+                self.segments += 1
+                self._silence_run = 0
+                out = list(self.pre_roll) + [frame]
+                self.pre_roll.clear()
+                return self._count(out)
+            self.pre_roll.append(frame)
+            return []
+
+        if speech:
+            self._silence_run = 0
+        else:
+            self._silence_run += 1
+            if self._silence_run > self.hangover_frames:
+                self.active = False
+                self.pre_roll.append(frame)
+                return []
+        return self._count([frame])
+
+    def _count(self, frames: list) -> list:
+        self.frames_out += len(frames)
+        self.bytes_out += sum(len(f.data) for f in frames)
+        return frames
+
+    def stats(self) -> dict:
+        return {
+            "active": self.active,
+            "segments": self.segments,
+            "frames_in": self.frames_in,
+            "frames_out": self.frames_out,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+        }
@@ -2,6 +2,7 @@ from typing import Dict, AsyncGenerator
 import asyncio
 from app.core.config import settings
 from app.services.ai.base import AIAgentBase
+from app.services.ai.interfaces import TTSService
 from app.services.ai.echo_agent import EchoAgent
 from app.services.ai.conversational_agent import ConversationalAgent
 # Providers
@@ -9,15 +10,19 @@ from app.services.ai.providers.mock import MockSTTService, MockLLMService, MockT
 from app.services.ai.providers.google_stt import GoogleSTTService
 from app.services.ai.providers.gemini_llm import GeminiLLMService
 from app.services.ai.providers.google_tts import GoogleTTSService
+from app.services.ai.tts_cache import CachedTTSService
 from app.core.logging import logger
 
+def cached(tts: TTSService) -> TTSService:
+    return CachedTTSService(tts) if settings.TTS_CACHE_ENABLED else tts
+
 class AgentManager:
     def __init__(self):
         # Default mock
         mock_agent = ConversationalAgent(
             stt=MockSTTService(),
             llm=MockLLMService(),
-            tts=MockTTSService()
+            tts=cached(MockTTSService())
         )
         
         self.agents: Dict[str, AIAgentBase] = {
@@ -32,13 +37,20 @@ class AgentManager:
                 google_agent = ConversationalAgent(
                     stt=GoogleSTTService(),
                     llm=GeminiLLMService(),
-                    tts=GoogleTTSService()
+                    tts=cached(GoogleTTSService())
                 )
                 self.agents["google"] = google_agent
                 logger.info("Google Agent registered")
             except Exception as e:
                 logger.error(f"Failed to register Google Agent: {e}")
     
+    async def warm_up(self):
+        for name, agent in self.agents.items():
+            try:
+                await agent.warm_up()
+            except Exception as e:
+                logger.error(f"Warm-up failed for agent {name}: {e}")
+
     def get_agent(self, name: str) -> AIAgentBase:
         # If name is "default", look up settings
         if name == "default":
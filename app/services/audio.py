@@ -1,7 +1,9 @@
 import asyncio
+import math
 import time
 from typing import List, Optional, Deque
 from collections import deque
+import numpy as np
 from app.core.logging import logger
 from app.core.config import settings
 
@@ -13,11 +15,91 @@ except (ImportError, Exception) as e:
     logger.warning(f"Opus library not found or failed to load: {e}. Audio decoding/encoding will be disabled.")
     OPUS_AVAILABLE = False
 
+SILENCE_DB = -127.0
+
+def pcm_level(pcm) -> float:
+    """RMS level of a PCM16 buffer in dBFS (SILENCE_DB for digital silence)."""
+    usable = len(pcm) - len(pcm) % 2
+    if usable == 0:
+        return SILENCE_DB
+    samples = np.frombuffer(pcm[:usable], dtype="<i2").astype(np.float32)
+    mean_square = float(np.dot(samples, samples)) / len(samples)
+    if mean_square <= 1.0:
+        return SILENCE_DB
+    return float(10.0 * np.log10(mean_square / (32768.0 * 32768.0)))
+
+def opus_packet_level(packet_size: int) -> float:
+    """
+    Rough level estimate for an Opus packet without decoding it.
+    Opus VBR spends few bytes on silence/noise and more on speech, and DTX
+    packets are 1-3 bytes, so size tracks activity well enough for ranking.
+    """
+    if packet_size <= 3:
+        return SILENCE_DB
+    return -80.0 + 60.0 * min(packet_size, 120) / 120
+
 class AudioFrame:
-    def __init__(self, data: bytes, timestamp: int, duration_ms: int = 20):
-        self.data = data
+    """
+    One frame of audio. Frames are short-lived and created at frame rate, so the class
+    has no per-instance __dict__, and `data` may be a memoryview into a larger shared
+    buffer (a wire message, a TTS response, a pooled block) instead of a copy.
+    """
+    __slots__ = ("data", "timestamp", "duration_ms", "sample_rate", "channels", "seq")
+
+    def __init__(self, data, timestamp: int, duration_ms: int = 20,
+                 sample_rate: int = settings.SAMPLE_RATE, channels: int = 1, seq: int = 0):
+        self.data = data # bytes-like: bytes, bytearray or memoryview
         self.timestamp = timestamp
         self.duration_ms = duration_ms
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.seq = seq
+
+class PcmBlockPool:
+    """
+    Free list of fixed-size PCM blocks (one frame each) for hot paths that would
+    otherwise allocate a fresh buffer per frame.
+    A released block is only reused if nothing still views it (a live memoryview or
+    NumPy array keeps a buffer export open); otherwise it is left to the GC, so a
+    consumer that holds on to a frame can never see it overwritten.
+    """
+    def __init__(self, block_bytes: int, max_free: int = 256):
+        self.block_bytes = block_bytes
+        self.max_free = max_free
+        self.free: List[bytearray] = []
+
+        # Counters
+        self.allocated = 0
+        self.reused = 0
+        self.escaped = 0 # Released while still referenced; not reused
+
+    def acquire(self) -> bytearray:
+        if self.free:
+            self.reused += 1
+            return self.free.pop()
+        self.allocated += 1
+        return bytearray(self.block_bytes)
+
+    def release(self, block: bytearray):
+        if len(block) != self.block_bytes or len(self.free) >= self.max_free:
+            return
+        try:
+            # Resizing fails while any view of the block exists
+            block.append(0)
+            block.pop()
+        except BufferError:
+            self.escaped += 1
+            return
+        self.free.append(block)
+
+    def stats(self) -> dict:
+        return {
+            "block_bytes": self.block_bytes,
+            "free": len(self.free),
+            "allocated": self.allocated,
+            "reused": self.reused,
+            "escaped": self.escaped,
+        }
 
 class OpusCodec:
     def __init__(self, sample_rate: int = 16000, channels: int = 1, application='voip'):
@@ -57,40 +139,200 @@ class OpusCodec:
             logger.error(f"Opus decode error: {e}")
             return b""
 
+    def conceal(self, frame_size: int) -> bytes:
+        """Packet loss concealment: decoding an empty packet makes libopus extrapolate."""
+        if not self.decoder:
+            return b""
+        try:
+            return self.decoder.decode(b"", frame_size)
+        except Exception as e:
+            logger.error(f"Opus PLC error: {e}")
+            return b""
+
+class JitterEstimator:
+    """
+    RFC 3550 style interarrival jitter, in ms.
+    Expected spacing comes from sequence numbers (one frame per seq), so it does not
+    depend on clients filling in sensible timestamps.
+    """
+    def __init__(self, frame_duration_ms: int = 20):
+        self.frame_duration_ms = frame_duration_ms
+        self.jitter_ms = 0.0
+        self.peak_ms = 0.0 # Recent worst-case delay variation: jumps up at once, decays slowly
+        self._last_seq: Optional[int] = None
+        self._last_arrival = 0.0
+
+    def update(self, seq: int, arrival: float):
+        """`arrival` is time.monotonic() in seconds."""
+        if self._last_seq is not None:
+            seq_delta = (seq - self._last_seq) & 0xFFFFFFFF
+            if 0 < seq_delta < 0x80000000:
+                transit = (arrival - self._last_arrival) * 1000 - seq_delta * self.frame_duration_ms
+                self.jitter_ms += (abs(transit) - self.jitter_ms) / 16
+                self.peak_ms = max(abs(transit), self.peak_ms * 0.995)
+            elif seq_delta:
+                return # Reordered; keep the newest as reference
+        self._last_seq = seq
+        self._last_arrival = arrival
+
 class JitterBuffer:
     """
-    Simple Jitter Buffer for ordering packets and handling basic packet loss/late arrival.
-    Stores AudioFrames.
+    Sequence-indexed playout buffer for one sender, backed by a fixed-size ring.
+    push() and pop() are O(1): a frame lives at ring[seq % capacity].
+    pop() is called once per frame period by the consumer's clock. Playout starts once
+    `target_depth` frames are buffered; the target adapts to the measured jitter.
+    A missing frame is concealed (Opus PLC when `decoder` is set, else repeat or
+    silence) instead of skipping ahead. With a decoder, pushed frames are Opus packets
+    and are decoded here, in sequence order, as decoder state requires.
+    With CONCEAL_NONE a missing frame comes back empty (no data), so the caller can
+    decode and conceal in order elsewhere (e.g. on the Opus thread pool).
     """
-    def __init__(self, buffer_ms: int = 60, frame_duration_ms: int = 20):
-        self.buffer_ms = buffer_ms
+    CONCEAL_SILENCE = "silence"
+    CONCEAL_REPEAT = "repeat"
+    CONCEAL_NONE = "none"
+
+    def __init__(self, capacity: int = 32, frame_duration_ms: int = 20,
+                 min_depth: int = 1, max_depth: int = 10, max_conceal: int = 3,
+                 concealment: str = CONCEAL_REPEAT, decoder: Optional["OpusCodec"] = None,
+                 sample_rate: int = settings.SAMPLE_RATE):
+        self.capacity = capacity
         self.frame_duration_ms = frame_duration_ms
-        self.buffer: List[AudioFrame] = []
-        self.last_popped_timestamp = 0
-        
-    def push(self, frame: AudioFrame):
-        # Drop if too old
-        if self.last_popped_timestamp > 0 and frame.timestamp < self.last_popped_timestamp:
+        self.min_depth = min_depth
+        self.max_depth = min(max_depth, capacity)
+        self.max_conceal = max_conceal # Consecutive concealed frames before re-buffering
+        self.concealment = concealment
+        self.decoder = decoder
+        self.frame_samples = sample_rate * frame_duration_ms // 1000
+        self.ring: List[Optional[tuple]] = [None] * capacity # (seq, AudioFrame)
+        self.count = 0
+        self.next_seq: Optional[int] = None
+        self.playing = False
+        self.target_depth = min_depth
+        self.estimator = JitterEstimator(frame_duration_ms)
+        self._last: Optional[AudioFrame] = None
+        self._conceal_run = 0
+
+        # Counters
+        self.received = 0
+        self.played = 0
+        self.late = 0
+        self.duplicate = 0
+        self.lost = 0
+        self.concealed = 0
+        self.discarded = 0
+        self.underruns = 0
+
+    def push(self, seq: int, frame: AudioFrame, arrival: Optional[float] = None):
+        self.received += 1
+        self.estimator.update(seq, time.monotonic() if arrival is None else arrival)
+        self._adapt()
+        if self.next_seq is None:
+            self.next_seq = seq
+        offset = (seq - self.next_seq) & 0xFFFFFFFF
+        if offset >= 0x80000000:
+            self.late += 1 # Its playout slot has passed
             return
-            
-        # Insert sorted
-        self.buffer.append(frame)
-        self.buffer.sort(key=lambda x: x.timestamp)
-        
-        # Trim if too large (simple strategy: drop oldest)
-        # Ideally we drift handling, but this is basic
-        max_frames = (self.buffer_ms * 2) // self.frame_duration_ms # Allow some burst
-        if len(self.buffer) > max_frames:
-             self.buffer.pop(0)
+        if offset >= self.capacity:
+            # Too far ahead (long gap or sender restart): jump to it
+            self._reset(seq)
+        index = seq % self.capacity
+        entry = self.ring[index]
+        if entry is not None:
+            if entry[0] == seq:
+                self.duplicate += 1
+                return
+            self.count -= 1
+        self.ring[index] = (seq, frame)
+        self.count += 1
 
     def pop(self) -> Optional[AudioFrame]:
-        if not self.buffer:
+        """One frame period worth of audio, or None while (re)buffering."""
+        if not self.playing:
+            if self.count < self.target_depth:
+                return None
+            self.playing = True
+        # Latency crept above what the jitter calls for: drop one frame to catch up
+        if self.count > self.target_depth + 2 and self._take(self.next_seq) is not None:
+            self.discarded += 1
+            self.next_seq = (self.next_seq + 1) & 0xFFFFFFFF
+
+        seq = self.next_seq
+        entry = self._take(seq)
+        if entry is not None:
+            self.next_seq = (seq + 1) & 0xFFFFFFFF
+            self._conceal_run = 0
+            frame = self._decode(entry)
+            self._last = frame
+            self.played += 1
+            return frame
+
+        if self.count == 0 and self._conceal_run >= self.max_conceal:
+            # Sender went quiet (or left): stop and wait for the buffer to refill
+            self.playing = False
+            self.next_seq = None
+            self.underruns += 1
             return None
-        
-        # Check if we have enough buffered? 
-        # For real-time, we might just verify continuity or minimum depth
-        # For simplicity: just pop the first available if it's "time"
-        
-        frame = self.buffer.pop(0)
-        self.last_popped_timestamp = frame.timestamp
+        if self.count > 0:
+            self.lost += 1
+        self.next_seq = (seq + 1) & 0xFFFFFFFF
+        self._conceal_run += 1
+        self.concealed += 1
+        return self._conceal()
+
+    def _take(self, seq: int) -> Optional[AudioFrame]:
+        index = seq % self.capacity
+        entry = self.ring[index]
+        if entry is None or entry[0] != seq:
+            return None
+        self.ring[index] = None
+        self.count -= 1
+        return entry[1]
+
+    def _decode(self, frame: AudioFrame) -> AudioFrame:
+        if self.decoder is None:
+            return frame
+        pcm = self.decoder.decode(bytes(frame.data), self.frame_samples)
+        return AudioFrame(pcm or bytes(self.frame_samples * 2), frame.timestamp, self.frame_duration_ms)
+
+    def _conceal(self) -> AudioFrame:
+        timestamp = (self._last.timestamp + self.frame_duration_ms) if self._last else 0
+        if self.concealment == self.CONCEAL_NONE and self.decoder is None:
+            return AudioFrame(b"", timestamp, self.frame_duration_ms)
+        data = b""
+        if self.decoder is not None:
+            data = self.decoder.conceal(self.frame_samples)
+        elif self.concealment == self.CONCEAL_REPEAT and self._last is not None:
+            data = self._last.data
+        frame = AudioFrame(data or bytes(self.frame_samples * 2), timestamp, self.frame_duration_ms)
+        self._last = frame
         return frame
+
+    def _adapt(self):
+        # Enough depth to ride out the recent worst-case delay variation, within bounds
+        wanted = 1 + math.ceil(self.estimator.peak_ms / self.frame_duration_ms)
+        self.target_depth = max(self.min_depth, min(self.max_depth, wanted))
+
+    def _reset(self, seq: int):
+        self.discarded += self.count
+        self.ring = [None] * self.capacity
+        self.count = 0
+        self.next_seq = seq
+
+    def depth(self) -> int:
+        return self.count
+
+    def stats(self) -> dict:
+        return {
+            "depth": self.count,
+            "target_depth": self.target_depth,
+            "jitter_ms": round(self.estimator.jitter_ms, 2),
+            "peak_jitter_ms": round(self.estimator.peak_ms, 2),
+            "received": self.received,
+            "played": self.played,
+            "late": self.late,
+            "duplicate": self.duplicate,
+            "lost": self.lost,
+            "concealed": self.concealed,
+            "discarded": self.discarded,
+            "underruns": self.underruns,
+        }
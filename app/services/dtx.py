@@ -0,0 +1,114 @@
+from enum import IntEnum
+from typing import Dict
+import msgpack
+from app.core.config import settings
+from app.core.protocol import AudioCodec, AudioFormat, MessageType, pack_comfort_noise
+from app.services.audio import SILENCE_DB
+from app.services.ingress import IngressFrame
+
+class DtxDecision(IntEnum):
+    FORWARD = 0
+    DROP = 1
+    COMFORT_NOISE = 2 # Drop the audio, send a comfort-noise marker instead
+
+class SilenceSuppressor:
+    """
+    Discontinuous transmission for one sender.
+    Speech is forwarded, plus a hangover after it ends so word tails and short
+    pauses are not clipped. Past the hangover, silent frames are dropped and a
+    comfort-noise marker goes out every `comfort_noise_frames` frames.
+    """
+    def __init__(self, threshold_db: float, hangover_frames: int, comfort_noise_frames: int):
+        self.threshold_db = threshold_db
+        self.hangover_frames = hangover_frames
+        self.comfort_noise_frames = max(1, comfort_noise_frames)
+        self._silent_run = hangover_frames # Start suppressed until the first speech
+        self.noise_level_db = threshold_db
+
+    def process(self, level: float) -> DtxDecision:
+        if level >= self.threshold_db:
+            self._silent_run = 0
+            return DtxDecision.FORWARD
+        # Track the background level for comfort noise
+        self.noise_level_db += 0.1 * (level - self.noise_level_db)
+        self._silent_run += 1
+        if self._silent_run <= self.hangover_frames:
+            return DtxDecision.FORWARD
+        # A marker on the first suppressed frame, then every `comfort_noise_frames`
+        if (self._silent_run - self.hangover_frames - 1) % self.comfort_noise_frames == 0:
+            return DtxDecision.COMFORT_NOISE
+        return DtxDecision.DROP
+
+OPUS_DTX_PACKET_BYTES = 3 # Opus encoder DTX emits packets of this size or less
+
+class DtxStage:
+    """
+    Per-room DTX ahead of fan-out, with counters for what it saved.
+    PCM frames are judged by their measured level. Opus frames are not decoded
+    here, and packet size says too little about level (speech at a low bitrate
+    is as small as noise at a high one), so only the sender's own encoder-DTX
+    packets count as silence.
+    """
+    def __init__(self, threshold_db: float = settings.DTX_THRESHOLD_DB,
+                 hangover_ms: int = settings.DTX_HANGOVER_MS,
+                 comfort_noise_ms: int = settings.DTX_COMFORT_NOISE_MS,
+                 frame_ms: int = settings.FRAME_DURATION_MS):
+        self.threshold_db = threshold_db
+        self.hangover_frames = hangover_ms // frame_ms
+        self.comfort_noise_frames = comfort_noise_ms // frame_ms
+        self.senders: Dict[str, SilenceSuppressor] = {}
+
+        # Counters
+        self.frames_in = 0
+        self.frames_suppressed = 0
+        self.comfort_noise_sent = 0
+        self.sends_saved = 0
+        self.bytes_saved = 0
+
+    def decide(self, frame: IngressFrame) -> DtxDecision:
+        suppressor = self.senders.get(frame.sender_id)
+        if suppressor is None:
+            suppressor = self.senders[frame.sender_id] = SilenceSuppressor(
+                self.threshold_db, self.hangover_frames, self.comfort_noise_frames
+            )
+        self.frames_in += 1
+        decision = suppressor.process(self._level(frame))
+        if decision != DtxDecision.FORWARD:
+            self.frames_suppressed += 1
+        return decision
+
+    def _level(self, frame: IngressFrame) -> float:
+        if frame.codec == AudioCodec.OPUS:
+            return SILENCE_DB if len(frame.audio) <= OPUS_DTX_PACKET_BYTES else self.threshold_db
+        return frame.level
+
+    def comfort_noise(self, frame: IngressFrame, slot: int, audio_format: AudioFormat) -> bytes:
+        level = int(-self.senders[frame.sender_id].noise_level_db)
+        if audio_format == AudioFormat.BINARY:
+            return pack_comfort_noise(slot, frame.seq, frame.timestamp, level)
+        return msgpack.packb({
+            "type": MessageType.COMFORT_NOISE.value,
+            "payload": {
+                "participant_id": frame.sender_id,
+                "level": level,
+                "timestamp": frame.timestamp
+            }
+        }, use_bin_type=True)
+
+    def count_skipped(self, frame: IngressFrame, replacement_bytes: int = 0):
+        self.sends_saved += 0 if replacement_bytes else 1
+        self.bytes_saved += len(frame.wire) - replacement_bytes
+        if replacement_bytes:
+            self.comfort_noise_sent += 1
+
+    def remove(self, sender_id: str):
+        self.senders.pop(sender_id, None)
+
+    def stats(self) -> dict:
+        return {
+            "frames_in": self.frames_in,
+            "frames_suppressed": self.frames_suppressed,
+            "comfort_noise_sent": self.comfort_noise_sent,
+            "sends_saved": self.sends_saved,
+            "bytes_saved": self.bytes_saved,
+        }
@@ -0,0 +1,155 @@
+import time
+from dataclasses import dataclass, replace
+from typing import Optional
+import msgpack
+from app.core.protocol import (
+    MessageType, AudioCodec, AUDIO_HEADER_SIZE,
+    is_binary_frame, unpack_audio_header, with_slot,
+)
+from app.services.audio import AudioFrame, pcm_level, opus_packet_level
+
+@dataclass(frozen=True, slots=True)
+class IngressFrame:
+    """
+    An inbound audio frame, parsed exactly once.
+    Shared as-is by broadcast (wire), agents (audio_frame) and the recorder (audio).
+    """
+    sender_id: str
+    seq: int
+    timestamp: int
+    codec: int # Codec of `audio`
+    wire: bytes # Original bytes as received, forwarded to humans without a copy
+    audio: memoryview # Payload view into `wire` (or into the decoded msgpack blob)
+    audio_frame: AudioFrame # Decoded frame handed to agents
+    received_at: float # time.monotonic() when the frame hit the server
+    level: float # Audio level in dBFS, computed once here for speaker ranking
+
+    def with_pcm(self, pcm: bytes) -> "IngressFrame":
+        """The same frame with its payload swapped for decoded PCM; `wire` is kept for forwarding."""
+        audio = memoryview(pcm)
+        return replace(self, codec=AudioCodec.PCM16, audio=audio,
+                       audio_frame=AudioFrame(audio, timestamp=self.timestamp, seq=self.seq))
+
+def frame_level(codec: int, audio) -> float:
+    if codec == AudioCodec.OPUS:
+        return opus_packet_level(len(audio))
+    return pcm_level(audio)
+
+class AudioIngress:
+    """
+    Per-sender ingress stage. Turns wire bytes into IngressFrames.
+    msgpack frames carry no sequence number, so one is assigned here.
+    """
+    def __init__(self, participant):
+        self.participant = participant
+        self._seq = 0
+
+    def _next_seq(self) -> int:
+        seq = self._seq
+        self._seq = (self._seq + 1) & 0xFFFFFFFF
+        return seq
+
+    def from_binary(self, data: bytes) -> IngressFrame:
+        header = unpack_audio_header(data)
+        if header.slot != self.participant.slot:
+            # Clients may not know (or may misreport) their slot; stamp the real one
+            data = with_slot(data, self.participant.slot)
+        self._seq = (header.seq + 1) & 0xFFFFFFFF
+        received_at = time.monotonic()
+        self.participant.jitter.update(header.seq, received_at)
+        audio = memoryview(data)[AUDIO_HEADER_SIZE:]
+        return IngressFrame(
+            sender_id=self.participant.id,
+            seq=header.seq,
+            timestamp=header.timestamp,
+            codec=header.codec,
+            wire=data,
+            audio=audio,
+            audio_frame=AudioFrame(audio, timestamp=header.timestamp, sample_rate=self.participant.sample_rate,
+                                   channels=self.participant.channels, seq=header.seq),
+            received_at=received_at,
+            level=frame_level(header.codec, audio),
+        )
+
+    def from_message(self, message: dict, data: bytes) -> Optional[IngressFrame]:
+        """Builds a frame from an already unpacked msgpack AUDIO_STREAM message."""
+        payload = message.get("payload") or {}
+        audio_bytes = payload.get("audio_data")
+        if not audio_bytes:
+            return None
+        timestamp = payload.get("timestamp", 0) or 0
+        codec = payload.get("codec", AudioCodec.PCM16)
+        audio = memoryview(audio_bytes)
+        seq = self._next_seq()
+        received_at = time.monotonic()
+        self.participant.jitter.update(seq, received_at)
+        return IngressFrame(
+            sender_id=self.participant.id,
+            seq=seq,
+            timestamp=timestamp,
+            codec=codec,
+            wire=data,
+            audio=audio,
+            audio_frame=AudioFrame(audio, timestamp=timestamp, sample_rate=self.participant.sample_rate,
+                                   channels=self.participant.channels, seq=seq),
+            received_at=received_at,
+            level=frame_level(codec, audio),
+        )
+
+    def from_audio_frame(self, frame: AudioFrame, opus_packet: Optional[bytes] = None) -> IngressFrame:
+        """
+        Wraps audio produced server-side (agent output) in the msgpack envelope.
+        With `opus_packet`, listeners get Opus on the wire while PCM consumers keep the PCM.
+        """
+        timestamp = frame.timestamp or 0
+        payload = {
+            "participant_id": self.participant.id,
+            "audio_data": opus_packet or frame.data,
+            "timestamp": timestamp
+        }
+        if opus_packet:
+            payload["codec"] = AudioCodec.OPUS.value
+        wire = msgpack.packb({"type": MessageType.AUDIO_STREAM.value, "payload": payload}, use_bin_type=True)
+        return IngressFrame(
+            sender_id=self.participant.id,
+            seq=self._next_seq(),
+            timestamp=timestamp,
+            codec=AudioCodec.PCM16,
+            wire=wire,
+            audio=memoryview(frame.data),
+            audio_frame=frame,
+            received_at=time.monotonic(),
+            level=pcm_level(frame.data),
+        )
+
+def frame_from_wire(sender_id: str, seq: int, wire: bytes) -> Optional[IngressFrame]:
+    """
+    Rebuilds a frame from wire bytes that were already validated elsewhere
+    (e.g. relayed by another worker). Binary frames need no msgpack at all.
+    """
+    if is_binary_frame(wire):
+        header = unpack_audio_header(wire)
+        audio = memoryview(wire)[AUDIO_HEADER_SIZE:]
+        timestamp, codec = header.timestamp, header.codec
+    else:
+        try:
+            message = msgpack.unpackb(wire, raw=False)
+        except Exception:
+            return None
+        payload = (message.get("payload") or {}) if isinstance(message, dict) else {}
+        if not payload.get("audio_data"):
+            return None
+        audio = memoryview(payload["audio_data"])
+        timestamp = payload.get("timestamp", 0) or 0
+        codec = payload.get("codec", AudioCodec.PCM16)
+    return IngressFrame(
+        sender_id=sender_id,
+        seq=seq,
+        timestamp=timestamp,
+        codec=codec,
+        wire=wire,
+        audio=audio,
+        audio_frame=AudioFrame(audio, timestamp=timestamp, seq=seq),
+        received_at=time.monotonic(),
+        level=frame_level(codec, audio),
+    )
@@ -0,0 +1,138 @@
+import time
+from collections import deque
+from typing import Deque, Dict, Optional
+import msgpack
+import numpy as np
+from app.core.config import settings
+from app.core.protocol import AudioCodec, AudioFormat, MessageType, pack_audio_frame
+from app.services.ingress import IngressFrame
+
+# Slot used in binary headers for server-mixed audio (not a real participant)
+MIXED_SLOT = 0xFFFE
+MIXER_PARTICIPANT_ID = "mixer"
+
+class MixResult:
+    """
+    One tick of mixed audio. Contributors hear everyone but themselves;
+    everybody else hears the full mix.
+    """
+    def __init__(self, total: np.ndarray, minus_one: Dict[str, np.ndarray], seq: int, timestamp: int):
+        self.total = total # int16 PCM, full mix
+        self.minus_one = minus_one # sender_id -> int16 PCM without that sender
+        self.seq = seq
+        self.timestamp = timestamp
+        self._total_wire: Dict[AudioFormat, bytes] = {}
+
+    def encode_for(self, listener_id: str, audio_format: AudioFormat) -> bytes:
+        pcm = self.minus_one.get(listener_id)
+        if pcm is None:
+            # Listeners who did not talk this tick share one encoded buffer
+            if audio_format not in self._total_wire:
+                self._total_wire[audio_format] = self._encode(self.total, audio_format)
+            return self._total_wire[audio_format]
+        return self._encode(pcm, audio_format)
+
+    def _encode(self, pcm: np.ndarray, audio_format: AudioFormat) -> bytes:
+        data = pcm.tobytes()
+        if audio_format == AudioFormat.BINARY:
+            return pack_audio_frame(data, self.seq, self.timestamp, slot=MIXED_SLOT)
+        return msgpack.packb({
+            "type": MessageType.AUDIO_STREAM.value,
+            "payload": {
+                "participant_id": MIXER_PARTICIPANT_ID,
+                "audio_data": data,
+                "timestamp": self.timestamp
+            }
+        }, use_bin_type=True)
+
+class RoomMixer:
+    """
+    Server-side mixer for one room (MCU mode).
+    Incoming PCM frames are queued per sender; every tick takes the
+    oldest pending frame from each sender and mixes them with NumPy in one pass.
+    """
+    def __init__(self, frame_samples: Optional[int] = None, max_pending: int = 5):
+        self.frame_samples = frame_samples or settings.SAMPLE_RATE * settings.FRAME_DURATION_MS // 1000
+        self.max_pending = max_pending # Per sender; bounds latency if a sender runs fast
+        self.pending: Dict[str, Deque[np.ndarray]] = {}
+        self.last_timestamp: Dict[str, int] = {}
+        self.seq = 0
+        self._start = time.monotonic()
+
+        # Counters
+        self.frames_in = 0
+        self.frames_late = 0
+        self.frames_overflow = 0
+        self.ticks = 0
+        self.silent_ticks = 0
+
+    def push(self, frame: IngressFrame):
+        # Drop frames that arrive after a newer one from the same sender was queued
+        last = self.last_timestamp.get(frame.sender_id)
+        if last is not None and frame.timestamp < last:
+            self.frames_late += 1
+            return
+        self.last_timestamp[frame.sender_id] = frame.timestamp
+
+        pcm = self._decode(frame)
+        if pcm is None:
+            return
+        self.frames_in += 1
+        queue = self.pending.setdefault(frame.sender_id, deque())
+        if len(queue) >= self.max_pending:
+            queue.popleft()
+            self.frames_overflow += 1
+        queue.append(pcm)
+
+    def _decode(self, frame: IngressFrame) -> Optional[np.ndarray]:
+        # Opus frames are decoded before they reach the mixer (see OpusTranscoder)
+        if frame.codec != AudioCodec.PCM16:
+            return None
+        data = frame.audio
+        usable = len(data) - len(data) % 2
+        samples = np.frombuffer(data[:usable], dtype="<i2")
+        # Normalise to exactly one frame so rows stack. Copied, so a pending frame
+        # never pins (or sees changes to) the sender's buffer
+        if len(samples) >= self.frame_samples:
+            return samples[:self.frame_samples].copy()
+        return np.pad(samples, (0, self.frame_samples - len(samples)))
+
+    def remove_sender(self, sender_id: str):
+        self.pending.pop(sender_id, None)
+        self.last_timestamp.pop(sender_id, None)
+
+    def mix(self) -> Optional[MixResult]:
+        """Mixes one tick. Returns None when nobody has audio pending."""
+        self.ticks += 1
+        senders = [sid for sid, queue in self.pending.items() if queue]
+        if not senders:
+            self.silent_ticks += 1
+            return None
+
+        # (K, S) int32 so sums of K int16 streams cannot overflow
+        stack = np.empty((len(senders), self.frame_samples), dtype=np.int32)
+        for row, sender_id in enumerate(senders):
+            stack[row] = self.pending[sender_id].popleft()
+        total = stack.sum(axis=0)
+        # N-minus-one for every contributor at once: total - own row, clipped in one pass
+        minus_one = np.clip(total[np.newaxis, :] - stack, -32768, 32767).astype("<i2")
+        total_pcm = np.clip(total, -32768, 32767).astype("<i2")
+
+        self.seq = (self.seq + 1) & 0xFFFFFFFF
+        timestamp = int((time.monotonic() - self._start) * 1000)
+        return MixResult(
+            total_pcm,
+            {sender_id: minus_one[row] for row, sender_id in enumerate(senders)},
+            self.seq,
+            timestamp,
+        )
+
+    def stats(self) -> dict:
+        return {
+            "senders": len(self.pending),
+            "frames_in": self.frames_in,
+            "frames_late": self.frames_late,
+            "frames_overflow": self.frames_overflow,
+            "ticks": self.ticks,
+            "silent_ticks": self.silent_ticks,
+        }
@@ -0,0 +1,188 @@
+import asyncio
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, Optional
+from app.core.config import settings
+from app.core.logging import logger
+from app.services.audio import AudioFrame, PcmBlockPool
+
+SILENCE = memoryview(bytes(64 * 1024))
+
+FrameSink = Callable[[AudioFrame], Awaitable[None]]
+
+class PacedStream:
+    """
+    One agent's output buffer on the shared pacer.
+    Accepts audio in any chunk size, copied straight into pooled frame-sized blocks.
+    put() waits while the buffer is full, so synthesis cannot run more than
+    `max_frames` ahead of playout.
+    """
+    def __init__(self, stream_id: str, sink: FrameSink, pool: PcmBlockPool, max_frames: int):
+        self.stream_id = stream_id
+        self.sink = sink
+        self.pool = pool
+        self.frame_bytes = pool.block_bytes
+        self.max_frames = max_frames
+        self.frames: Deque[bytearray] = deque()
+        self._block: Optional[bytearray] = None # Block being filled
+        self._fill = 0
+        self._space = asyncio.Event()
+        self._space.set()
+        self.seq = 0
+
+        # Counters
+        self.sent = 0
+        self.flushed = 0
+
+    async def put(self, data):
+        view = memoryview(data)
+        if view.format != "B":
+            view = view.cast("B")
+        if self._block is None and len(view) == self.frame_bytes:
+            # The usual case, one whole frame per chunk: a single copy into a fresh block
+            while len(self.frames) >= self.max_frames:
+                self._space.clear()
+                await self._space.wait()
+            block = self.pool.acquire()
+            block[:] = view
+            self.frames.append(block)
+            return
+        offset = 0
+        while offset < len(view):
+            if self._block is None:
+                while len(self.frames) >= self.max_frames:
+                    self._space.clear()
+                    await self._space.wait()
+                self._block = self.pool.acquire()
+                self._fill = 0
+            n = min(self.frame_bytes - self._fill, len(view) - offset)
+            if n == len(view):
+                self._block[self._fill:self._fill + n] = view # Whole chunk, no slice view
+            else:
+                self._block[self._fill:self._fill + n] = view[offset:offset + n]
+            self._fill += n
+            offset += n
+            if self._fill == self.frame_bytes:
+                self.frames.append(self._block)
+                self._block = None
+
+    def flush(self) -> int:
+        """Drops everything not yet sent (e.g. on barge-in). Returns frames dropped."""
+        dropped = len(self.frames)
+        self.flushed += dropped
+        while self.frames:
+            self.pool.release(self.frames.popleft())
+        if self._block is not None:
+            self.pool.release(self._block)
+            self._block = None
+        self._space.set()
+        return dropped
+
+    def next_frame(self) -> Optional[bytearray]:
+        """The next block to send; the caller releases it to the pool once sent."""
+        if self.frames:
+            block = self.frames.popleft()
+            self._space.set()
+            return block
+        if self._block is not None:
+            # Tail of an utterance: pad it out rather than hold it back
+            block = self._block
+            block[self._fill:] = SILENCE[:self.frame_bytes - self._fill]
+            self._block = None
+            return block
+        return None
+
+    def stats(self) -> dict:
+        return {
+            "buffered": len(self.frames),
+            "sent": self.sent,
+            "flushed": self.flushed,
+        }
+
+class OutputPacer:
+    """
+    Process-wide real-time clock for agent output.
+    One drift-corrected tick per frame period takes the next frame from every active
+    stream and sends them together, instead of one sleep per agent per frame.
+    Frames get timestamps from this clock, so clients see an even cadence.
+    """
+    def __init__(self, frame_duration_ms: int = settings.FRAME_DURATION_MS,
+                 sample_rate: int = settings.SAMPLE_RATE):
+        self.frame_duration_ms = frame_duration_ms
+        self.sample_rate = sample_rate
+        self.pool = PcmBlockPool(sample_rate * frame_duration_ms // 1000 * 2)
+        self.streams: Dict[str, PacedStream] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._epoch = time.monotonic()
+
+        # Counters
+        self.ticks = 0
+        self.late_ticks = 0
+        self.max_tick_ms = 0.0
+
+    def register(self, stream_id: str, sink: FrameSink,
+                 max_frames: int = settings.AGENT_OUTPUT_QUEUE_FRAMES) -> PacedStream:
+        stream = PacedStream(stream_id, sink, self.pool, max_frames)
+        self.streams[stream_id] = stream
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return stream
+
+    def unregister(self, stream_id: str):
+        stream = self.streams.pop(stream_id, None)
+        if stream:
+            stream.flush()
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        period = self.frame_duration_ms / 1000
+        next_tick = loop.time()
+        try:
+            while self.streams:
+                next_tick += period
+                delay = next_tick - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                elif delay < -5 * period:
+                    # Fell far behind (e.g. loop stall); resync instead of bursting
+                    self.late_ticks += 1
+                    next_tick = loop.time()
+
+                started = time.monotonic()
+                timestamp = int((started - self._epoch) * 1000) & 0xFFFFFFFF
+                sends = []
+                blocks = []
+                for stream in list(self.streams.values()):
+                    block = stream.next_frame()
+                    if block is None:
+                        continue
+                    stream.sent += 1
+                    stream.seq = (stream.seq + 1) & 0xFFFFFFFF
+                    blocks.append(block)
+                    frame = AudioFrame(memoryview(block), timestamp, self.frame_duration_ms, self.sample_rate,
+                                       seq=stream.seq)
+                    sends.append(stream.sink(frame))
+                if sends:
+                    # Together, so per-frame work (e.g. Opus encoding) is batched across agents
+                    for result in await asyncio.gather(*sends, return_exceptions=True):
+                        if isinstance(result, Exception):
+                            logger.error(f"Paced send failed: {result}")
+                # Sinks copy what they keep (wire encoding, mixer); blocks still viewed are not reused
+                frame = sends = None
+                for block in blocks:
+                    self.pool.release(block)
+                self.ticks += 1
+                self.max_tick_ms = max(self.max_tick_ms, (time.monotonic() - started) * 1000)
+        except asyncio.CancelledError:
+            pass
+
+    def stats(self) -> dict:
+        return {
+            "streams": len(self.streams),
+            "ticks": self.ticks,
+            "late_ticks": self.late_ticks,
+            "max_tick_ms": round(self.max_tick_ms, 2),
+            "pool": self.pool.stats(),
+        }
+
+output_pacer = OutputPacer()
@@ -0,0 +1,196 @@
+import asyncio
+import time
+from collections import deque
+from enum import Enum
+from typing import Deque, Optional, Tuple
+from app.core.logging import logger
+
+class OverflowPolicy(str, Enum):
+    DROP_OLDEST = "drop_oldest" # Keep the freshest audio (real-time default)
+    DROP_NEWEST = "drop_newest" # Keep what is queued, refuse new frames
+
+class OutboundQueue:
+    """
+    Bounded send queue for a single listener, drained by one writer task.
+    Audio is bounded and may be dropped according to the overflow policy.
+    Control messages are never dropped and jump ahead of queued audio.
+    Items are ASGI send messages, so the writer can hand them straight to the socket.
+    """
+    def __init__(self, max_audio: int, policy: OverflowPolicy = OverflowPolicy.DROP_OLDEST):
+        self.max_audio = max_audio
+        self.policy = OverflowPolicy(policy)
+        self.audio: Deque[Tuple[Optional[str], dict]] = deque() # (sender_id, message)
+        self.control: Deque[dict] = deque()
+        self._ready = asyncio.Event()
+
+        # Counters
+        self.enqueued = 0
+        self.sent = 0
+        self.dropped = 0
+        self.dropped_bytes = 0
+        self.purged = 0
+        self.high_water = 0
+
+    def put_audio(self, message: dict, sender_id: Optional[str] = None) -> bool:
+        """Returns False if a frame had to be dropped to respect the bound."""
+        self.enqueued += 1
+        accepted = True
+        if len(self.audio) >= self.max_audio:
+            if self.policy == OverflowPolicy.DROP_NEWEST:
+                self._count_drop(message)
+                return False
+            self._count_drop(self.audio.popleft()[1])
+            accepted = False
+        self.audio.append((sender_id, message))
+        self.high_water = max(self.high_water, len(self.audio))
+        self._ready.set()
+        return accepted
+
+    def put_control(self, message: dict):
+        self.enqueued += 1
+        self.control.append(message)
+        self._ready.set()
+
+    async def get(self) -> dict:
+        while not self.control and not self.audio:
+            self._ready.clear()
+            await self._ready.wait()
+        self.sent += 1
+        if self.control:
+            return self.control.popleft()
+        return self.audio.popleft()[1]
+
+    def purge(self, sender_id: str) -> int:
+        """Drops every queued frame from one sender (e.g. an interrupted agent)."""
+        kept = deque(item for item in self.audio if item[0] != sender_id)
+        purged = len(self.audio) - len(kept)
+        self.audio = kept
+        self.purged += purged
+        return purged
+
+    def depth(self) -> int:
+        return len(self.audio) + len(self.control)
+
+    def _count_drop(self, message: dict):
+        self.dropped += 1
+        self.dropped_bytes += len(message.get("bytes") or b"")
+
+    def stats(self) -> dict:
+        return {
+            "depth": self.depth(),
+            "audio_depth": len(self.audio),
+            "control_depth": len(self.control),
+            "high_water": self.high_water,
+            "enqueued": self.enqueued,
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "dropped_bytes": self.dropped_bytes,
+            "purged": self.purged,
+            "policy": self.policy.value,
+        }
+
+class AgentInputQueue:
+    """
+    Bounded real-time queue feeding one agent session.
+    Bounded by frame count and by payload bytes (the hard memory cap). When full,
+    the oldest audio is dropped; frames already older than `max_lag_ms` when the
+    agent asks for them are skipped, so a recovering agent resumes near live
+    instead of working through stale audio.
+    """
+    def __init__(self, name: str, max_frames: int, max_bytes: int,
+                 max_lag_ms: float, warn_lag_ms: float):
+        self.name = name
+        self.max_frames = max_frames
+        self.max_bytes = max_bytes
+        self.max_lag_ms = max_lag_ms
+        self.warn_lag_ms = warn_lag_ms
+        self.frames: Deque[Tuple[float, object]] = deque() # (received_at, IngressFrame)
+        self.bytes = 0
+        self._ready = asyncio.Event()
+        self._lagging = False
+
+        # Counters
+        self.enqueued = 0
+        self.delivered = 0
+        self.dropped_overflow = 0
+        self.dropped_stale = 0
+        self.dropped_bytes = 0
+        self.high_water = 0
+        self.lag_ms = 0.0
+        self.max_seen_lag_ms = 0.0
+        self.lag_warnings = 0
+
+    def put(self, frame):
+        """Never blocks the broadcaster; makes room by dropping the oldest audio."""
+        size = len(frame.audio)
+        self.enqueued += 1
+        while self.frames and (len(self.frames) >= self.max_frames or self.bytes + size > self.max_bytes):
+            self._drop()
+            self.dropped_overflow += 1
+        self.frames.append((frame.received_at, frame))
+        self.bytes += size
+        self.high_water = max(self.high_water, len(self.frames))
+        self._ready.set()
+
+    async def get(self):
+        """Returns the oldest frame that is still fresh enough to be worth processing."""
+        while not self.frames:
+            self._ready.clear()
+            await self._ready.wait()
+        return self._pop_fresh()
+
+    def drain(self) -> list:
+        """Everything fresh that is queued right now, without waiting."""
+        frames = []
+        while self.frames:
+            frames.append(self._pop_fresh())
+        return frames
+
+    def _pop_fresh(self):
+        now = time.monotonic()
+        while True:
+            received_at, frame = self.frames[0]
+            lag_ms = (now - received_at) * 1000
+            if lag_ms > self.max_lag_ms and len(self.frames) > 1:
+                self._drop()
+                self.dropped_stale += 1
+                continue
+            self.frames.popleft()
+            self.bytes -= len(frame.audio)
+            self.delivered += 1
+            self._track_lag(lag_ms)
+            return frame
+
+    def _drop(self):
+        _, frame = self.frames.popleft()
+        size = len(frame.audio)
+        self.bytes -= size
+        self.dropped_bytes += size
+
+    def _track_lag(self, lag_ms: float):
+        self.lag_ms = lag_ms
+        self.max_seen_lag_ms = max(self.max_seen_lag_ms, lag_ms)
+        # Warn once per episode, re-arm when the agent has clearly caught up
+        if lag_ms > self.warn_lag_ms and not self._lagging:
+            self._lagging = True
+            self.lag_warnings += 1
+            logger.warning(f"Agent {self.name} is {lag_ms:.0f}ms behind live "
+                           f"({len(self.frames)} frames queued, {self.dropped_overflow + self.dropped_stale} dropped)")
+        elif lag_ms < self.warn_lag_ms / 2 and self._lagging:
+            self._lagging = False
+            logger.info(f"Agent {self.name} caught up ({lag_ms:.0f}ms behind live)")
+
+    def stats(self) -> dict:
+        return {
+            "depth": len(self.frames),
+            "bytes": self.bytes,
+            "high_water": self.high_water,
+            "enqueued": self.enqueued,
+            "delivered": self.delivered,
+            "dropped_overflow": self.dropped_overflow,
+            "dropped_stale": self.dropped_stale,
+            "dropped_bytes": self.dropped_bytes,
+            "lag_ms": round(self.lag_ms, 1),
+            "max_lag_ms": round(self.max_seen_lag_ms, 1),
+            "lag_warnings": self.lag_warnings,
+        }
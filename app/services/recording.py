@@ -37,18 +37,7 @@ class ConversationLogger:
                     return
 
             try:
-                # Write raw bytes. 
-                # Note: If opus, we are writing raw opus packets which is hard to decode without framing.
-                # If PCM, easy.
-                # Assuming the pipeline sends *decoded* PCM to this logger? 
-                # OR we log the raw input. 
-                # If we use Google STT, likely we have PCM. 
-                # Let's assume we are logging the raw input bytes which are currently Opus-encoded (?)
-                # Wait, client sends MessagePack -> AudioPayload. AudioPayload has 'audio_data'.
-                # In current test client, it's fake bytes.
-                # In real scenario, browser sends PCM or Opus. 
-                # If Opus, we should probably save as .opus or frame it.
-                # For simplicity, we just append bytes. The decoder script will need to know format.
+                # Always PCM16 (s16le): Opus senders are decoded before they reach the recorder
                 self.files[key].write(audio_data)
                 self.files[key].flush()
             except Exception as e:
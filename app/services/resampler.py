@@ -0,0 +1,97 @@
+import math
+from typing import Optional
+import numpy as np
+
+SAMPLE_FORMAT_S16 = "s16" # Interleaved little-endian int16
+SAMPLE_FORMAT_F32 = "f32" # Interleaved little-endian float32 in [-1, 1]
+
+def to_float32(data, sample_format: str = SAMPLE_FORMAT_S16) -> np.ndarray:
+    if sample_format == SAMPLE_FORMAT_F32:
+        usable = len(data) - len(data) % 4
+        return np.frombuffer(data[:usable], dtype="<f4")
+    usable = len(data) - len(data) % 2
+    return np.frombuffer(data[:usable], dtype="<i2").astype(np.float32) / 32768.0
+
+def to_int16(samples: np.ndarray) -> bytes:
+    return np.clip(np.rint(samples * 32768.0), -32768, 32767).astype("<i2").tobytes()
+
+def downmix(samples: np.ndarray, channels: int) -> np.ndarray:
+    if channels <= 1:
+        return samples
+    usable = len(samples) - len(samples) % channels
+    return samples[:usable].reshape(-1, channels).mean(axis=1, dtype=np.float32)
+
+class StreamingResampler:
+    """
+    Rational-ratio polyphase resampler for mono float32 streams.
+    Filter history and output phase carry over between chunks, so a stream can be
+    fed one 20ms frame at a time without clicks at the boundaries. Each chunk is one
+    gather + multiply-accumulate over a (outputs x taps) matrix, no Python per-sample loop.
+    """
+    def __init__(self, in_rate: int, out_rate: int, quality: int = 16):
+        g = math.gcd(in_rate, out_rate)
+        self.in_rate = in_rate
+        self.out_rate = out_rate
+        self.up = out_rate // g # L
+        self.down = in_rate // g # M
+        self.taps = max(4, math.ceil(quality * max(self.up, self.down) / self.up)) # Per phase
+
+        # Windowed-sinc low-pass at the upsampled rate, cut below the lower Nyquist
+        length = self.up * self.taps
+        cutoff = 0.5 / max(self.up, self.down) * 0.95
+        n = np.arange(length) - (length - 1) / 2
+        prototype = 2 * cutoff * np.sinc(2 * cutoff * n) * np.kaiser(length, 8.0) * self.up
+        # phases[p, k] weights input sample (i - k) for an output at phase p
+        self.phases = prototype.reshape(self.taps, self.up).T.astype(np.float32).copy()
+
+        self.history = np.zeros(self.taps - 1, dtype=np.float32)
+        self._pos = (self.taps - 1) * self.up # Next output position in 1/L input samples
+        self._k = np.arange(self.taps)
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        if self.up == self.down:
+            return samples.astype(np.float32, copy=False)
+        buf = np.concatenate((self.history, samples.astype(np.float32, copy=False)))
+        end = len(buf) * self.up # First position we cannot compute yet
+        count = max(0, -(-(end - self._pos) // self.down))
+        positions = self._pos + self.down * np.arange(count)
+        index = positions // self.up
+        phase = positions % self.up
+        window = buf[index[:, None] - self._k[None, :]] # (count, taps)
+        out = np.einsum("ij,ij->i", window, self.phases[phase])
+
+        consumed = len(buf) - (self.taps - 1)
+        self._pos += self.down * count - consumed * self.up
+        self.history = buf[consumed:]
+        return out
+
+    def reset(self):
+        self.history[:] = 0
+        self._pos = (self.taps - 1) * self.up
+
+class AudioConverter:
+    """
+    Byte-in, byte-out format stage: int16/float32, any channel count and rate,
+    to mono int16 at `out_rate`. Keeps resampler state for one stream.
+    """
+    def __init__(self, in_rate: int, out_rate: int, channels: int = 1,
+                 sample_format: str = SAMPLE_FORMAT_S16):
+        self.in_rate = in_rate
+        self.out_rate = out_rate
+        self.channels = channels
+        self.sample_format = sample_format
+        self.resampler: Optional[StreamingResampler] = (
+            StreamingResampler(in_rate, out_rate) if in_rate != out_rate else None
+        )
+
+    @property
+    def passthrough(self) -> bool:
+        return self.resampler is None and self.channels == 1 and self.sample_format == SAMPLE_FORMAT_S16
+
+    def convert(self, data) -> bytes:
+        if self.passthrough:
+            return data
+        samples = downmix(to_float32(data, self.sample_format), self.channels)
+        if self.resampler is not None:
+            samples = self.resampler.process(samples)
+        return to_int16(samples)
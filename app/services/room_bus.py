@@ -0,0 +1,203 @@
+import asyncio
+import struct
+import uuid
+from collections import deque
+from typing import Awaitable, Callable, Deque, Optional, Set, Tuple
+from app.core.config import settings
+from app.core.logging import logger
+from app.core.redis import redis_client
+from app.services.ingress import IngressFrame, frame_from_wire
+
+CHANNEL_PREFIX = "voice:room:"
+SLOTS_KEY = "voice:slots:"
+SLOTS_TTL_SECONDS = 24 * 3600
+
+# Bus envelope: kind, seq, origin worker id length, sender id length,
+# followed by origin, sender and the body (audio wire bytes or msgpack control message)
+BUS_HEADER = struct.Struct("!BIBB")
+KIND_AUDIO = 1
+KIND_CONTROL = 2
+
+# Lowest free slot in the room's slot hash, so slots stay unique across workers
+CLAIM_SLOT_SCRIPT = """
+local slot = 0
+while redis.call('HEXISTS', KEYS[1], slot) == 1 do
+    slot = slot + 1
+end
+redis.call('HSET', KEYS[1], slot, ARGV[1])
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+return slot
+"""
+
+AudioHandler = Callable[[str, IngressFrame], Awaitable[None]]
+ControlHandler = Callable[[str, bytes, Optional[str]], Awaitable[None]]
+
+class RoomBus:
+    """
+    Relays room audio and control frames between worker processes over Redis pub/sub.
+    Each worker keeps its own participants, subscribes to the rooms it hosts,
+    publishes what its local participants send and ignores its own echoes.
+    """
+    def __init__(self, worker_id: Optional[str] = None):
+        self.worker_id = worker_id or settings.WORKER_ID or uuid.uuid4().hex[:12]
+        self._origin = self.worker_id.encode()
+        self.on_audio: Optional[AudioHandler] = None
+        self.on_control: Optional[ControlHandler] = None
+
+        self._redis = None
+        self._pubsub = None
+        self._reader: Optional[asyncio.Task] = None
+        self._writer: Optional[asyncio.Task] = None
+        self._outbox: Deque[Tuple[bytes, bytes]] = deque()
+        self._outbox_ready = asyncio.Event()
+        self.rooms: Set[str] = set()
+
+        # Counters
+        self.published = 0
+        self.received = 0
+        self.echoes_skipped = 0
+        self.publish_errors = 0
+        self.dispatch_errors = 0 # Envelopes that could not be parsed or delivered
+
+    @property
+    def enabled(self) -> bool:
+        return self._reader is not None
+
+    async def start(self, client=None):
+        """Starts relaying. `client` must be a redis.asyncio client without response decoding."""
+        self._redis = client or redis_client.binary
+        if self._redis is None:
+            raise RuntimeError("Redis is not connected")
+        self._pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        # A per-worker channel keeps the pub/sub connection alive before any room exists
+        await self._pubsub.subscribe(f"voice:worker:{self.worker_id}")
+        self._reader = asyncio.create_task(self._read_loop())
+        self._writer = asyncio.create_task(self._write_loop())
+        logger.info(f"Room bus started for worker {self.worker_id}")
+
+    async def stop(self):
+        for task in (self._reader, self._writer):
+            if task:
+                task.cancel()
+        self._reader = self._writer = None
+        if self._pubsub:
+            await self._pubsub.close()
+            self._pubsub = None
+
+    # --- Room membership ---
+
+    async def join(self, room_id: str):
+        if room_id not in self.rooms:
+            self.rooms.add(room_id)
+            await self._pubsub.subscribe(CHANNEL_PREFIX + room_id)
+
+    async def leave(self, room_id: str):
+        if room_id in self.rooms:
+            self.rooms.discard(room_id)
+            await self._pubsub.unsubscribe(CHANNEL_PREFIX + room_id)
+
+    async def claim_slot(self, room_id: str, participant_id: str) -> int:
+        return int(await self._redis.eval(
+            CLAIM_SLOT_SCRIPT, 1, SLOTS_KEY + room_id, participant_id, SLOTS_TTL_SECONDS
+        ))
+
+    async def release_slot(self, room_id: str, slot: int):
+        await self._redis.hdel(SLOTS_KEY + room_id, slot)
+
+    # --- Publishing ---
+    # Publishing only enqueues; the writer task pipelines everything queued
+    # in one round trip so the ingress loop never waits on Redis.
+
+    def publish_audio(self, room_id: str, frame: IngressFrame):
+        self._enqueue(room_id, KIND_AUDIO, frame.seq, frame.sender_id, frame.wire)
+
+    def publish_control(self, room_id: str, packed: bytes, exclude_id: Optional[str] = None):
+        self._enqueue(room_id, KIND_CONTROL, 0, exclude_id or "", packed)
+
+    def _enqueue(self, room_id: str, kind: int, seq: int, sender_id: str, body: bytes):
+        if not self.enabled:
+            return
+        sender = sender_id.encode()
+        envelope = b"".join((
+            BUS_HEADER.pack(kind, seq & 0xFFFFFFFF, len(self._origin), len(sender)),
+            self._origin, sender, body
+        ))
+        self._outbox.append(((CHANNEL_PREFIX + room_id).encode(), envelope))
+        self._outbox_ready.set()
+
+    async def _write_loop(self):
+        while True:
+            while not self._outbox:
+                self._outbox_ready.clear()
+                await self._outbox_ready.wait()
+            pipe = self._redis.pipeline(transaction=False)
+            count = 0
+            while self._outbox:
+                channel, envelope = self._outbox.popleft()
+                pipe.publish(channel, envelope)
+                count += 1
+            try:
+                await pipe.execute()
+                self.published += count
+            except Exception as e:
+                self.publish_errors += count
+                logger.error(f"Room bus publish failed ({count} messages): {e}")
+
+    # --- Receiving ---
+
+    async def _read_loop(self):
+        while True:
+            try:
+                async for message in self._pubsub.listen():
+                    if message["type"] != "message":
+                        continue
+                    try:
+                        await self._dispatch(message["channel"], message["data"])
+                    except asyncio.CancelledError:
+                        raise
+                    except Exception as e:
+                        # One bad envelope must not stall relay for every room on this worker
+                        self.dispatch_errors += 1
+                        logger.error(f"Room bus dropped a message on {message['channel']!r}: {e}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Connection trouble; back off before listening again
+                logger.error(f"Room bus receive error: {e}")
+                await asyncio.sleep(0.5)
+
+    async def _dispatch(self, channel: bytes, data: bytes):
+        kind, seq, origin_len, sender_len = BUS_HEADER.unpack_from(data)
+        offset = BUS_HEADER.size
+        origin = data[offset:offset + origin_len]
+        if origin == self._origin:
+            # Our own publish coming back from Redis
+            self.echoes_skipped += 1
+            return
+        offset += origin_len
+        sender_id = data[offset:offset + sender_len].decode()
+        body = data[offset + sender_len:]
+        room_id = channel[len(CHANNEL_PREFIX):].decode()
+        self.received += 1
+
+        if kind == KIND_AUDIO and self.on_audio:
+            frame = frame_from_wire(sender_id, seq, body)
+            if frame:
+                await self.on_audio(room_id, frame)
+        elif kind == KIND_CONTROL and self.on_control:
+            await self.on_control(room_id, body, sender_id or None)
+
+    def stats(self) -> dict:
+        return {
+            "worker_id": self.worker_id,
+            "enabled": self.enabled,
+            "rooms": len(self.rooms),
+            "outbox_depth": len(self._outbox),
+            "published": self.published,
+            "received": self.received,
+            "echoes_skipped": self.echoes_skipped,
+            "publish_errors": self.publish_errors,
+            "dispatch_errors": self.dispatch_errors,
+        }
+
+room_bus = RoomBus()
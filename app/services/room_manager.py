@@ -1,16 +1,35 @@
 import asyncio
+import time
 from typing import Dict, Optional, Set
-import uuid
+from app.core.config import settings
 from app.models.room import Room, Participant, WebSocketParticipant, VirtualParticipant
 from app.core.logging import logger
-from app.core.protocol import MessageType, BaseMessage
-from app.services.ai_service import agent_manager
+from app.core.protocol import (
+    MessageType, BaseMessage, EncodedMessage, AudioCodec, UNASSIGNED_SLOT, is_binary_frame, read_slot,
+)
+from app.services.ai.base import AgentInterrupt
 from app.services.audio import AudioFrame
+from app.services.ingress import AudioIngress, IngressFrame
+from app.services.agent_pool import PreparedAgent, agent_pool
+from app.services.resampler import AudioConverter
+from app.services.room_bus import room_bus
+from app.services.room_router import room_router
+from app.services.mixer import RoomMixer
+from app.services.active_speaker import ActiveSpeakerTracker
+from app.services.dtx import DtxDecision
+from app.services.transcoder import opus_transcoder
+from app.services.pacer import output_pacer
 
 class RoomManager:
     def __init__(self):
         self.rooms: Dict[str, Room] = {}
         self.agent_tasks: Dict[str, asyncio.Task] = {} # Map participant_id -> Task
+        self.mixer_tasks: Dict[str, asyncio.Task] = {} # Map room_id -> mixing tick loop
+        self.converters: Dict[str, AudioConverter] = {} # sender_id -> to room format, for mixer and recorder
+        
+        # Frames relayed from other workers (distributed rooms)
+        room_bus.on_audio = self._on_remote_audio
+        room_bus.on_control = self._on_remote_control
 
     def get_or_create_room(self, room_id: str) -> Room:
         if room_id not in self.rooms:
@@ -21,33 +40,74 @@ class RoomManager:
     def remove_room(self, room_id: str):
         if room_id in self.rooms:
             logger.info(f"Removing room: {room_id}")
+            if room_id in self.mixer_tasks:
+                self.mixer_tasks.pop(room_id).cancel()
             # Ensure we clean up any agents in this room?
             # Ideally agents leave when room closes or they are kicked
             del self.rooms[room_id]
 
     async def join_room(self, room_id: str, participant: Participant):
+        slot = None
+        if room_bus.enabled:
+            # Rooms can span workers: subscribe to the room and take a globally unique slot
+            await room_bus.join(room_id)
+            slot = await room_bus.claim_slot(room_id, participant.id)
+        
         room = self.get_or_create_room(room_id)
-        room.add_participant(participant)
+        room.add_participant(participant, slot=slot)
         
         logger.info(f"Participant {participant.username} joined room {room_id}")
         
+        # Tell the newcomer its slot and who owns the other slots,
+        # so binary audio frames can be attributed without a lookup.
+        await participant.send_message(EncodedMessage(
+            BaseMessage(
+                type=MessageType.ROOM_INFO,
+                payload={
+                    "room_id": room_id,
+                    "participant_id": participant.id,
+                    "slot": participant.slot,
+                    "participants": {
+                        str(p.slot): p.username for p in room.get_participants()
+                    },
+                },
+            )
+        ))
+        
         # Notify others
         await self.broadcast_message(
             room_id, 
             BaseMessage(
                 type=MessageType.SYSTEM, 
-                payload={"message": f"{participant.username} has joined the room"}
+                payload={
+                    "message": f"{participant.username} has joined the room",
+                    "participant_id": participant.id,
+                    "slot": participant.slot,
+                }
             ),
             exclude_id=participant.id
         )
+        
+        await self._update_room_mode(room)
 
     async def leave_room(self, room_id: str, participant_id: str):
         if room_id in self.rooms:
             room = self.rooms[room_id]
-            room.remove_participant(participant_id)
+            removed = room.remove_participant(participant_id)
             
             logger.info(f"Participant {participant_id} left room {room_id}")
             
+            if removed and room_bus.enabled:
+                await room_bus.release_slot(room_id, removed.slot)
+            if room.mixer:
+                room.mixer.remove_sender(participant_id)
+            if room.speakers and room.speakers.remove(participant_id):
+                await self._announce_speakers(room)
+            if room.dtx:
+                room.dtx.remove(participant_id)
+            opus_transcoder.release(participant_id)
+            self.converters.pop(participant_id, None)
+            
             # Clean up agent task if it was a virtual participant
             if participant_id in self.agent_tasks:
                 self.agent_tasks[participant_id].cancel()
@@ -62,130 +122,339 @@ class RoomManager:
                 )
             )
             
-            if room.is_empty():
+            if not room.is_empty():
+                await self._update_room_mode(room)
+            else:
                 self.remove_room(room_id)
+                if room_bus.enabled:
+                    await room_bus.leave(room_id)
+                if room_router.enabled:
+                    await room_router.release(room_id)
 
-    async def broadcast_bytes(self, room_id: str, data: bytes, exclude_id: Optional[str] = None):
-        """Used for audio broadcasting"""
+    async def broadcast_bytes(self, room_id: str, frame: IngressFrame, exclude_id: Optional[str] = None,
+                              relay: bool = True):
+        """
+        Used for audio broadcasting. The frame has already been parsed once at ingress.
+        `relay` publishes the frame to other workers; it is False for frames that came from one.
+        Humans get the wire bytes as sent (Opus passes through untouched), and so do
+        agents, whose feed decodes Opus after its jitter buffer. The mixer and the
+        recorder share one decode, made only when one of them needs the frame.
+        """
         if room_id in self.rooms:
             room = self.rooms[room_id]
-            tasks = []
             
-            # Log the audio (fire and forget task?)
-            # We need to parse who it came FROM to log effectively.
-            # But broadcast_bytes interface doesn't strictly say who sent it, only exclude_id.
-            # Usually exclude_id IS the sender.
-            if exclude_id:
-                # We need to extract the raw audio payload from the MessagePack if we want PURE audio,
-                # otherwise we are logging the MsgPack structure.
-                # For now, let's log the raw bytes as they are broadcasted (MsgPack).
-                # The decoder will have to handle MsgPack stripping if needed.
-                from app.services.recording import conversation_logger
-                # Async log - create task to avoid blocking broadcast?
-                # For safety in async loop, direct await is safer if method is async.
-                tasks.append(conversation_logger.log_audio(room_id, exclude_id, data))
+            if relay and room_bus.enabled:
+                room_bus.publish_audio(room_id, frame)
+
+            # DTX: silence past the hangover is not sent to human listeners.
+            # Agents still get every frame (their VAD/endpointing needs the silence).
+            # Agent output is exempt: it is already paced and only sent while the agent
+            # talks, and a quiet voice (or a mock's silence) must not be cut.
+            sender = room.participants.get(frame.sender_id)
+            dtx = room.dtx if room.dtx and not isinstance(sender, VirtualParticipant) else None
+            decision = dtx.decide(frame) if dtx else DtxDecision.FORWARD
+            silent = decision != DtxDecision.FORWARD
+
+            # MCU mode: humans get the mixer's output on its own tick instead
+            mixing = room.mixer is not None
+            
+            # Select mode: only the top-K active speakers reach human listeners
+            muted = False
+            if room.speakers is not None:
+                if room.speakers.update(frame.sender_id, frame.level):
+                    await self._announce_speakers(room)
+                muted = not room.speakers.is_active(frame.sender_id)
 
+            agents = []
+            comfort_noise = {} # audio_format -> marker, encoded once per format
+            # Sends only enqueue onto each listener's bounded outbound queue,
+            # so a slow socket cannot hold up this loop.
             for p in room.get_participants():
                 if exclude_id and p.id == exclude_id:
                     continue
-                tasks.append(p.send_bytes(data))
-            
-            if tasks:
-                await asyncio.gather(*tasks, return_exceptions=True)
+                if not p.receives_mix:
+                    agents.append(p)
+                    continue
+                if mixing or muted:
+                    continue
+                try:
+                    if silent:
+                        if decision == DtxDecision.COMFORT_NOISE:
+                            if p.audio_format not in comfort_noise:
+                                comfort_noise[p.audio_format] = dtx.comfort_noise(
+                                    frame, self._sender_slot(room, frame), p.audio_format
+                                )
+                            marker = comfort_noise[p.audio_format]
+                            await p.send_bytes(marker)
+                            dtx.count_skipped(frame, len(marker))
+                        else:
+                            dtx.count_skipped(frame)
+                        continue
+                    await p.send_frame(frame)
+                except Exception as e:
+                    logger.error(f"Failed to deliver frame to {p.username}: {e}")
+
+            for p in agents:
+                try:
+                    await p.send_frame(frame)
+                except Exception as e:
+                    logger.error(f"Failed to deliver frame to {p.username}: {e}")
+
+            # Relayed frames are recorded by the worker that owns the sender
+            recording = settings.RECORDING_ENABLED and bool(exclude_id and relay)
+            to_mixer = mixing and not silent
+            if not (recording or to_mixer):
+                return
+            if frame.codec == AudioCodec.OPUS:
+                # Arrival order; a packet overtaken by a newer one is dropped, not decoded
+                pcm = await opus_transcoder.decode(frame.sender_id, frame.audio, seq=frame.seq)
+                if not pcm:
+                    return
+                frame = frame.with_pcm(pcm)
+            elif frame.audio_frame.sample_rate != settings.SAMPLE_RATE or frame.audio_frame.channels != 1:
+                # The mixer and the recorder work in the room format (mono at SAMPLE_RATE)
+                frame = frame.with_pcm(self._to_room_format(frame))
+
+            # Record the sender's audio payload (not the msgpack/binary envelope)
+            if recording:
+                from app.services.recording import conversation_logger
+                await conversation_logger.log_audio(room_id, frame.sender_id, frame.audio)
+            if to_mixer and room.mixer is not None:
+                room.mixer.push(frame)
+
+    def _to_room_format(self, frame: IngressFrame) -> bytes:
+        source = frame.audio_frame
+        converter = self.converters.get(frame.sender_id)
+        if converter is None or converter.in_rate != source.sample_rate or converter.channels != source.channels:
+            converter = self.converters[frame.sender_id] = AudioConverter(
+                source.sample_rate, settings.SAMPLE_RATE, channels=source.channels
+            )
+        return converter.convert(source.data)
 
-    async def broadcast_message(self, room_id: str, message: BaseMessage, exclude_id: Optional[str] = None):
-        """Used for control messages"""
+    def _sender_slot(self, room: Room, frame: IngressFrame) -> int:
+        if is_binary_frame(frame.wire):
+            return read_slot(frame.wire)
+        sender = room.participants.get(frame.sender_id)
+        return sender.slot if sender else UNASSIGNED_SLOT
+
+    async def broadcast_message(self, room_id: str, message: BaseMessage, exclude_id: Optional[str] = None,
+                                relay: bool = True):
+        """Used for control messages. Encoded once per wire encoding, shared by all recipients."""
+        if room_id in self.rooms:
+            encoded = EncodedMessage(message)
+            if relay and room_bus.enabled:
+                room_bus.publish_control(room_id, encoded.msgpack(), exclude_id)
+            await self._deliver_message(room_id, encoded, exclude_id)
+
+    async def _deliver_message(self, room_id: str, encoded: EncodedMessage, exclude_id: Optional[str] = None):
         if room_id in self.rooms:
-            data = message.model_dump()
             room = self.rooms[room_id]
-            tasks = []
             for p in room.get_participants():
                 if exclude_id and p.id == exclude_id:
                     continue
-                tasks.append(p.send_json(data))
-            
-            if tasks:
-                await asyncio.gather(*tasks, return_exceptions=True)
+                try:
+                    await p.send_message(encoded)
+                except Exception as e:
+                    logger.error(f"Failed to deliver message to {p.username}: {e}")
 
-    async def add_agent_to_room(self, room_id: str, agent_name: str = "echo"):
+    async def _update_room_mode(self, room: Room):
         """
-        Spawns a VirtualParticipant backed by an AIAgent and connects loops.
+        Picks how audio reaches listeners, by room size:
+        forward (everyone hears everyone), select (top-K active speakers) or mix (MCU).
         """
-        agent_id = f"agent-{uuid.uuid4().hex[:6]}"
-        agent_username = f"AI-{agent_name}"
+        count = len(room.participants)
+        mix_threshold = settings.MIXER_MIN_PARTICIPANTS
+        select_threshold = settings.ACTIVE_SPEAKER_MIN_PARTICIPANTS
+        if mix_threshold > 0 and count >= mix_threshold:
+            mode = "mix"
+        elif select_threshold > 0 and count >= select_threshold:
+            mode = "select"
+        else:
+            mode = "forward"
         
-        input_queue = asyncio.Queue()
-        agent_participant = VirtualParticipant(agent_id, agent_username, input_queue)
+        current = "mix" if room.mixer else "select" if room.speakers else "forward"
+        if mode == current:
+            return
+        
+        if mode == "mix":
+            room.mixer = RoomMixer()
+            self.mixer_tasks[room.id] = asyncio.create_task(self._run_mixer(room))
+        else:
+            room.mixer = None
+            if room.id in self.mixer_tasks:
+                self.mixer_tasks.pop(room.id).cancel()
+        room.speakers = ActiveSpeakerTracker(settings.ACTIVE_SPEAKERS_K) if mode == "select" else None
+        
+        logger.info(f"Room {room.id} switched to {mode} mode ({count} participants)")
+        await self.broadcast_message(
+            room.id,
+            BaseMessage(type=MessageType.ROOM_MODE, payload={"mode": mode}),
+            relay=False
+        )
+
+    async def _announce_speakers(self, room: Room):
+        speakers = []
+        for participant_id in room.speakers.active:
+            p = room.participants.get(participant_id)
+            speakers.append({"participant_id": participant_id, "slot": p.slot if p else None})
+        await self.broadcast_message(
+            room.id,
+            BaseMessage(type=MessageType.ACTIVE_SPEAKERS, payload={"speakers": speakers}),
+            relay=False
+        )
+
+    async def _run_mixer(self, room: Room):
+        """One mixed frame per listener per tick, on a drift-corrected clock."""
+        loop = asyncio.get_running_loop()
+        period = settings.FRAME_DURATION_MS / 1000
+        next_tick = loop.time()
+        try:
+            while room.mixer is not None:
+                next_tick += period
+                delay = next_tick - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                elif delay < -5 * period:
+                    # Fell far behind (e.g. loop stall); resync instead of bursting
+                    next_tick = loop.time()
+                
+                mixer = room.mixer
+                result = mixer.mix() if mixer else None
+                if result is None:
+                    continue
+                for p in room.get_participants():
+                    if p.receives_mix:
+                        await p.send_bytes(result.encode_for(p.id, p.audio_format))
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.error(f"Mixer crashed for room {room.id}: {e}")
+
+    async def _on_remote_audio(self, room_id: str, frame: IngressFrame):
+        await self.broadcast_bytes(room_id, frame, exclude_id=frame.sender_id, relay=False)
+
+    async def _on_remote_control(self, room_id: str, packed: bytes, exclude_id: Optional[str]):
+        # Keep the msgpack encoding we were handed; JSON clients get it encoded once here
+        encoded = EncodedMessage(BaseMessage.from_msgpack(packed), packed=packed)
+        await self._deliver_message(room_id, encoded, exclude_id)
+
+    def get_room_stats(self, room_id: str) -> Optional[dict]:
+        room = self.rooms.get(room_id)
+        if not room:
+            return None
+        return {
+            "room_id": room_id,
+            "participants": [p.stats() for p in room.get_participants()],
+            "bus": room_bus.stats(),
+            "router": room_router.stats(),
+            "mixer": room.mixer.stats() if room.mixer else None,
+            "speakers": room.speakers.stats() if room.speakers else None,
+            "dtx": room.dtx.stats() if room.dtx else None,
+            "opus": opus_transcoder.stats(),
+            "pacer": output_pacer.stats(),
+        }
+
+    async def add_agent_to_room(self, room_id: str, agent_name: str = "echo"):
+        """
+        Attaches a VirtualParticipant backed by an AIAgent and connects loops.
+        The agent comes ready-built from the agent pool; only the join happens here.
+        """
+        requested = time.monotonic()
+        prepared = agent_pool.take(agent_name)
+        agent_participant = prepared.participant
         
         await self.join_room(room_id, agent_participant)
         
         # Start the Agent Processing Loop
         # This reads from input_queue -> agent -> broadcasts back to room
         task = asyncio.create_task(
-            self._run_agent_loop(room_id, agent_participant, agent_name)
+            self._run_agent_loop(room_id, prepared, requested)
         )
-        self.agent_tasks[agent_id] = task
+        self.agent_tasks[agent_participant.id] = task
         
-        return agent_id
+        return agent_participant.id
 
-    async def _run_agent_loop(self, room_id: str, participant: VirtualParticipant, agent_name: str):
+    async def _interrupt_agent(self, room_id: str, participant: VirtualParticipant, reason: str):
+        """Flushes an agent's audio that is still queued server-side and tells clients to flush theirs."""
+        room = self.rooms.get(room_id)
+        if not room:
+            return
+        purged = sum(p.purge_audio(participant.id) for p in room.get_participants())
+        if room.mixer:
+            room.mixer.remove_sender(participant.id)
+        logger.info(f"{participant.username} interrupted ({reason}); purged {purged} queued frames")
+        await self.broadcast_message(
+            room_id,
+            BaseMessage(
+                type=MessageType.INTERRUPT,
+                payload={"participant_id": participant.id, "slot": participant.slot, "reason": reason}
+            ),
+            exclude_id=participant.id
+        )
+
+    async def _run_agent_loop(self, room_id: str, prepared: PreparedAgent, requested: float):
+        participant = prepared.participant
         logger.info(f"Starting agent loop for {participant.username}")
-        agent_service = agent_manager.get_agent(agent_name)
+        agent_service = prepared.agent
         
-        # Generator that yields audio frames from the queue
-        async def audio_source():
-            while True:
-                data = await participant.input_queue.get()
-                # Assuming data is raw opus bytes for now? 
-                # Or wrapped in MsgPack? 
-                # If broadcast_bytes sends RAW BYTES, then we get raw bytes.
-                # If we wrapped it, we need to unwrap.
-                # Current simple_client sends MsgPack'd "AUDIO_STREAM".
-                # But ws_endpoints.py broadcasts `data` which is the RAW MESSAGE from websocket.
-                # Wait, ws_endpoints.py does: unpacked = msgpack.unpackb(data) ... then broadcast_bytes(data)
-                # So we are receiving the FULL MSG PACKED BLOB.
-                
-                # We need to extract the audio payload.
-                try:
-                    import msgpack
-                    unpacked = msgpack.unpackb(data, raw=False)
-                    if isinstance(unpacked, dict) and unpacked.get("type") == "audio_stream":
-                        payload = unpacked.get("payload", {})
-                        audio_bytes = payload.get("audio_data") # This might be bytes
-                        if audio_bytes:
-                             # Yield an AudioFrame
-                             yield AudioFrame(audio_bytes, timestamp=payload.get("timestamp", 0))
-                except Exception as e:
-                    logger.error(f"Agent decode error: {e}")
-                    continue
+        # Frames were parsed once at ingress, so there is nothing to unpack here
+        feed = prepared.feed
+        participant.feed = feed
+        participant.agent = agent_service
+
+        # Agent output goes through the same envelope as human audio
+        ingress = AudioIngress(participant)
+        # Optionally Opus on the wire for listeners; the room's PCM consumers still get PCM
+        opus_output = settings.AGENT_OUTPUT_CODEC == "opus" and opus_transcoder.available
+        # TTS voices may synthesize at other rates; convert to the room rate (state kept per stream)
+        output_converter: Optional[AudioConverter] = None
+        started = False
+
+        async def send(output_frame: AudioFrame):
+            # Called by the pacer, one frame per tick
+            nonlocal started
+            if not started:
+                # Agent requested -> first frame out: what a room waits to hear its agent
+                started = True
+                delay = (time.monotonic() - requested) * 1000
+                agent_pool.record_start(delay)
+                logger.info(f"{participant.username} sent its first frame {delay:.0f}ms after being requested")
+            opus_packet = None
+            if opus_output:
+                opus_packet = await opus_transcoder.encode(participant.id, output_frame.data)
+            frame = ingress.from_audio_frame(output_frame, opus_packet)
+            await self.broadcast_bytes(room_id, frame, exclude_id=participant.id)
+
+        # Output is released in real time by the shared pacer, not as fast as TTS produces it
+        paced = output_pacer.register(participant.id, send)
+        participant.paced = paced
 
         try:
             # Connect source to agent
-            output_stream = agent_service.process_audio_stream(audio_source())
+            output_stream = agent_service.process_audio_stream(feed.frames(), session=prepared.session)
             
             async for output_frame in output_stream:
-                # Wrap output frame back into our protocol
-                # Since we want to broadcast it to the room
-                import msgpack
-                
-                msg = {
-                    "type": "audio_stream",
-                    "payload": {
-                        "participant_id": participant.id,
-                        "audio_data": output_frame.data,
-                        "timestamp": output_frame.timestamp or 0
-                    }
-                }
-                packed = msgpack.packb(msg, use_bin_type=True)
-                
-                # Broadcast as the agent
-                await self.broadcast_bytes(room_id, packed, exclude_id=participant.id)
+                if isinstance(output_frame, AgentInterrupt):
+                    paced.flush()
+                    await self._interrupt_agent(room_id, participant, output_frame.reason)
+                    output_converter = None
+                    continue
+                if output_frame.sample_rate != settings.SAMPLE_RATE or output_frame.channels != 1:
+                    if (output_converter is None or output_converter.in_rate != output_frame.sample_rate
+                            or output_converter.channels != output_frame.channels):
+                        output_converter = AudioConverter(output_frame.sample_rate, settings.SAMPLE_RATE,
+                                                          channels=output_frame.channels)
+                    output_frame = AudioFrame(output_converter.convert(output_frame.data), output_frame.timestamp,
+                                              output_frame.duration_ms)
+                await paced.put(output_frame.data)
                 
         except asyncio.CancelledError:
             logger.info(f"Agent loop cancelled for {participant.username}")
         except Exception as e:
             logger.error(f"Agent loop crashed: {e}")
         finally:
+            output_pacer.unregister(participant.id)
+            feed.close()
             await self.leave_room(room_id, participant.id)
 
 room_manager = RoomManager()
@@ -0,0 +1,125 @@
+import asyncio
+import hashlib
+import time
+from typing import List, Optional, Set
+from app.core.config import settings
+from app.core.logging import logger
+from app.core.redis import redis_client
+
+OWNER_KEY = "voice:room_owner:"
+WORKERS_KEY = "voice:workers"
+
+# Only touch a lease we still hold; another worker may have taken the room after expiry
+REFRESH_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('EXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+class RoomRouter:
+    """
+    Room-to-worker routing table kept in Redis, for room-affinity deployments.
+    Each room is owned by exactly one worker through a lease (key with TTL) that the
+    owner keeps refreshing while it hosts the room. New rooms go to a live worker
+    picked by rendezvous hashing, so rooms spread evenly without coordination.
+    """
+    def __init__(self):
+        self.worker_url: Optional[str] = settings.WORKER_URL
+        self.lease_seconds = settings.ROOM_LEASE_SECONDS
+        self.owned: Set[str] = set()
+        self._redis = None
+        self._heartbeat: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self._heartbeat is not None
+
+    def is_local(self, owner: str) -> bool:
+        return owner == self.worker_url
+
+    async def start(self, client=None):
+        """`client` must be a redis.asyncio client that decodes responses."""
+        if not self.worker_url:
+            raise RuntimeError("WORKER_URL must be set for room affinity")
+        self._redis = client or redis_client.redis
+        if self._redis is None:
+            raise RuntimeError("Redis is not connected")
+        await self._register()
+        self._heartbeat = asyncio.create_task(self._heartbeat_loop())
+        logger.info(f"Room router started for {self.worker_url}")
+
+    async def stop(self):
+        if self._heartbeat:
+            self._heartbeat.cancel()
+            self._heartbeat = None
+        for room_id in list(self.owned):
+            await self.release(room_id)
+        if self._redis is not None:
+            await self._redis.zrem(WORKERS_KEY, self.worker_url)
+
+    async def route(self, room_id: str) -> str:
+        """Returns the URL of the worker that owns the room, claiming it if unowned."""
+        key = OWNER_KEY + room_id
+        owner = await self._redis.get(key)
+        if not owner:
+            candidate = await self._preferred_worker(room_id)
+            if await self._redis.set(key, candidate, nx=True, ex=self.lease_seconds):
+                owner = candidate
+            else:
+                # Lost the race to another worker
+                owner = await self._redis.get(key) or candidate
+        if self.is_local(owner):
+            self.owned.add(room_id)
+        return owner
+
+    async def release(self, room_id: str):
+        self.owned.discard(room_id)
+        try:
+            await self._redis.eval(RELEASE_SCRIPT, 1, OWNER_KEY + room_id, self.worker_url)
+        except Exception as e:
+            logger.error(f"Failed to release room {room_id}: {e}")
+
+    async def _preferred_worker(self, room_id: str) -> str:
+        workers = await self._live_workers()
+        if not workers:
+            return self.worker_url
+        # Rendezvous hashing: stable per room, moves few rooms when workers come and go
+        return max(workers, key=lambda w: hashlib.md5(f"{w}|{room_id}".encode()).digest())
+
+    async def _live_workers(self) -> List[str]:
+        cutoff = time.time() - self.lease_seconds
+        return await self._redis.zrangebyscore(WORKERS_KEY, cutoff, "+inf")
+
+    async def _register(self):
+        await self._redis.zadd(WORKERS_KEY, {self.worker_url: time.time()})
+
+    async def _heartbeat_loop(self):
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                await self._register()
+                for room_id in list(self.owned):
+                    held = await self._redis.eval(
+                        REFRESH_SCRIPT, 1, OWNER_KEY + room_id, self.worker_url, self.lease_seconds
+                    )
+                    if not held:
+                        logger.warning(f"Lost lease on room {room_id}")
+                        self.owned.discard(room_id)
+            except Exception as e:
+                logger.error(f"Room router heartbeat failed: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "worker_url": self.worker_url,
+            "enabled": self.enabled,
+            "owned_rooms": len(self.owned),
+        }
+
+room_router = RoomRouter()
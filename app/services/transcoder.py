@@ -0,0 +1,146 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from app.core.config import settings
+from app.core.logging import logger
+from app.services.audio import OPUS_AVAILABLE, OpusCodec
+
+DECODE = "decode"
+ENCODE = "encode"
+CONCEAL = "conceal"
+
+class OpusTranscoder:
+    """
+    Opus <-> PCM for participants, off the event loop.
+    Each participant has one persistent OpusCodec, since Opus state follows the stream.
+    Requests made while a batch is running are collected and sent to the thread pool
+    together, one task per participant, in the order they were made. Only one batch
+    runs at a time, so a codec is never used from two threads at once. opuslib calls
+    release the GIL.
+    Decoder state follows the packet sequence: callers decode in sequence order (the
+    agent feed does, after its jitter buffer), or pass `seq` so that packets arriving
+    after a newer one are dropped instead of decoded.
+    """
+    def __init__(self, max_workers: int = settings.OPUS_THREADS,
+                 sample_rate: int = settings.SAMPLE_RATE,
+                 frame_duration_ms: int = settings.FRAME_DURATION_MS):
+        self.sample_rate = sample_rate
+        self.frame_samples = sample_rate * frame_duration_ms // 1000
+        self.codecs: Dict[str, OpusCodec] = {}
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="opus")
+        self._pending: List[Tuple[str, str, bytes, asyncio.Future]] = [] # (op, participant_id, data, future)
+        self._runner: asyncio.Task = None
+        self.last_seq: Dict[str, int] = {} # Last packet decoded per participant, when decode() gets a seq
+
+        # Counters
+        self.batches = 0
+        self.max_batch = 0
+        self.decoded = 0
+        self.encoded = 0
+        self.failed = 0
+        self.concealed = 0
+        self.reordered = 0
+
+    @property
+    def available(self) -> bool:
+        return OPUS_AVAILABLE
+
+    async def decode(self, participant_id: str, packet: bytes, seq: Optional[int] = None) -> bytes:
+        """PCM16 for one Opus packet, or b"" if it could not be decoded (or arrived out of order)."""
+        if seq is not None:
+            last = self.last_seq.get(participant_id)
+            if last is not None and not 0 < (seq - last) & 0xFFFFFFFF < 0x80000000:
+                self.reordered += 1
+                return b""
+            self.last_seq[participant_id] = seq
+        return await self._submit(DECODE, participant_id, packet)
+
+    async def conceal(self, participant_id: str) -> bytes:
+        """One frame of Opus packet loss concealment (PLC), in place of a packet that never came."""
+        return await self._submit(CONCEAL, participant_id, b"")
+
+    async def encode(self, participant_id: str, pcm: bytes) -> bytes:
+        """One Opus packet for one frame of PCM16, or b"" if encoding failed."""
+        return await self._submit(ENCODE, participant_id, pcm)
+
+    def release(self, participant_id: str):
+        self.codecs.pop(participant_id, None)
+        self.last_seq.pop(participant_id, None)
+
+    def _submit(self, op: str, participant_id: str, data: bytes) -> asyncio.Future:
+        if participant_id not in self.codecs:
+            self.codecs[participant_id] = OpusCodec(sample_rate=self.sample_rate)
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((op, participant_id, data, future))
+        if self._runner is None or self._runner.done():
+            self._runner = asyncio.create_task(self._run())
+        return future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while self._pending:
+            batch, self._pending = self._pending, []
+            self.batches += 1
+            self.max_batch = max(self.max_batch, len(batch))
+
+            groups: Dict[str, list] = {}
+            for item in batch:
+                groups.setdefault(item[1], []).append(item)
+            jobs = [
+                loop.run_in_executor(self.executor, self._process, self.codecs.get(pid), items)
+                for pid, items in groups.items()
+            ]
+            for items, results in zip(groups.values(), await asyncio.gather(*jobs, return_exceptions=True)):
+                if isinstance(results, Exception):
+                    logger.error(f"Opus batch failed: {results}")
+                    results = [b""] * len(items)
+                for (op, _, _, future), result in zip(items, results):
+                    # Counted here rather than on the pool threads
+                    if op == DECODE:
+                        self.decoded += 1
+                    elif op == CONCEAL:
+                        self.concealed += 1
+                    else:
+                        self.encoded += 1
+                    if not result:
+                        self.failed += 1
+                    if not future.done():
+                        future.set_result(result)
+
+    def _process(self, codec: OpusCodec, items: list) -> List[bytes]:
+        # Runs on a pool thread; items for one participant, in arrival order
+        results = []
+        for op, _, data, _ in items:
+            if codec is None:
+                results.append(b"")
+            elif op == DECODE:
+                results.append(codec.decode(bytes(data)))
+            elif op == CONCEAL:
+                results.append(codec.conceal(self.frame_samples))
+            else:
+                results.append(codec.encode(self._one_frame(data), self.frame_samples))
+        return results
+
+    def _one_frame(self, pcm: bytes) -> bytes:
+        # The encoder needs exactly one frame of samples
+        size = self.frame_samples * 2
+        if len(pcm) == size:
+            return bytes(pcm)
+        samples = np.frombuffer(pcm[:len(pcm) - len(pcm) % 2], dtype="<i2")[:self.frame_samples]
+        return np.pad(samples, (0, self.frame_samples - len(samples))).tobytes()
+
+    def stats(self) -> dict:
+        return {
+            "available": self.available,
+            "codecs": len(self.codecs),
+            "batches": self.batches,
+            "max_batch": self.max_batch,
+            "decoded": self.decoded,
+            "encoded": self.encoded,
+            "failed": self.failed,
+            "concealed": self.concealed,
+            "reordered": self.reordered,
+        }
+
+opus_transcoder = OpusTranscoder()
@@ -1,5 +1,8 @@
 const SAMPLE_RATE = 16000;
 const FRAME_SIZE = 320; // 20ms
+const FRAME_KIND_AUDIO = 0x01; // see app/core/protocol.py
+const FRAME_KIND_COMFORT_NOISE = 0x02;
+const AUDIO_HEADER_SIZE = 12;
 
 let websocket = null;
 let audioContext = null;
@@ -46,7 +49,8 @@ connectBtn.onclick = async () => {
 
     const proto = window.location.protocol === "https:" ? "wss" : "ws";
     const port = window.location.port ? `:${window.location.port}` : "";
-    const url = `${proto}://${window.location.hostname}${port}/ws/${roomId}/${username}`;
+    // Control messages as msgpack binary frames, server audio (mixes) as fixed-header frames
+    const url = `${proto}://${window.location.hostname}${port}/ws/${roomId}/${username}?control=msgpack&audio=binary`;
 
     websocket = new WebSocket(url);
     websocket.binaryType = "arraybuffer";
@@ -75,6 +79,20 @@ connectBtn.onclick = async () => {
         if (event.data instanceof ArrayBuffer) {
             try {
                 const data = new Uint8Array(event.data);
+
+                // Binary audio frame: 12-byte header (kind, codec, slot, seq, timestamp) + PCM
+                if (data.length >= AUDIO_HEADER_SIZE && data[0] === FRAME_KIND_AUDIO) {
+                    const audioData = data.subarray(AUDIO_HEADER_SIZE);
+                    bytesRecv += audioData.length;
+                    updateStats();
+                    playPcmAudio(audioData);
+                    return;
+                }
+                // Comfort-noise marker: the sender is silent, nothing to play
+                if (data.length >= AUDIO_HEADER_SIZE && data[0] === FRAME_KIND_COMFORT_NOISE) {
+                    return;
+                }
+
                 const msg = msgpack.decode(data);
 
                 if (msg.type === "audio_stream") {
@@ -86,8 +104,18 @@ connectBtn.onclick = async () => {
 
                     // Decode (Simple Int16 -> Float32)
                     playPcmAudio(audioData);
+                } else if (msg.type === "comfort_noise") {
+                    // Sender is silent (server-side DTX); nothing to play
                 } else if (msg.type === "system") {
                     log(`System: ${msg.payload.message}`);
+                } else if (msg.type === "interrupt") {
+                    // An agent was cut off: drop what is still scheduled to play
+                    flushPlayout();
+                    log(`Interrupted: ${msg.payload.participant_id}`);
+                } else if (msg.type === "room_mode") {
+                    log(`Room mode: ${msg.payload.mode}`);
+                } else if (msg.type === "active_speakers") {
+                    log(`Active speakers: ${msg.payload.speakers.map(s => s.slot).join(", ")}`);
                 }
             } catch (e) {
                 console.error("Decode error", e);
@@ -186,6 +214,7 @@ function stopAudio() {
 }
 
 let nextPlayTime = 0;
+const scheduledSources = new Set();
 
 function playPcmAudio(uint8Bytes) {
     // Convert Uint8Array -> Int16Array -> Float32
@@ -208,10 +237,20 @@ function playPcmAudio(uint8Bytes) {
     const now = audioContext.currentTime;
     if (nextPlayTime < now) nextPlayTime = now;
 
+    source.onended = () => scheduledSources.delete(source);
+    scheduledSources.add(source);
     source.start(nextPlayTime);
     nextPlayTime += buffer.duration;
 }
 
+function flushPlayout() {
+    for (const source of scheduledSources) {
+        try { source.stop(); } catch (e) { /* not started yet */ }
+    }
+    scheduledSources.clear();
+    nextPlayTime = 0;
+}
+
 function updateStats() {
     audioStats.innerText = `Audio: ${formatBytes(bytesSent)} sent / ${formatBytes(bytesRecv)} recv`;
 }
@@ -0,0 +1,141 @@
+"""
+Memory and allocation cost of audio frames on the agent output path, before and after
+slot-based frames with memoryview payloads and pooled PCM blocks.
+
+"before" replays the old path: a __dict__-based frame class, TTS audio cut into
+frames with bytes slicing, and the pacer re-cutting chunks with bytes copies.
+"after" runs the current AudioFrame (__slots__, memoryview payload) and the
+pacer's PacedStream on a PcmBlockPool.
+
+Reports, per frame:
+  - allocations and bytes of a buffered TTS frame (tracemalloc, frames kept alive)
+  - fresh PCM buffers allocated on the pacer path (pool reuse for "after")
+  - time through the pacer path (best of RUNS, alternating paths, as timing here is noisy)
+
+Usage: python scripts/bench_audio_frame.py [frames]
+Run from the repository root.
+"""
+import asyncio
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.audio import AudioFrame, PcmBlockPool
+from app.services.pacer import PacedStream
+
+FRAME_BYTES = 640 # 20ms of 16kHz PCM16
+RESPONSE_FRAMES = 50 # One second of synthesized audio per TTS response
+RUNS = 5
+
+class DictAudioFrame:
+    """AudioFrame as it was: a plain class with a per-instance __dict__."""
+    def __init__(self, data: bytes, timestamp: int, duration_ms: int = 20,
+                 sample_rate: int = 16000, channels: int = 1):
+        self.data = data
+        self.timestamp = timestamp
+        self.duration_ms = duration_ms
+        self.sample_rate = sample_rate
+        self.channels = channels
+
+def tts_frames_before(response: bytes):
+    return [DictAudioFrame(response[i:i + FRAME_BYTES], 0) for i in range(0, len(response), FRAME_BYTES)]
+
+def tts_frames_after(response: bytes):
+    view = memoryview(response)
+    return [AudioFrame(view[i:i + FRAME_BYTES], 0) for i in range(0, len(response), FRAME_BYTES)]
+
+def footprint(make_frames, response: bytes, frames: int):
+    """Allocations and bytes per frame while frames are buffered (e.g. in an output queue)."""
+    tracemalloc.start()
+    start = tracemalloc.take_snapshot()
+    kept = [make_frames(response) for _ in range(frames // RESPONSE_FRAMES)]
+    stats = tracemalloc.take_snapshot().compare_to(start, "filename")
+    tracemalloc.stop()
+    n = len(kept) * RESPONSE_FRAMES
+    # The list holding the frames is the benchmark's, not the path's
+    for_frames = [s for s in stats if s.traceback[0].filename == __file__]
+    blocks = sum(s.count_diff for s in for_frames) - len(kept) - 1
+    size = sum(s.size_diff for s in for_frames)
+    return blocks / n, size / n
+
+class OldPacedStream:
+    """PacedStream as it was: chunks appended to a bytearray, frames cut off as bytes."""
+    def __init__(self):
+        self.partial = bytearray()
+        self.frames = []
+        self.buffers = 0
+
+    async def put(self, data: bytes):
+        self.partial += data
+        while len(self.partial) >= FRAME_BYTES:
+            self.frames.append(bytes(self.partial[:FRAME_BYTES]))
+            del self.partial[:FRAME_BYTES]
+            self.buffers += 2 # bytearray slice, bytes copy
+
+    def next_frame(self):
+        return self.frames.pop(0) if self.frames else None
+
+async def pacer_before(response: bytes, frames: int) -> int:
+    """The old pacer path (one tick per frame). Returns fresh PCM buffers allocated."""
+    async def sink(frame):
+        pass
+    stream = OldPacedStream()
+    sent = 0
+    while sent < frames:
+        for tts_frame in tts_frames_before(response):
+            stream.buffers += 1 # TTS slice
+            await stream.put(tts_frame.data)
+            data = stream.next_frame()
+            if data is None:
+                continue
+            await sink(DictAudioFrame(data, sent))
+            sent += 1
+    return stream.buffers
+
+async def pacer_after(response: bytes, frames: int) -> int:
+    """The current pacer path (one tick per frame). Returns fresh PCM buffers allocated."""
+    async def sink(frame):
+        pass
+    pool = PcmBlockPool(FRAME_BYTES)
+    stream = PacedStream("bench", sink, pool, max_frames=RESPONSE_FRAMES)
+    sent = 0
+    while sent < frames:
+        for tts_frame in tts_frames_after(response):
+            await stream.put(tts_frame.data)
+            block = stream.next_frame()
+            if block is None:
+                continue
+            await sink(AudioFrame(memoryview(block), sent, seq=sent))
+            pool.release(block)
+            sent += 1
+    return pool.allocated
+
+def bench(frames: int):
+    response = bytes(range(256)) * (FRAME_BYTES * RESPONSE_FRAMES // 256)
+    loop = asyncio.new_event_loop()
+    paths = (
+        ("before", tts_frames_before, lambda: loop.run_until_complete(pacer_before(response, frames))),
+        ("after", tts_frames_after, lambda: loop.run_until_complete(pacer_after(response, frames))),
+    )
+    rows = {label: footprint(make_frames, response, frames) for label, make_frames, _ in paths}
+    best = {label: float("inf") for label, _, _ in paths}
+    buffers = {}
+    for label, _, run in paths:
+        run() # warm up
+    # Runs alternate between the paths, so both see the same machine load
+    for _ in range(RUNS):
+        for label, _, run in paths:
+            start = time.perf_counter()
+            buffers[label] = run()
+            best[label] = min(best[label], time.perf_counter() - start)
+    print(f"{'path':8} {'allocs/frame':>13} {'bytes/frame':>12} {'pcm bufs/frame':>15} {'us/frame':>10}")
+    for label, _, _ in paths:
+        blocks, size = rows[label]
+        print(f"{label:8} {blocks:13.1f} {size:12.0f} {buffers[label] / frames:15.3f} {best[label] / frames * 1e6:10.2f}")
+    loop.close()
+
+if __name__ == "__main__":
+    bench(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
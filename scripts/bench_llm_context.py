@@ -0,0 +1,112 @@
+"""
+Time to first token against conversation length, with the full history sent on
+every turn ("unbounded", as before) and with a token-budgeted ConversationContext
+("budgeted").
+
+The LLM is a local fake whose time to first token grows with the prompt:
+BASE_MS plus PER_1K_TOKENS_MS per thousand prompt tokens (history and the new
+user text, counted with the same estimate the context uses). Summaries are made
+by the same fake, so they cost time too, but in the background. Between turns
+the script waits PAUSE_MS, standing in for the user speaking.
+
+Reports, at a few points in the conversation: prompt tokens, time to first token,
+and for the budgeted run the number of summaries made so far.
+
+Usage: python scripts/bench_llm_context.py [turns] [token_budget]
+Run from the repository root.
+"""
+import asyncio
+import os
+import sys
+import time
+from typing import AsyncGenerator, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.ai.context import ConversationContext
+from app.services.ai.interfaces import LLMService
+from app.core.logging import logger
+
+BASE_MS = 150.0
+PER_1K_TOKENS_MS = 40.0
+PAUSE_MS = 50.0
+USER_TEXT = ("I ordered the blue kettle last week, order number 4417, and it still has not shipped. "
+             "Can you tell me when it will arrive?")
+ANSWER = ("Thanks for waiting. I can see order 4417 for the blue kettle. It is packed and leaves our "
+          "warehouse tomorrow morning, so it should reach you within three working days. I will send "
+          "the tracking link by email as soon as the courier has it. Is there anything else I can help with?")
+REPORT_AT = (1, 10, 25, 50, 75, 100, 150, 200, 300)
+
+class FakeLLM(LLMService):
+    """Latency proportional to prompt size; the answer is always the same."""
+    def __init__(self):
+        self.prompt_tokens: List[int] = []
+
+    def _prompt_delay(self, tokens: int) -> float:
+        return (BASE_MS + PER_1K_TOKENS_MS * tokens / 1000) / 1000
+
+    async def chat_stream(self, text_stream: AsyncGenerator[str, None],
+                          history: Optional[List[Dict[str, str]]] = None) -> AsyncGenerator[str, None]:
+        async for text in text_stream:
+            tokens = self.count_tokens(text) + sum(self.count_tokens(m["content"]) for m in history or [])
+            self.prompt_tokens.append(tokens)
+            await asyncio.sleep(self._prompt_delay(tokens))
+            for word in ANSWER.split():
+                yield word + " "
+
+    async def summarize(self, summary: str, messages: List[Dict[str, str]]) -> str:
+        tokens = self.count_tokens(summary) + sum(self.count_tokens(m["content"]) for m in messages)
+        await asyncio.sleep(self._prompt_delay(tokens) * 2) # Prompt plus a longer answer
+        words = f"{summary} {' '.join(m['content'] for m in messages)}".split()
+        return " ".join(words[-150:])
+
+class UnboundedHistory:
+    """The history as it was: every turn, verbatim, for the whole call."""
+    def __init__(self):
+        self.turns: List[Dict[str, str]] = []
+        self.summaries = 0
+
+    def add(self, role: str, content: str):
+        self.turns.append({"role": role, "content": content})
+
+    def messages(self) -> List[Dict[str, str]]:
+        return list(self.turns)
+
+async def converse(llm: FakeLLM, history, turns: int) -> List[tuple]:
+    rows = []
+    for turn in range(1, turns + 1):
+        async def user_text():
+            yield USER_TEXT
+        started = time.monotonic()
+        first = None
+        chunks = []
+        async for chunk in llm.chat_stream(user_text(), history=history.messages()):
+            if first is None:
+                first = (time.monotonic() - started) * 1000
+            chunks.append(chunk)
+        history.add("user", USER_TEXT)
+        history.add("assistant", "".join(chunks).strip())
+        if turn in REPORT_AT or turn == turns:
+            rows.append((turn, llm.prompt_tokens[-1], first, getattr(history, "summaries", 0)))
+        await asyncio.sleep(PAUSE_MS / 1000)
+    if isinstance(history, ConversationContext):
+        history.close()
+    return rows
+
+async def main():
+    logger.setLevel("INFO") # Not a line per summary
+    turns = int(sys.argv[1]) if len(sys.argv) > 1 else 120
+    budget = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+
+    unbounded = await converse(FakeLLM(), UnboundedHistory(), turns)
+    llm = FakeLLM()
+    budgeted = await converse(llm, ConversationContext(llm, token_budget=budget), turns)
+
+    print(f"Fake LLM: {BASE_MS:.0f}ms + {PER_1K_TOKENS_MS:.0f}ms per 1k prompt tokens; "
+          f"{turns} turns, budget {budget} tokens")
+    print(f"{'turn':>5} | {'unbounded tokens':>16} {'ttft ms':>8} | {'budgeted tokens':>15} {'ttft ms':>8} {'summaries':>9}")
+    for (turn, u_tokens, u_ttft, _), (_, b_tokens, b_ttft, summaries) in zip(unbounded, budgeted):
+        print(f"{turn:>5} | {u_tokens:>16} {u_ttft:>8.1f} | {b_tokens:>15} {b_ttft:>8.1f} {summaries:>9}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
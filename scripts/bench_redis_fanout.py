@@ -0,0 +1,87 @@
+"""
+Measures the latency one Redis hop adds to room audio in distributed mode.
+
+Two RoomBus instances (two "workers") join the same room on a local redis-server.
+Worker A publishes 20ms audio frames and worker B timestamps their arrival.
+
+Usage: python scripts/bench_redis_fanout.py [frames] [redis_url]
+Run from the repository root with redis-server listening.
+"""
+import asyncio
+import os
+import statistics
+import struct
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import redis.asyncio as redis
+from app.core.protocol import pack_audio_frame
+from app.services.ingress import frame_from_wire
+from app.services.room_bus import RoomBus
+
+FRAME_BYTES = 640 # 20ms @ 16kHz PCM16
+SEND_TIME = struct.Struct("!d")
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+async def bench(frames: int, url: str):
+    worker_a, worker_b = RoomBus("bench-a"), RoomBus("bench-b")
+    client_a = redis.from_url(url, decode_responses=False)
+    client_b = redis.from_url(url, decode_responses=False)
+    await worker_a.start(client_a)
+    await worker_b.start(client_b)
+
+    room_id = f"bench-{os.getpid()}"
+    await worker_a.join(room_id)
+    await worker_b.join(room_id)
+
+    latencies = []
+    echoes = 0
+    done = asyncio.Event()
+
+    async def on_b(room, frame):
+        sent = SEND_TIME.unpack_from(frame.audio)[0]
+        latencies.append((time.perf_counter() - sent) * 1000)
+        if len(latencies) >= frames:
+            done.set()
+
+    async def on_a(room, frame):
+        nonlocal echoes
+        echoes += 1
+
+    worker_a.on_audio = on_a
+    worker_b.on_audio = on_b
+
+    padding = b"\x00" * (FRAME_BYTES - SEND_TIME.size)
+    for seq in range(frames):
+        payload = SEND_TIME.pack(time.perf_counter()) + padding
+        wire = pack_audio_frame(payload, seq, seq * 20, slot=0)
+        worker_a.publish_audio(room_id, frame_from_wire("sender", seq, wire))
+        await asyncio.sleep(0.02)
+
+    try:
+        await asyncio.wait_for(done.wait(), timeout=5)
+    except asyncio.TimeoutError:
+        pass
+
+    print(f"frames sent:      {frames}")
+    print(f"frames received:  {len(latencies)}")
+    print(f"own echoes seen:  {echoes} (should be 0, skipped: {worker_a.echoes_skipped})")
+    if latencies:
+        print(f"hop latency ms:   p50={percentile(latencies, 50):.3f} "
+              f"p90={percentile(latencies, 90):.3f} p99={percentile(latencies, 99):.3f} "
+              f"max={max(latencies):.3f} mean={statistics.mean(latencies):.3f}")
+
+    await worker_a.stop()
+    await worker_b.stop()
+    await client_a.close()
+    await client_b.close()
+
+if __name__ == "__main__":
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    url = sys.argv[2] if len(sys.argv) > 2 else "redis://localhost:6379/0"
+    asyncio.run(bench(frames, url))
@@ -0,0 +1,60 @@
+"""
+Throughput of the streaming resampler / format converter used on the agent path.
+
+Feeds 20ms frames through AudioConverter for common rate pairs and reports the
+cost per frame and how many concurrent real-time streams one core can convert.
+
+Usage: python scripts/bench_resampler.py [seconds_of_audio]
+Run from the repository root.
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from app.services.resampler import AudioConverter, SAMPLE_FORMAT_F32, SAMPLE_FORMAT_S16
+
+CASES = [
+    # (label, in_rate, out_rate, channels, sample_format)
+    ("48k s16 mono -> 16k", 48000, 16000, 1, SAMPLE_FORMAT_S16),
+    ("48k s16 stereo -> 16k", 48000, 16000, 2, SAMPLE_FORMAT_S16),
+    ("48k f32 mono -> 16k", 48000, 16000, 1, SAMPLE_FORMAT_F32),
+    ("44.1k s16 mono -> 16k", 44100, 16000, 1, SAMPLE_FORMAT_S16),
+    ("24k s16 mono -> 16k (TTS)", 24000, 16000, 1, SAMPLE_FORMAT_S16),
+    ("22.05k s16 mono -> 16k (TTS)", 22050, 16000, 1, SAMPLE_FORMAT_S16),
+    ("16k s16 mono -> 48k", 16000, 48000, 1, SAMPLE_FORMAT_S16),
+]
+
+def make_frames(rate: int, channels: int, sample_format: str, seconds: float):
+    samples = int(rate * seconds)
+    t = np.arange(samples) / rate
+    signal = 0.3 * np.sin(2 * np.pi * 440 * t) + 0.05 * np.random.randn(samples)
+    signal = np.repeat(signal[:, None], channels, axis=1).ravel()
+    if sample_format == SAMPLE_FORMAT_F32:
+        data = signal.astype("<f4").tobytes()
+        width = 4
+    else:
+        data = (np.clip(signal, -1, 1) * 32767).astype("<i2").tobytes()
+        width = 2
+    frame_bytes = rate // 50 * channels * width # 20ms
+    return [data[i:i + frame_bytes] for i in range(0, len(data), frame_bytes)]
+
+def bench(seconds: float):
+    print(f"{'case':32} {'us/frame':>10} {'streams/core':>14}")
+    for label, in_rate, out_rate, channels, sample_format in CASES:
+        frames = make_frames(in_rate, channels, sample_format, seconds)
+        converter = AudioConverter(in_rate, out_rate, channels=channels, sample_format=sample_format)
+        for frame in frames[:50]: # warm up
+            converter.convert(frame)
+        start = time.perf_counter()
+        for frame in frames:
+            converter.convert(frame)
+        elapsed = time.perf_counter() - start
+        # Seconds of audio converted per second of CPU = real-time streams one core sustains
+        streams = (len(frames) * 0.02) / elapsed
+        print(f"{label:32} {elapsed / len(frames) * 1e6:10.1f} {int(streams):14d}")
+
+if __name__ == "__main__":
+    bench(float(sys.argv[1]) if len(sys.argv) > 1 else 10.0)
@@ -4,6 +4,7 @@ import msgpack
 import uuid
 import sys
 import time
+import struct
 
 try:
     import pyaudio
@@ -17,10 +18,19 @@ FORMAT = pyaudio.paInt16
 CHANNELS = 1
 RATE = 16000
 
+# Pass --binary to send fixed-header audio frames instead of msgpack envelopes
+# (and to receive control messages as msgpack and server audio as binary frames)
+# Header: kind, codec, slot, sequence, timestamp (see app/core/protocol.py)
+USE_BINARY = "--binary" in sys.argv
+AUDIO_HEADER = struct.Struct("!BBHII")
+FRAME_KIND_AUDIO = 0x01
+
 async def mic_client():
     room_id = "ai-mic-test"
     username = f"user-mic-{uuid.uuid4().hex[:4]}"
     uri = f"ws://127.0.0.1:8000/ws/{room_id}/{username}"
+    if USE_BINARY:
+        uri += "?control=msgpack&audio=binary"
 
     p = pyaudio.PyAudio()
     
@@ -37,19 +47,27 @@ async def mic_client():
         print(f"Connected as {username}")
         
         async def send_audio():
+            seq = 0
             while True:
                 # Read from mic (non-blocking way is better, but this is simple client)
                 data = stream.read(CHUNK, exception_on_overflow=False)
+                timestamp = int(time.time() * 1000)
                 
-                msg = {
-                    "type": "audio_stream",
-                    "payload": {
-                        "participant_id": username,
-                        "audio_data": data,
-                        "timestamp": int(time.time() * 1000)
+                if USE_BINARY:
+                    # Slot is stamped by the server
+                    header = AUDIO_HEADER.pack(FRAME_KIND_AUDIO, 0, 0xFFFF, seq & 0xFFFFFFFF, timestamp & 0xFFFFFFFF)
+                    packed = header + data
+                    seq += 1
+                else:
+                    msg = {
+                        "type": "audio_stream",
+                        "payload": {
+                            "participant_id": username,
+                            "audio_data": data,
+                            "timestamp": timestamp
+                        }
                     }
-                }
-                packed = msgpack.packb(msg, use_bin_type=True)
+                    packed = msgpack.packb(msg, use_bin_type=True)
                 await websocket.send(packed)
                 await asyncio.sleep(0.001)
 
@@ -58,6 +76,11 @@ async def mic_client():
                 while True:
                     msg = await websocket.recv()
                     if isinstance(msg, bytes):
+                        if msg[:1] == bytes([FRAME_KIND_AUDIO]):
+                            _, _, slot, _, _ = AUDIO_HEADER.unpack_from(msg)
+                            size = len(msg) - AUDIO_HEADER.size
+                            print(f"Received Audio (slot {slot}): {size} bytes", end='\r')
+                            continue
                         try:
                             # If we get audio back, maybe play it?
                             # For now, just print stats
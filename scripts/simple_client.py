@@ -2,11 +2,22 @@ import asyncio
 import websockets
 import msgpack
 import uuid
+import sys
+import struct
+
+# Pass --binary to send fixed-header audio frames instead of msgpack envelopes
+# (and to receive control messages as msgpack and server audio as binary frames)
+# Header: kind, codec, slot, sequence, timestamp (see app/core/protocol.py)
+USE_BINARY = "--binary" in sys.argv
+AUDIO_HEADER = struct.Struct("!BBHII")
+FRAME_KIND_AUDIO = 0x01
 
 async def test_client():
     room_id = "ai-test-room" # Trigger auto-agent
     username = f"user-{uuid.uuid4().hex[:4]}"
     uri = f"ws://127.0.0.1:8000/ws/{room_id}/{username}"
+    if USE_BINARY:
+        uri += "?control=msgpack&audio=binary"
 
     async with websockets.connect(uri) as websocket:
         print(f"Connected as {username}")
@@ -18,6 +29,10 @@ async def test_client():
                     msg = await websocket.recv()
                     # output may be bytes or str
                     if isinstance(msg, bytes):
+                        if msg[:1] == bytes([FRAME_KIND_AUDIO]):
+                            _, _, slot, seq, _ = AUDIO_HEADER.unpack_from(msg)
+                            print(f"[{username}] Received Audio (slot {slot}, seq {seq}): {len(msg) - AUDIO_HEADER.size} bytes")
+                            continue
                         # try unpack
                         try:
                             data = msgpack.unpackb(msg, raw=False)
@@ -43,11 +58,15 @@ async def test_client():
             }
         }
         packed = msgpack.packb(audio_packet, use_bin_type=True)
+        if USE_BINARY:
+            packed = AUDIO_HEADER.pack(FRAME_KIND_AUDIO, 0, 0xFFFF, 0, 123456) + audio_packet["payload"]["audio_data"]
         await websocket.send(packed)
         
         # Send another one
         await asyncio.sleep(1)
         print("Sending second audio packet...")
+        if USE_BINARY:
+            packed = AUDIO_HEADER.pack(FRAME_KIND_AUDIO, 0, 0xFFFF, 1, 123456 + 1000) + audio_packet["payload"]["audio_data"]
         await websocket.send(packed)
         
         await asyncio.sleep(2)
@@ -2,12 +2,41 @@ import asyncio
 import websockets
 import msgpack
 import uuid
+import sys
+import math
+import struct
+from array import array
+
+# Pass --binary to send fixed-header audio frames instead of msgpack envelopes
+# (and to receive control messages as msgpack and server audio as binary frames)
+# Header: kind, codec, slot, sequence, timestamp (see app/core/protocol.py)
+USE_BINARY = "--binary" in sys.argv
+AUDIO_HEADER = struct.Struct("!BBHII")
+FRAME_KIND_AUDIO = 0x01
+
+SAMPLE_RATE = 16000
+FRAME_SAMPLES = SAMPLE_RATE // 50 # 20ms
+SPEECH_FRAMES = 75 # 1.5s of "speech"
+SILENCE_FRAMES = 50 # Then 1s of silence, so the turn ends
+
+def voiced_frame(index: int) -> bytes:
+    # A 140 Hz buzz with harmonics: the server's VAD takes it for voiced speech
+    # (a constant or flat signal is rejected and never reaches STT)
+    start = index * FRAME_SAMPLES
+    return array("h", (
+        int(5000 * sum(math.sin(2 * math.pi * 140 * k * (start + i) / SAMPLE_RATE) / k for k in range(1, 6)))
+        for i in range(FRAME_SAMPLES)
+    )).tobytes()
+
+SILENT_FRAME = bytes(FRAME_SAMPLES * 2)
 
 async def test_client():
     # Use 'ai-mock-test' to trigger the MockConversationalAgent
     room_id = "ai-mock-test" 
     username = f"user-{uuid.uuid4().hex[:4]}"
     uri = f"ws://127.0.0.1:8000/ws/{room_id}/{username}"
+    if USE_BINARY:
+        uri += "?control=msgpack&audio=binary"
 
     async with websockets.connect(uri) as websocket:
         print(f"Connected as {username}")
@@ -19,6 +48,10 @@ async def test_client():
                     msg = await websocket.recv()
                     # output may be bytes or str
                     if isinstance(msg, bytes):
+                        if msg[:1] == bytes([FRAME_KIND_AUDIO]):
+                            _, _, slot, seq, _ = AUDIO_HEADER.unpack_from(msg)
+                            print(f"[{username}] Received Audio (slot {slot}, seq {seq}): {len(msg) - AUDIO_HEADER.size} bytes")
+                            continue
                         # try unpack
                         try:
                             data = msgpack.unpackb(msg, raw=False)
@@ -40,22 +73,24 @@ async def test_client():
 
         listen_task = asyncio.create_task(listen())
         
-        # Send fake audio message continually to trigger the Mock STT (threshold > 16000 bytes)
+        # Speech-like audio, then silence: the mock agent hears a phrase and answers
         print("Sending audio stream...")
-        audio_packet = {
-            "type": "audio_stream",
-            "payload": {
-                "participant_id": username,
-                "audio_data": b'\x01' * 1000, # 1KB per packet
-                "timestamp": 123456
-            }
-        }
-        packed = msgpack.packb(audio_packet, use_bin_type=True)
-        
-        # Send enough to trigger STT (~16 packets)
-        for i in range(30):
+        for i in range(SPEECH_FRAMES + SILENCE_FRAMES):
+            audio_data = voiced_frame(i) if i < SPEECH_FRAMES else SILENT_FRAME
+            timestamp = 123456 + i * 20
+            if USE_BINARY:
+                packed = AUDIO_HEADER.pack(FRAME_KIND_AUDIO, 0, 0xFFFF, i, timestamp) + audio_data
+            else:
+                packed = msgpack.packb({
+                    "type": "audio_stream",
+                    "payload": {
+                        "participant_id": username,
+                        "audio_data": audio_data,
+                        "timestamp": timestamp
+                    }
+                }, use_bin_type=True)
             await websocket.send(packed)
-            await asyncio.sleep(0.05)
+            await asyncio.sleep(0.02)
         
         print("Finished sending audio. Waiting for response...")
         await asyncio.sleep(5)
@@ -0,0 +1,89 @@
+"""Barge-in: user speech cuts off the agent while its answer is produced or still playing."""
+import asyncio
+import math
+import time
+from array import array
+
+from app.services.ai.base import AgentInterrupt
+from app.services.ai.conversational_agent import ConversationalAgent
+from app.services.ai.interfaces import LLMService, STTService, Transcript
+from app.services.ai.providers.mock import MockLLMService, MockSTTService, MockTTSService
+from app.services.audio import AudioFrame
+
+def voiced(index: int) -> bytes:
+    """20 ms of a 140 Hz harmonic buzz: passes the VAD as speech."""
+    start = index * 320
+    return array("h", (int(5000 * sum(math.sin(2 * math.pi * 140 * k * (start + j) / 16000) / k
+                                      for k in range(1, 6))) for j in range(320))).tobytes()
+
+class ShortAnswerLLM(LLMService):
+    async def chat_stream(self, text_stream, history=None):
+        async for _ in text_stream:
+            yield "Sure thing, one two three."
+
+class OneTurnSTT(STTService):
+    async def transcribe(self, audio_stream):
+        frames = 0
+        async for _ in audio_stream:
+            frames += 1
+            if frames == 10:
+                yield Transcript("hello there", is_final=True)
+
+def agent(llm: LLMService) -> ConversationalAgent:
+    return ConversationalAgent(OneTurnSTT(), llm, MockTTSService(latency=0.01), filler_phrases=[])
+
+def test_speaking_covers_audio_still_playing():
+    async def run():
+        session = ConversationalAgent(MockSTTService(), MockLLMService(), MockTTSService()).new_session()
+        now = time.monotonic()
+        assert not session.speaking(now)
+        session.response = asyncio.create_task(asyncio.sleep(0))
+        assert session.speaking(now)
+        await session.response
+        assert not session.speaking(now) # Done, and nothing handed out
+        session.playing_until = now + 0.5 # Done producing, audio still queued downstream
+        assert session.speaking(now) and not session.speaking(now + 0.5)
+
+    asyncio.run(run())
+
+def test_barge_in_after_the_answer_is_produced_but_still_playing():
+    async def run():
+        speak_again = asyncio.Event()
+
+        async def audio():
+            for i in range(30):
+                yield AudioFrame(voiced(i), timestamp=0)
+                await asyncio.sleep(0.02)
+            for _ in range(15):
+                yield AudioFrame(bytes(640), timestamp=0)
+                await asyncio.sleep(0.02)
+            await speak_again.wait()
+            for i in range(30):
+                yield AudioFrame(voiced(i), timestamp=0)
+                await asyncio.sleep(0.02)
+            await asyncio.sleep(1)
+
+        conversation = agent(ShortAnswerLLM())
+        session = conversation.new_session()
+        stream = conversation.process_audio_stream(audio(), session=session)
+        played = 0
+        interrupted_while_producing = None
+        try:
+            async for item in stream:
+                if isinstance(item, AgentInterrupt):
+                    interrupted_while_producing = session.responding
+                    break
+                played += 1
+                if played == 3:
+                    # The whole answer is out of the agent; the room is still playing it
+                    assert not session.responding
+                    speak_again.set()
+                await asyncio.sleep(0.02) # Real-time playback
+        finally:
+            await stream.aclose()
+        return session, played, interrupted_while_producing
+
+    session, played, interrupted_while_producing = asyncio.run(run())
+    assert interrupted_while_producing is False
+    assert session.interruptions == 1
+    assert played < 5 * len("Sure thing, one two three.".split()) # Cut off before the end
@@ -0,0 +1,137 @@
+"""ConversationContext: token budget, low-water eviction and background summaries."""
+import asyncio
+from typing import Dict, List, Optional
+
+from app.services.ai.context import ConversationContext
+from app.services.ai.interfaces import LLMService
+
+class FakeLLM(LLMService):
+    """One token per word; summaries on demand, or failures."""
+    def __init__(self):
+        self.result: Optional[str] = "summary"
+        self.batches: List[List[Dict[str, str]]] = []
+        self.release = asyncio.Event()
+        self.release.set()
+
+    def count_tokens(self, text: str) -> int:
+        return len(text.split())
+
+    async def chat_stream(self, text_stream, history=None):
+        yield ""
+
+    async def summarize(self, summary: str, messages: List[Dict[str, str]]) -> str:
+        self.batches.append(list(messages))
+        await self.release.wait()
+        if self.result is None:
+            raise RuntimeError("LLM unavailable")
+        return self.result
+
+def words(n: int, tag: str) -> str:
+    return " ".join([tag] * n)
+
+def exchange(context: ConversationContext, i: int, tokens: int = 10):
+    context.add("user", words(tokens, f"q{i}"))
+    context.add("assistant", words(tokens, f"a{i}"))
+
+def test_turns_stay_verbatim_under_the_budget():
+    async def run():
+        context = ConversationContext(FakeLLM(), token_budget=100, low_water=0.5, keep_messages=2)
+        for i in range(5):
+            exchange(context, i)
+        await asyncio.sleep(0)
+        return context
+
+    context = asyncio.run(run())
+    assert context.tokens == 100 and not context.aging and not context.summary
+    assert [m["content"].split()[0] for m in context.messages()] == [f"{r}{i}" for i in range(5) for r in "qa"]
+
+def test_over_budget_moves_whole_exchanges_down_to_low_water_and_summarizes():
+    async def run():
+        llm = FakeLLM()
+        context = ConversationContext(llm, token_budget=100, low_water=0.5, keep_messages=2)
+        for i in range(5):
+            exchange(context, i)
+        context.add("user", words(10, "q5")) # 110 tokens: over budget
+        moved = [m["content"].split()[0] for m in context.aging]
+        history_while_summarizing = context.messages()
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        return llm, context, moved, history_while_summarizing
+
+    llm, context, moved, history = asyncio.run(run())
+    # Down to 50 tokens of recent turns, whole exchanges only
+    assert moved == ["q0", "a0", "q1", "a1", "q2", "a2"]
+    # Nothing is lost while the summary is made: moved turns are still sent verbatim
+    assert len(history) == 11 and history[0]["content"].startswith("q0")
+    assert [[m["content"].split()[0] for m in batch] for batch in llm.batches] == [moved]
+    assert context.summary == "summary" and not context.aging
+    assert context.messages()[0] == {"role": "system", "content": "summary"}
+    assert context.recent_tokens == 50 and context.tokens == 51
+    assert context.stats()["context_summaries"] == 1
+
+def test_an_empty_summary_keeps_the_old_one_and_the_turns():
+    async def run():
+        llm = FakeLLM()
+        context = ConversationContext(llm, token_budget=100, low_water=0.5, keep_messages=2)
+        for i in range(6):
+            exchange(context, i)
+        await asyncio.sleep(0)
+        assert context.summary == "summary"
+
+        llm.result = "   "
+        for i in range(6, 9):
+            exchange(context, i)
+        await asyncio.sleep(0)
+        return context
+
+    context = asyncio.run(run())
+    assert context.summary == "summary"
+    assert context.aging # Waiting for the next attempt, still sent verbatim
+    assert context.messages()[1] == context.aging[0]
+    assert context.stats()["context_summary_failures"] >= 1
+
+def test_failing_summaries_cannot_grow_the_prompt_without_limit():
+    async def run():
+        llm = FakeLLM()
+        llm.result = None
+        context = ConversationContext(llm, token_budget=100, low_water=0.5, keep_messages=2)
+        peak = 0
+        for i in range(100):
+            exchange(context, i)
+            await asyncio.sleep(0)
+            peak = max(peak, context.tokens)
+        return context, peak
+
+    context, peak = asyncio.run(run())
+    assert not context.summary
+    # At most a budget of aged turns on top of the recent window
+    assert context.aging_tokens <= 100 and peak <= 100 + 100 + 20
+    stats = context.stats()
+    assert stats["context_dropped_messages"] > 0 and stats["context_summaries"] == 0
+    # The newest turns are never the ones dropped
+    assert context.messages()[-1]["content"].startswith("a99")
+
+def test_a_summary_removes_only_its_own_batch():
+    async def run():
+        llm = FakeLLM()
+        llm.release.clear() # Summaries wait until released
+        context = ConversationContext(llm, token_budget=40, low_water=0.5, keep_messages=2)
+        for i in range(20):
+            exchange(context, i)
+            await asyncio.sleep(0)
+        in_flight = llm.batches[0]
+        waiting = list(context.aging)
+        llm.release.set()
+        llm.release.clear() # Only the summary in flight finishes; the next one waits
+        for _ in range(3):
+            await asyncio.sleep(0)
+        return context, in_flight, waiting
+
+    context, in_flight, waiting = asyncio.run(run())
+    summarized = {id(m) for m in in_flight}
+    # Part of the batch was dropped while it was being summarized
+    assert context.dropped_messages > 0 and not summarized <= {id(m) for m in waiting}
+    assert context.summary == "summary"
+    # Turns that aged out after the batch are kept for the next summary
+    assert context.aging == [m for m in waiting if id(m) not in summarized]
+    assert context.aging_tokens == sum(len(m["content"].split()) for m in context.aging)
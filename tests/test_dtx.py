@@ -0,0 +1,49 @@
+"""DTX decisions for PCM and Opus senders."""
+import math
+import random
+import struct
+
+from app.core.protocol import AudioCodec, pack_audio_frame
+from app.services.dtx import DtxDecision, DtxStage
+from app.services.ingress import frame_from_wire
+
+FRAME_MS = 20
+
+def stage() -> DtxStage:
+    return DtxStage(threshold_db=-55.0, hangover_ms=200, comfort_noise_ms=400, frame_ms=FRAME_MS)
+
+def opus_frame(seq: int, size: int):
+    wire = pack_audio_frame(bytes(size), seq, seq * FRAME_MS, codec=AudioCodec.OPUS)
+    return frame_from_wire("alice", seq, wire)
+
+def pcm_frame(seq: int, amplitude: float):
+    samples = [int(amplitude * math.sin(2 * math.pi * 200 * i / 16000)) for i in range(320)]
+    return frame_from_wire("alice", seq, pack_audio_frame(struct.pack("<320h", *samples), seq, seq * FRAME_MS))
+
+def test_low_bitrate_opus_speech_is_never_suppressed():
+    # libopus' default for 16 kHz mono is about 19 kbps: ~47 bytes per 20 ms packet,
+    # with quieter frames well below that
+    rng = random.Random(7)
+    dtx = stage()
+    decisions = [dtx.decide(opus_frame(seq, rng.randint(20, 75))) for seq in range(500)]
+    assert set(decisions) == {DtxDecision.FORWARD}
+    assert dtx.frames_suppressed == 0
+
+def test_opus_encoder_dtx_packets_are_suppressed_after_the_hangover():
+    dtx = stage()
+    for seq in range(10):
+        assert dtx.decide(opus_frame(seq, 47)) == DtxDecision.FORWARD
+    decisions = [dtx.decide(opus_frame(seq, 1)) for seq in range(10, 41)]
+    assert decisions[:10] == [DtxDecision.FORWARD] * 10 # 200 ms hangover
+    assert decisions[10] == DtxDecision.COMFORT_NOISE
+    assert decisions[11:30] == [DtxDecision.DROP] * 19
+    assert decisions[30] == DtxDecision.COMFORT_NOISE # Every 400 ms
+    # Speech resumes at once
+    assert dtx.decide(opus_frame(41, 30)) == DtxDecision.FORWARD
+
+def test_pcm_is_judged_by_level():
+    dtx = stage()
+    assert dtx.decide(pcm_frame(0, 3000)) == DtxDecision.FORWARD
+    quiet = [dtx.decide(pcm_frame(seq, 20)) for seq in range(1, 13)] # About -64 dBFS
+    assert quiet[:10] == [DtxDecision.FORWARD] * 10
+    assert quiet[10:] == [DtxDecision.COMFORT_NOISE, DtxDecision.DROP]
@@ -0,0 +1,230 @@
+"""
+Google STT and TTS adapters against a local fake gRPC server.
+
+The fakes implement the real RPCs (google.cloud.speech.v1.Speech/StreamingRecognize
+and google.cloud.texttospeech.v1.TextToSpeech/SynthesizeSpeech) on an insecure
+localhost port; the adapters talk to them through their normal async clients.
+"""
+import asyncio
+import datetime
+from typing import List
+
+import grpc
+from google.cloud import speech, texttospeech
+from google.cloud.speech_v1.services.speech.transports import SpeechGrpcAsyncIOTransport
+from google.cloud.texttospeech_v1.services.text_to_speech.transports import TextToSpeechGrpcAsyncIOTransport
+
+from app.core.config import settings
+from app.services.ai.interfaces import Transcript
+from app.services.ai.providers.google_stt import GoogleSTTService
+from app.services.ai.providers.google_tts import GoogleTTSService
+from app.services.audio import AudioFrame
+
+FRAME_BYTES = settings.SAMPLE_RATE * settings.FRAME_DURATION_MS // 1000 * 2
+
+def chunk(i: int) -> bytes:
+    return bytes([i % 256]) * FRAME_BYTES
+
+def result(text: str, is_final: bool, end_frames: int = 0) -> speech.StreamingRecognizeResponse:
+    end = datetime.timedelta(milliseconds=end_frames * settings.FRAME_DURATION_MS)
+    return speech.StreamingRecognizeResponse(results=[speech.StreamingRecognitionResult(
+        alternatives=[speech.SpeechRecognitionAlternative(transcript=text)],
+        is_final=is_final,
+        result_end_time=end,
+    )])
+
+async def start_server(service: str, handlers: dict) -> tuple:
+    server = grpc.aio.server()
+    server.add_generic_rpc_handlers((grpc.method_handlers_generic_handler(service, handlers),))
+    port = server.add_insecure_port("127.0.0.1:0")
+    await server.start()
+    return server, f"127.0.0.1:{port}"
+
+async def frames(count: int, interval: float = 0.005):
+    for i in range(count):
+        yield AudioFrame(chunk(i), timestamp=i * settings.FRAME_DURATION_MS)
+        await asyncio.sleep(interval)
+
+def stt_for(address: str) -> GoogleSTTService:
+    stt = GoogleSTTService()
+    stt.client = speech.SpeechAsyncClient(
+        transport=SpeechGrpcAsyncIOTransport(channel=grpc.aio.insecure_channel(address))
+    )
+    return stt
+
+def stt_handler(behaviour):
+    return grpc.stream_stream_rpc_method_handler(
+        behaviour,
+        request_deserializer=speech.StreamingRecognizeRequest.deserialize,
+        response_serializer=speech.StreamingRecognizeResponse.serialize,
+    )
+
+def test_stt_streams_interim_and_final_results():
+    received: List[bytes] = []
+    configs = []
+
+    async def recognize(request_iterator, context):
+        async for request in request_iterator:
+            if request.streaming_config.config.sample_rate_hertz:
+                configs.append(request.streaming_config)
+                continue
+            received.append(request.audio_content)
+            if len(received) == 3:
+                yield result("hello", is_final=False)
+            elif len(received) == 6:
+                yield result("hello world", is_final=True, end_frames=6)
+
+    async def run():
+        server, address = await start_server("google.cloud.speech.v1.Speech",
+                                             {"StreamingRecognize": stt_handler(recognize)})
+        try:
+            stt = stt_for(address)
+            transcripts = [t async for t in stt.transcribe(frames(10))]
+            return stt, transcripts
+        finally:
+            await server.stop(None)
+
+    stt, transcripts = asyncio.run(run())
+    assert transcripts == [Transcript("hello", is_final=False), Transcript("hello world", is_final=True)]
+    assert len(configs) == 1 and configs[0].interim_results
+    assert received == [chunk(i) for i in range(10)]
+    assert stt.streams == 1 and stt.restarts == 0
+
+def test_stt_reopens_the_stream_without_losing_audio():
+    streams: List[List[bytes]] = []
+
+    async def recognize(request_iterator, context):
+        audio = []
+        streams.append(audio)
+        async for request in request_iterator:
+            if not request.audio_content:
+                continue
+            audio.append(request.audio_content)
+            if len(streams) == 1 and len(audio) == 5:
+                yield result("first", is_final=True, end_frames=3)
+            if len(streams) == 1 and len(audio) == 10:
+                # Chunks the client already sent beyond this one are never read
+                await context.abort(grpc.StatusCode.OUT_OF_RANGE, "Exceeded maximum allowed stream duration")
+
+    async def run():
+        server, address = await start_server("google.cloud.speech.v1.Speech",
+                                             {"StreamingRecognize": stt_handler(recognize)})
+        try:
+            stt = stt_for(address)
+            transcripts = [t async for t in stt.transcribe(frames(30))]
+            return stt, transcripts
+        finally:
+            await server.stop(None)
+
+    stt, transcripts = asyncio.run(run())
+    assert transcripts == [Transcript("first", is_final=True)]
+    assert stt.streams == 2 and stt.restarts == 1
+    first, second = streams
+    assert first == [chunk(i) for i in range(10)]
+    # The second stream starts right after the final result's audio (frames 0-2 are done)
+    # and carries everything after it, in order, including what the first stream never read
+    assert second == [chunk(i) for i in range(3, 30)]
+
+def test_stt_retries_transient_errors_and_replays_audio():
+    streams: List[List[bytes]] = []
+
+    async def recognize(request_iterator, context):
+        audio = []
+        streams.append(audio)
+        async for request in request_iterator:
+            if not request.audio_content:
+                continue
+            audio.append(request.audio_content)
+            if len(streams) == 1 and len(audio) == 4:
+                yield result("first", is_final=True, end_frames=2)
+            if len(streams) == 1 and len(audio) == 8:
+                await context.abort(grpc.StatusCode.UNAVAILABLE, "Connection reset")
+            if len(streams) == 2 and len(audio) == 1:
+                await context.abort(grpc.StatusCode.DEADLINE_EXCEEDED, "Deadline exceeded")
+
+    async def run():
+        server, address = await start_server("google.cloud.speech.v1.Speech",
+                                             {"StreamingRecognize": stt_handler(recognize)})
+        try:
+            stt = stt_for(address)
+            stt.retry_backoff = 0.01
+            transcripts = [t async for t in stt.transcribe(frames(30))]
+            return stt, transcripts
+        finally:
+            await server.stop(None)
+
+    stt, transcripts = asyncio.run(run())
+    assert transcripts == [Transcript("first", is_final=True)]
+    assert stt.streams == 3 and stt.retries == 2 and stt.restarts == 0
+    # Each new stream starts from the audio after the last final result
+    assert streams[1][0] == chunk(2)
+    assert streams[2] == [chunk(i) for i in range(2, 30)]
+
+def test_stt_gives_up_after_repeated_transient_errors():
+    async def recognize(request_iterator, context):
+        await context.abort(grpc.StatusCode.UNAVAILABLE, "Service unavailable")
+        yield # An async generator, like the other fakes
+
+    async def run():
+        server, address = await start_server("google.cloud.speech.v1.Speech",
+                                             {"StreamingRecognize": stt_handler(recognize)})
+        try:
+            stt = stt_for(address)
+            stt.retry_backoff = 0.01
+            transcripts = [t async for t in stt.transcribe(frames(100))]
+            return stt, transcripts
+        finally:
+            await server.stop(None)
+
+    stt, transcripts = asyncio.run(run())
+    assert transcripts == []
+    assert stt.streams == stt.max_retries + 1 and stt.retries == stt.max_retries
+
+def test_tts_synthesizes_through_the_async_client():
+    requests = []
+    pcm = bytes(range(256)) * 10 # 2560 bytes: four full 20ms frames (640 bytes each)
+
+    async def synthesize(request, context):
+        requests.append(request)
+        await asyncio.sleep(0.01)
+        return texttospeech.SynthesizeSpeechResponse(audio_content=pcm)
+
+    async def run():
+        handler = grpc.unary_unary_rpc_method_handler(
+            synthesize,
+            request_deserializer=texttospeech.SynthesizeSpeechRequest.deserialize,
+            response_serializer=texttospeech.SynthesizeSpeechResponse.serialize,
+        )
+        server, address = await start_server("google.cloud.texttospeech.v1.TextToSpeech",
+                                             {"SynthesizeSpeech": handler})
+        try:
+            tts = GoogleTTSService()
+            tts.client = texttospeech.TextToSpeechAsyncClient(
+                transport=TextToSpeechGrpcAsyncIOTransport(channel=grpc.aio.insecure_channel(address))
+            )
+
+            async def text():
+                yield "Hello there. How are you today?"
+
+            # The event loop keeps running while synthesis is awaited
+            ticks = 0
+            async def ticker():
+                nonlocal ticks
+                while True:
+                    ticks += 1
+                    await asyncio.sleep(0.001)
+            ticking = asyncio.create_task(ticker())
+            out = [frame async for frame in tts.synthesize(text())]
+            ticking.cancel()
+            return out, ticks
+        finally:
+            await server.stop(None)
+
+    out, ticks = asyncio.run(run())
+    # Look-ahead synthesizes both segments at once, so they may arrive in either order
+    assert sorted(r.input.text for r in requests) == ["Hello there.", "How are you today?"]
+    assert requests[0].audio_config.audio_encoding == texttospeech.AudioEncoding.LINEAR16
+    assert requests[0].audio_config.sample_rate_hertz == settings.SAMPLE_RATE
+    assert len(out) == 8 and all(len(f.data) == FRAME_BYTES for f in out)
+    assert b"".join(bytes(f.data) for f in out[:4]) == pcm
+    assert ticks > 5
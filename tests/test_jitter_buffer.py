@@ -0,0 +1,106 @@
+"""JitterBuffer: sequence-order playout, loss concealment and adaptive depth."""
+from typing import List
+
+from app.services.audio import AudioFrame, JitterBuffer
+
+FRAME_MS = 20
+SILENCE = bytes(320 * 2) # One 20 ms frame at 16 kHz
+
+def pcm(seq: int) -> bytes:
+    return bytes([seq % 256]) * len(SILENCE)
+
+def push(jb: JitterBuffer, seq: int, data: bytes = None, arrival: float = None):
+    # On-time arrival unless given: exactly one frame period per sequence number
+    jb.push(seq, AudioFrame(pcm(seq) if data is None else data, timestamp=seq * FRAME_MS),
+            arrival=seq * FRAME_MS / 1000 if arrival is None else arrival)
+
+def buffer(**kwargs) -> JitterBuffer:
+    kwargs.setdefault("max_depth", 1) # A fixed target, so tests control buffering exactly
+    return JitterBuffer(capacity=16, frame_duration_ms=FRAME_MS, sample_rate=16000, **kwargs)
+
+def test_reordered_frames_play_in_sequence_order():
+    jb = buffer()
+    push(jb, 0)
+    push(jb, 2)
+    push(jb, 1)
+    played = [jb.pop().data, jb.pop().data]
+    push(jb, 3)
+    played += [jb.pop().data, jb.pop().data]
+    assert played == [pcm(0), pcm(1), pcm(2), pcm(3)]
+    assert jb.stats()["lost"] == 0 and jb.stats()["concealed"] == 0
+
+def test_a_lost_frame_is_concealed_by_repeating_the_last_one():
+    jb = buffer()
+    for seq in (0, 1, 3):
+        push(jb, seq)
+    frames = [jb.pop() for _ in range(4)]
+    assert [f.data for f in frames] == [pcm(0), pcm(1), pcm(1), pcm(3)]
+    assert [f.timestamp for f in frames] == [0, 20, 40, 60]
+    assert jb.lost == 1 and jb.concealed == 1 and jb.played == 3
+
+def test_silence_concealment_and_conceal_none():
+    jb = buffer(concealment=JitterBuffer.CONCEAL_SILENCE)
+    for seq in (0, 2):
+        push(jb, seq)
+    assert [jb.pop().data for _ in range(3)] == [pcm(0), SILENCE, pcm(2)]
+
+    jb = buffer(concealment=JitterBuffer.CONCEAL_NONE)
+    for seq in (0, 2):
+        push(jb, seq)
+    assert [jb.pop().data for _ in range(3)] == [pcm(0), b"", pcm(2)]
+
+class FakeDecoder:
+    """Records the order of decode and PLC calls, as libopus state requires."""
+    def __init__(self):
+        self.calls: List[str] = []
+
+    def decode(self, packet: bytes, frame_size: int) -> bytes:
+        self.calls.append(f"decode {packet[0]}")
+        return bytes([packet[0]]) * frame_size * 2
+
+    def conceal(self, frame_size: int) -> bytes:
+        self.calls.append("plc")
+        return b"\x7f" * frame_size * 2
+
+def test_opus_packets_are_decoded_in_order_with_plc_for_gaps():
+    decoder = FakeDecoder()
+    jb = buffer(decoder=decoder)
+    for seq in (0, 2, 1):
+        push(jb, seq, data=bytes([seq]) * 40)
+    frames = [jb.pop() for _ in range(2)]
+    push(jb, 4, data=bytes([4]) * 40)
+    frames += [jb.pop() for _ in range(3)]
+    assert decoder.calls == ["decode 0", "decode 1", "decode 2", "plc", "decode 4"]
+    assert frames[3].data == b"\x7f" * len(SILENCE)
+    assert all(len(f.data) == len(SILENCE) for f in frames)
+
+def test_late_and_duplicate_frames_are_dropped():
+    jb = buffer()
+    push(jb, 0)
+    push(jb, 1)
+    push(jb, 1)
+    assert jb.pop().data == pcm(0)
+    assert jb.pop().data == pcm(1)
+    push(jb, 0) # Its slot has passed
+    assert jb.stats()["late"] == 1 and jb.stats()["duplicate"] == 1
+    assert jb.depth() == 0
+
+def test_rebuffers_after_the_sender_goes_quiet():
+    jb = buffer(max_conceal=2)
+    push(jb, 0)
+    assert jb.pop().data == pcm(0)
+    assert jb.pop() is not None and jb.pop() is not None # Concealed
+    assert jb.pop() is None # Stops instead of concealing forever
+    assert jb.underruns == 1 and not jb.playing
+    push(jb, 40) # The sender is back, later in the stream
+    assert jb.pop().data == pcm(40)
+
+def test_target_depth_follows_jitter():
+    jb = JitterBuffer(capacity=32, frame_duration_ms=FRAME_MS, min_depth=1, max_depth=10)
+    for seq in range(10):
+        push(jb, seq)
+    assert jb.estimator.peak_ms < 1e-6 # On time
+    push(jb, 10, arrival=10 * FRAME_MS / 1000 + 0.065) # 65 ms late
+    assert jb.target_depth == 1 + 4 # Enough frames to cover the delay
+    push(jb, 11, arrival=1.0) # Very late: capped at max_depth
+    assert jb.target_depth == 10
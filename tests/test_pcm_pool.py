@@ -0,0 +1,86 @@
+"""PcmBlockPool reuse guard and PacedStream framing."""
+import asyncio
+
+import numpy as np
+
+from app.services.audio import PcmBlockPool
+from app.services.pacer import PacedStream
+
+FRAME_BYTES = 640
+
+def test_released_blocks_are_reused():
+    pool = PcmBlockPool(FRAME_BYTES)
+    block = pool.acquire()
+    pool.release(block)
+    assert pool.acquire() is block
+    assert pool.stats()["allocated"] == 1 and pool.stats()["reused"] == 1
+
+def test_blocks_still_viewed_are_not_reused():
+    pool = PcmBlockPool(FRAME_BYTES)
+    viewed = pool.acquire()
+    view = memoryview(viewed)
+    pool.release(viewed)
+    as_array = pool.acquire()
+    array = np.frombuffer(as_array, dtype="<i2")
+    pool.release(as_array)
+    assert pool.free == [] and pool.escaped == 2
+    fresh = pool.acquire()
+    assert fresh is not viewed and fresh is not as_array
+    fresh[:] = b"\x01" * FRAME_BYTES
+    assert view.tobytes() == bytes(FRAME_BYTES) and not array.any() # Never overwritten
+
+    # Once the views are gone, a block can be released again
+    view.release()
+    pool.release(viewed)
+    assert pool.free == [viewed]
+
+def test_odd_blocks_and_a_full_free_list_are_left_to_the_gc():
+    pool = PcmBlockPool(FRAME_BYTES, max_free=1)
+    pool.release(bytearray(10))
+    assert pool.free == []
+    first, second = pool.acquire(), pool.acquire()
+    pool.release(first)
+    pool.release(second)
+    assert pool.free == [first]
+
+def test_paced_stream_cuts_any_chunking_into_frames():
+    async def run():
+        async def sink(frame):
+            pass
+        pool = PcmBlockPool(FRAME_BYTES)
+        stream = PacedStream("agent", sink, pool, max_frames=10)
+        audio = bytes(range(256)) * 10 # 2560 bytes: four frames
+        await stream.put(memoryview(audio)[:FRAME_BYTES]) # Whole frame
+        await stream.put(audio[FRAME_BYTES:1000]) # Partial, then the rest across a boundary
+        await stream.put(np.frombuffer(audio[1000:2500], dtype="<i2")) # Not a byte view
+        frames = []
+        while True:
+            block = stream.next_frame()
+            if block is None:
+                break
+            frames.append(bytes(block))
+            pool.release(block)
+        return audio, frames
+
+    audio, frames = asyncio.run(run())
+    assert len(frames) == 4 and all(len(f) == FRAME_BYTES for f in frames)
+    assert b"".join(frames[:3]) == audio[:3 * FRAME_BYTES]
+    # The tail is padded with silence rather than held back
+    assert frames[3] == audio[3 * FRAME_BYTES:2500] + bytes(4 * FRAME_BYTES - 2500)
+
+def test_paced_stream_blocks_put_while_full():
+    async def run():
+        async def sink(frame):
+            pass
+        pool = PcmBlockPool(FRAME_BYTES)
+        stream = PacedStream("agent", sink, pool, max_frames=2)
+        for _ in range(2):
+            await stream.put(bytes(FRAME_BYTES))
+        third = asyncio.create_task(stream.put(bytes(FRAME_BYTES)))
+        await asyncio.sleep(0.01)
+        assert not third.done()
+        pool.release(stream.next_frame())
+        await asyncio.wait_for(third, 1)
+        return len(stream.frames)
+
+    assert asyncio.run(run()) == 2
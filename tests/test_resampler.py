@@ -0,0 +1,58 @@
+"""StreamingResampler and AudioConverter: frame lengths, accuracy and format handling."""
+import numpy as np
+import pytest
+
+from app.services.resampler import SAMPLE_FORMAT_F32, AudioConverter, StreamingResampler
+
+def tone(freq: float, rate: int, seconds: float = 1.0, amplitude: float = 0.5) -> np.ndarray:
+    t = np.arange(int(rate * seconds)) / rate
+    return (amplitude * np.sin(2 * np.pi * freq * t)).astype(np.float32)
+
+def in_frames(resampler: StreamingResampler, samples: np.ndarray, frame_ms: int = 20) -> np.ndarray:
+    step = resampler.in_rate * frame_ms // 1000
+    return np.concatenate([resampler.process(samples[i:i + step]) for i in range(0, len(samples), step)])
+
+def sine_fit(samples: np.ndarray, freq: float, rate: int):
+    """Amplitude of the best-fitting sine, and the residual relative to it in dB."""
+    t = np.arange(len(samples)) / rate
+    basis = np.stack([np.sin(2 * np.pi * freq * t), np.cos(2 * np.pi * freq * t)], axis=1)
+    coeffs, *_ = np.linalg.lstsq(basis, samples, rcond=None)
+    amplitude = float(np.hypot(*coeffs))
+    residual = samples - basis @ coeffs
+    return amplitude, 20 * np.log10(np.sqrt(np.mean(residual ** 2)) / (amplitude / np.sqrt(2)))
+
+@pytest.mark.parametrize("in_rate", [8000, 22050, 24000, 44100, 48000])
+def test_every_20ms_frame_yields_one_20ms_frame(in_rate):
+    resampler = StreamingResampler(in_rate, 16000)
+    lengths = {len(resampler.process(np.zeros(in_rate // 50, dtype=np.float32))) for _ in range(50)}
+    assert lengths == {320}
+
+@pytest.mark.parametrize("in_rate", [8000, 44100, 48000])
+def test_a_tone_survives_resampling(in_rate):
+    out = in_frames(StreamingResampler(in_rate, 16000), tone(1000, in_rate))
+    amplitude, residual_db = sine_fit(out[200:], 1000, 16000) # Past the filter delay
+    assert amplitude == pytest.approx(0.5, rel=1e-3)
+    assert residual_db < -80
+
+def test_frame_by_frame_matches_one_call():
+    samples = tone(440, 48000) + tone(3000, 48000, amplitude=0.2)
+    whole = StreamingResampler(48000, 16000).process(samples)
+    assert np.allclose(in_frames(StreamingResampler(48000, 16000), samples), whole, atol=1e-5)
+
+def test_content_above_the_new_nyquist_is_filtered():
+    out = StreamingResampler(48000, 8000).process(tone(7000, 48000))
+    level_db = 20 * np.log10(np.sqrt(np.mean(out[200:] ** 2)) / (0.5 / np.sqrt(2)))
+    assert level_db < -60
+
+def test_converter_downmixes_and_converts_formats():
+    stereo = np.array([1000, 3000] * 320, dtype="<i2").tobytes()
+    mono = np.frombuffer(AudioConverter(16000, 16000, channels=2).convert(stereo), dtype="<i2")
+    assert len(mono) == 320 and set(mono) == {2000}
+
+    f32 = np.full(320, 0.25, dtype="<f4").tobytes()
+    pcm = np.frombuffer(AudioConverter(16000, 16000, sample_format=SAMPLE_FORMAT_F32).convert(f32), dtype="<i2")
+    assert set(pcm) == {8192}
+
+    frame = bytes(640)
+    converter = AudioConverter(16000, 16000)
+    assert converter.passthrough and converter.convert(frame) is frame
@@ -0,0 +1,58 @@
+"""TTSAudioCache tiers: memory LRU for local stores, mapped disk entries outside its budget."""
+import asyncio
+
+from app.services.ai.tts_cache import TTSAudioCache
+
+def test_disk_hits_stay_out_of_the_memory_budget(tmp_path):
+    async def run():
+        writer = TTSAudioCache(str(tmp_path), memory_bytes=4096)
+        keys = [writer.key(f"phrase {i}", "voice", 16000) for i in range(3)]
+        for i, key in enumerate(keys):
+            writer.put(key, 16000, 1, bytes([i]) * 1000)
+        await writer.flush()
+
+        # Another worker: its memory tier holds one entry of its own
+        reader = TTSAudioCache(str(tmp_path), memory_bytes=4096, mapped_entries=2)
+        own = reader.key("own phrase", "voice", 16000)
+        reader.put(own, 16000, 1, b"\x07" * 3000)
+        await reader.flush()
+
+        reads = 0
+        read_disk = reader._read_disk
+        def counting_read(key):
+            nonlocal reads
+            reads += 1
+            return read_disk(key)
+        reader._read_disk = counting_read
+
+        for i, key in enumerate(keys):
+            sample_rate, channels, pcm = await reader.get(key)
+            assert (sample_rate, channels, bytes(pcm)) == (16000, 1, bytes([i]) * 1000)
+        assert reads == 3
+        assert await reader.get(keys[2]) is not None # Still mapped: no disk read
+        assert reads == 3
+        assert await reader.get(keys[0]) is not None # Unmapped (limit 2): read again
+        assert reads == 4
+
+        # 3000 bytes of disk hits did not evict the local entry
+        assert list(reader.memory) == [own] and reader.memory_used == 3000
+        assert await reader.get(own) is not None
+        stats = reader.stats()
+        assert stats["memory_hits"] == 1 and stats["disk_hits"] == 5
+        assert stats["mapped_entries"] == 2 and stats["evictions"] == 0
+
+    asyncio.run(run())
+
+def test_memory_tier_is_an_lru_bounded_by_bytes():
+    async def run():
+        cache = TTSAudioCache(None, memory_bytes=2500)
+        a, b, c = (cache.key(t, "voice", 16000) for t in ("a", "b", "c"))
+        cache.put(a, 16000, 1, b"a" * 1000)
+        cache.put(b, 16000, 1, b"b" * 1000)
+        assert await cache.get(a) is not None # a is now the most recent
+        cache.put(c, 16000, 1, b"c" * 1000)
+        assert await cache.get(b) is None
+        assert await cache.get(a) is not None and await cache.get(c) is not None
+        assert cache.evictions == 1 and cache.memory_used == 2000
+
+    asyncio.run(run())